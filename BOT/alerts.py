@@ -0,0 +1,211 @@
+"""
+Price Alerts Module
+
+This module lets bot users opt in to price alerts with `/alert <crypto> <price>`. The
+bot keeps a single connection to the gateway price stream (/stream) for all users and
+checks every streamed price against the thresholds in memory, so any number of alerts
+costs one upstream feed instead of one poll per user.
+
+An alert fires once, when the price crosses its threshold in the direction it was set
+in: a threshold above the current price fires when the price rises to it, a threshold
+below fires when the price falls to it.
+
+Functions:
+    - parse_events: Parses Server-Sent Event lines into price updates.
+    - listen_prices: Consumes the gateway price stream and sends fired alerts.
+    - alert_command: Handles the /alert command.
+
+Classes:
+    - AlertBook: The alerts of all users and the last streamed prices.
+"""
+import asyncio
+import json
+from collections import namedtuple
+
+import httpx
+from telegram.error import TelegramError
+
+from utils.make_request import async_make_request, get_async_client
+from BOT.config import BASE_URL, curr, ALERT_RECONNECT
+
+Alert = namedtuple('Alert', ['chat_id', 'symbol', 'threshold', 'above'])
+
+
+class AlertBook:
+    """
+    Keeps the price alerts of all users.
+
+    Attributes:
+        prices (dict): The last streamed price per symbol.
+
+    Methods:
+        add: Adds an alert for a chat.
+        clear: Removes every alert of a chat.
+        for_chat: Returns the alerts of a chat.
+        check: Records a price and returns the alerts it fires.
+    """
+    def __init__(self):
+        self.prices = {}
+        self._alerts = {}
+
+    def add(self, chat_id, symbol, threshold, price):
+        """
+        Adds an alert that fires when the price of `symbol` moves from `price` to
+        `threshold`.
+
+        Returns:
+            Alert: The added alert.
+        """
+        alert = Alert(chat_id, symbol, threshold, threshold > price)
+        self._alerts.setdefault(symbol, []).append(alert)
+        return alert
+
+    def clear(self, chat_id):
+        """
+        Removes every alert of a chat and returns how many were removed.
+        """
+        removed = 0
+        for symbol, alerts in self._alerts.items():
+            kept = [alert for alert in alerts if alert.chat_id != chat_id]
+            removed += len(alerts) - len(kept)
+            self._alerts[symbol] = kept
+        return removed
+
+    def for_chat(self, chat_id):
+        """
+        Returns the alerts of a chat.
+        """
+        return [alert for alerts in self._alerts.values()
+                for alert in alerts if alert.chat_id == chat_id]
+
+    def check(self, symbol, price):
+        """
+        Records the price of a symbol and removes and returns the alerts it fires.
+        """
+        self.prices[symbol] = price
+        alerts = self._alerts.get(symbol, [])
+        fired = [alert for alert in alerts
+                 if (price >= alert.threshold if alert.above else price <= alert.threshold)]
+        if fired:
+            self._alerts[symbol] = [alert for alert in alerts if alert not in fired]
+        return fired
+
+
+book = AlertBook()
+
+
+async def parse_events(lines):
+    """
+    Parses Server-Sent Event lines and yields the data of every "price" event.
+
+    Args:
+        lines (AsyncIterable[str]): The lines of the stream.
+    """
+    event, data = 'message', []
+    async for line in lines:
+        if line.startswith('event:'):
+            event = line[6:].strip()
+        elif line.startswith('data:'):
+            data.append(line[5:].strip())
+        elif not line:
+            if event == 'price' and data:
+                yield json.loads('\n'.join(data))
+            event, data = 'message', []
+
+
+async def notify(bot, update):
+    """
+    Checks a streamed price against the alerts and sends a message for each fired one.
+    """
+    for alert in book.check(update['symbol'], update['price']):
+        direction = "поднялся выше" if alert.above else "опустился ниже"
+        try:
+            await bot.send_message(
+                chat_id=alert.chat_id,
+                text=(f"Курс {alert.symbol} {direction} {alert.threshold} "
+                      f"{update['currency']}: {update['price']} {update['currency']}")
+            )
+        except TelegramError as e:
+            print(f"Error sending alert to {alert.chat_id}: {e}")
+
+
+async def listen_prices(bot):
+    """
+    Consumes the gateway price stream for the bot's cryptocurrencies and sends fired
+    alerts. Reconnects after `ALERT_RECONNECT` seconds when the stream ends or fails.
+
+    Args:
+        bot (telegram.Bot): The bot that sends the alerts.
+    """
+    while True:
+        try:
+            async with get_async_client().stream(
+                    'GET', f'{BASE_URL}/stream', params={'fsyms': ','.join(curr)}) as response:
+                response.raise_for_status()
+                async for update in parse_events(response.aiter_lines()):
+                    await notify(bot, update)
+        except (httpx.HTTPError, ValueError) as e:
+            print(f"Price stream interrupted: {e}")
+        except Exception as e:  # pylint: disable=broad-except
+            # e.g. a malformed event; the task must outlive it, or alerts stop for good.
+            print(f"Price stream failed: {e!r}")
+        await asyncio.sleep(ALERT_RECONNECT)
+
+
+async def current_price(crypto):
+    """
+    Returns the last streamed price of a cryptocurrency, or fetches it from the gateway.
+
+    Raises:
+        ValueError: If the price cannot be fetched.
+    """
+    if crypto in book.prices:
+        return book.prices[crypto]
+    latest = await async_make_request(url=f'{BASE_URL}/latest/{crypto}/USD', hop='gateway')
+    if not latest or 'error' in latest:
+        raise ValueError("Ошибка при запросе данных")
+    try:
+        return float(latest[crypto].split()[0])
+    except (KeyError, AttributeError, IndexError, ValueError) as e:
+        raise ValueError("Ошибка при запросе данных") from e
+
+
+async def alert_command(update, context):
+    """
+    Handle the /alert command.
+
+    Usage:
+        /alert BTC 70000 - notify once when the BTC price crosses 70000 USD.
+        /alert off - remove all alerts of the chat.
+        /alert - list the alerts of the chat.
+
+    Args:
+        update (Update): The Telegram update object containing the user's message.
+        context (CallbackContext): The context holding the command arguments.
+    """
+    chat_id = update.effective_chat.id
+    args = context.args or []
+    if args == ['off']:
+        removed = book.clear(chat_id)
+        await update.message.reply_text(f"Удалено оповещений: {removed}")
+        return
+    if len(args) != 2:
+        alerts = book.for_chat(chat_id)
+        await update.message.reply_text("\n".join(
+            [f"{alert.symbol} {'>=' if alert.above else '<='} {alert.threshold} USD"
+             for alert in alerts]
+            or [f"Использование: /alert <{'|'.join(curr)}> <цена>, /alert off"]
+        ))
+        return
+
+    crypto = args[0].upper()
+    try:
+        threshold = float(args[1])
+        if crypto not in curr:
+            raise ValueError(f"Неизвестная криптовалюта {crypto}")
+        alert = book.add(chat_id, crypto, threshold, await current_price(crypto))
+    except ValueError as ve:
+        await update.message.reply_text(f"Ошибка {ve}")
+        return
+    direction = "поднимется выше" if alert.above else "опустится ниже"
+    await update.message.reply_text(f"Сообщу, когда курс {crypto} {direction} {threshold} USD")
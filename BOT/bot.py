@@ -9,6 +9,7 @@ Key Features:
 - Display available cryptocurrencies to the user.
 - Allow users to select cryptocurrencies and fetch analytics.
 - Provide help information to guide users.
+- Notify users who opted in with /alert when a price crosses their threshold.
 - Handle callback queries and maintain a seamless interaction.
 
 Dependencies:
@@ -19,12 +20,15 @@ Usage:
 Run this module to start the bot. The bot listens for commands like `/start` and 
 displays options in the chat interface.
 """
+import asyncio
 
 from telegram import Update
 from telegram.ext import ApplicationBuilder, CommandHandler, CallbackQueryHandler, CallbackContext
 
+from utils.make_request import close_async_client
 from BOT.keyboards import get_main_menu_buttons
-from BOT.config import bot, curr
+from BOT.alerts import alert_command, listen_prices
+from BOT.config import bot, curr, CONCURRENT_UPDATES
 from BOT.handlers import (
     handle_start,
     handle_back,
@@ -130,9 +134,26 @@ async def help_command(update: Update):
              /help - Показать справку
     """
     await update.message.reply_text(
-        "Вот что я умею:\n/start - Запустить бота\n/help - Показать справку"
+        "Вот что я умею:\n/start - Запустить бота\n/help - Показать справку\n"
+        "/alert <криптовалюта> <цена> - Сообщить, когда курс достигнет цены"
     )
 
+async def startup(application):
+    """
+    Start listening to the gateway price stream for alerts.
+    """
+    application.bot_data['alerts'] = asyncio.get_running_loop().create_task(
+        listen_prices(application.bot))
+
+async def shutdown(application):
+    """
+    Stop the price stream and close the shared async HTTP client when the bot stops.
+    """
+    alerts = application.bot_data.pop('alerts', None)
+    if alerts is not None:
+        alerts.cancel()
+    await close_async_client()
+
 def main():
     """
     Initialize and start the Telegram bot.
@@ -143,7 +164,10 @@ def main():
         - Registers the following handlers:
           * /start: Calls `start` function.
           * /help: Calls `help_command` function.
+          * /alert: Calls `alert_command` function.
           * Button clicks: Calls `button_handler` function.
+        - Handles up to `CONCURRENT_UPDATES` updates at the same time, so a slow
+          request of one user does not delay the others.
         - Starts polling for user interactions.
 
     Example:
@@ -154,9 +178,17 @@ def main():
         The bot begins listening for user interactions.
         Prints "Бот запущен..." upon successful start.
     """
-    app = ApplicationBuilder().token(bot).build()
+    app = (
+        ApplicationBuilder()
+        .token(bot)
+        .concurrent_updates(CONCURRENT_UPDATES)
+        .post_init(startup)
+        .post_shutdown(shutdown)
+        .build()
+    )
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("help", help_command))
+    app.add_handler(CommandHandler("alert", alert_command))
     app.add_handler(CallbackQueryHandler(button_handler))
 
     print("Бот запущен...")
@@ -14,6 +14,9 @@ Attributes:
     bot (str): Telegram bot token, loaded from the `.env` file.
     curr (list of str): Supported cryptocurrencies (e.g., 'BTC', 'ETH', 'TON').
     BASE_URL (str): Base URL for the backend API to fetch data and analytics.
+    CONCURRENT_UPDATES (int): Number of updates the bot handles at the same time.
+    S3_WORKERS (int): Number of threads for blocking plot downloads.
+    ALERT_RECONNECT (float): Seconds before the price stream is reconnected.
 
 Usage:
     Import this module to access the bot token, supported currencies, and base API URL.
@@ -31,3 +34,12 @@ curr = ['BTC', 'ETH', 'TON']
 
 # Base URL for API requests
 BASE_URL = 'http://127.0.0.1:5000/'
+
+# Number of updates handled at the same time
+CONCURRENT_UPDATES = int(os.getenv("BOT_CONCURRENT_UPDATES", "64"))
+
+# Number of threads for blocking S3 and plot cache calls
+S3_WORKERS = int(os.getenv("BOT_S3_WORKERS", "8"))
+
+# Seconds before the price stream for alerts is reconnected
+ALERT_RECONNECT = float(os.getenv("BOT_ALERT_RECONNECT", "5"))
@@ -4,31 +4,108 @@ Bot Handlers Module
 This module defines handlers for various bot interactions, including processing user input,
 fetching data, and returning responses in the form of messages or media (e.g., plots and stats).
 
+Handlers never block the event loop: gateway requests go through the shared async HTTP
+client, and S3 downloads and plot cache reads run in a bounded thread pool.
+
+Plots are passed to Telegram as the presigned S3 URL returned by the gateway, so Telegram
+downloads the image from S3 itself. Plots already sent are re-sent by their Telegram
+`file_id`, kept per S3 plot key for one hour or day bucket.
+
 Functions:
     - handle_start: Handles the start command and resets the main menu.
     - handle_back: Navigates back to the main cryptocurrency selection menu.
     - handle_callback: Processes user selection and navigates to the action menu.
     - handle_cripto_value: Fetches cryptocurrency data (latest, history, or plots).
     - handle_cripto_selection: Handles the initial cryptocurrency selection.
+    - send_plot: Sends a plot by cached `file_id` or uploads it once.
 
 Dependencies:
     - Requests to external APIs for data and analysis.
     - S3Client for image retrieval from cloud storage.
+    - PlotCache for plots already downloaded or rendered on this host.
 """
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from io import BytesIO
-import requests
+from telegram.error import BadRequest
 
 from utils.s3_client import S3Client
-from utils.make_request import make_request
+from utils.make_request import async_make_request
+from utils.plot_cache import PlotCache, plot_key
+from utils.cache import TTLCache
+from utils.time_formater import interval_seconds
 from BOT.keyboards import (
     get_main_menu_buttons,
     get_time_buttons,
     get_action_buttons,
     callback_photo
 )
-from BOT.config import BASE_URL
-from api.config import s3_key_id, s3_key_pass, bucket
+from BOT.config import BASE_URL, S3_WORKERS
+from api.config import (
+    s3_key_id,
+    s3_key_pass,
+    bucket,
+    PLOT_CACHE_MEMORY_BYTES,
+    PLOT_CACHE_DIR,
+    PLOT_CACHE_DISK_BYTES
+)
+
+plot_cache = PlotCache(PLOT_CACHE_MEMORY_BYTES, PLOT_CACHE_DIR, PLOT_CACHE_DISK_BYTES)
+file_ids = TTLCache(maxsize=1024, ttl=3600)
+s3_executor = ThreadPoolExecutor(max_workers=S3_WORKERS, thread_name_prefix='s3')
+
+
+def load_plot(s3_path):
+    """
+    Returns a plot from the plot cache or S3. Blocking; runs in `s3_executor`.
+    """
+    return plot_cache.get_or_load(s3_path, lambda: S3Client.shared(
+        aws_access_key_id=s3_key_id,
+        aws_secret_access_key=s3_key_pass
+    ).download_image(
+        bucket=bucket,
+        bucket_file=s3_path
+    ))
+
+
+async def send_plot(query, s3_path, time, url=None, **kwargs):
+    """
+    Sends the plot stored under an S3 key as a photo reply.
+
+    A plot sent before is re-sent by its Telegram `file_id`. Otherwise Telegram is given
+    the presigned `url`, and only if it cannot fetch it, the image is taken from the plot
+    cache or S3 and uploaded. The `file_id` of the sent photo is kept for the rest of the
+    `time` bucket.
+
+    Args:
+        query: Telegram query object containing user interaction data.
+        s3_path (str): The S3 key of the plot.
+        time (str): The plot interval ('hour' or 'day').
+        url (str, optional): A presigned URL of the plot.
+        **kwargs: Extra arguments for `reply_photo`, e.g. caption and reply_markup.
+
+    Raises:
+        FileNotFoundError: If the plot cannot be downloaded.
+    """
+    message = None
+    for photo in (file_ids.get(s3_path), url):
+        if not isinstance(photo, str):
+            continue
+        try:
+            message = await query.message.reply_photo(photo=photo, **kwargs)
+            break
+        except BadRequest:
+            pass  # an expired file_id or an unreachable URL, try the next source
+
+    if message is None:
+        data = await asyncio.get_running_loop().run_in_executor(
+            s3_executor, load_plot, s3_path)
+        if not data:
+            raise FileNotFoundError("Ошибка при загрузке изображения")
+        message = await query.message.reply_photo(photo=BytesIO(data), **kwargs)
+    if message and message.photo:
+        file_ids.set(s3_path, message.photo[-1].file_id, ttl=interval_seconds(time))
 
 
 async def handle_start(query):
@@ -101,37 +178,18 @@ async def handle_cripto_value(time, query, crypto):
     if time in ["day", "hour"]:
         try:
             await query.message.edit_reply_markup(reply_markup=None)
-            stats = make_request(
-                url=f'{BASE_URL}/analytics/{crypto}/{time}/USD/10')
-            if not stats or 'error' in stats:
+            report = await async_make_request(
+                url=f'{BASE_URL}/report/{crypto}/{time}/USD/10', hop='gateway')
+            if not report or 'error' in report:
                 raise ValueError("Ошибка при запросе аналитики данных")
 
-            time_resp = datetime.strptime(
-                make_request(
-                    url=f'{BASE_URL}/plot/{crypto}/{time}/USD/10')['time_resp'],
-                '%a, %d %b %Y %H:%M:%S %Z'
-            )
-            date_part = time_resp.strftime('%Y-%m-%d')
-            s3_path = (
-            f"{crypto}/{time}/{date_part}/{time_resp.strftime('%H')}/plot.png" 
-                if time == 'hour'
-            else
-                f"{crypto}/{time}/{date_part}/plot.png"
-            )
-            data = S3Client(
-                aws_access_key_id=s3_key_id,
-                aws_secret_access_key=s3_key_pass
-            ).download_image(
-                bucket=bucket,
-                bucket_file=s3_path
-            )
-            if not data:
-                raise FileNotFoundError("Ошибка при загрузке изображения")
-
-            buffer = BytesIO(data)
-            buffer.seek(0)
-            await query.message.reply_photo(
-                photo=buffer,
+            stats = report['stats']
+            time_resp = datetime.strptime(report['time_resp'], '%a, %d %b %Y %H:%M:%S %Z')
+            await send_plot(
+                query,
+                plot_key(crypto, time, time_resp),
+                time,
+                url=report.get('plot', {}).get('url'),
                 filename=f"{crypto}_{time}.png",
                 caption="\n".join([
                     f"Статистика {crypto} за 10 {'дней' if time == 'day' else 'часов'}:",
@@ -149,7 +207,7 @@ async def handle_cripto_value(time, query, crypto):
 
     if time == 'latest':
         try:
-            latest = make_request(url=f'{BASE_URL}/latest/{crypto}/USD')
+            latest = await async_make_request(url=f'{BASE_URL}/latest/{crypto}/USD', hop='gateway')
             if not latest or 'error' in latest:
                 raise ValueError("Ошибка при запросе данных")
 
@@ -158,7 +216,7 @@ async def handle_cripto_value(time, query, crypto):
                 reply_markup=callback_photo(crypto)
             )
             return
-        except requests.HTTPError as ve:
+        except ValueError as ve:
             await query.message.reply_text(f"Ошибка {ve}")
 
 
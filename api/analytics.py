@@ -1,48 +1,171 @@
 """
 API for Analyzing Cryptocurrency Data
 
-This module provides an endpoint to analyze cryptocurrency data sent via POST requests. 
-The analysis includes statistical metrics such as average, median, minimum, and maximum 
-values based on the provided data.
+This module provides an endpoint to analyze cryptocurrency data sent via POST requests.
+The analysis includes statistical metrics such as average, median, minimum, and maximum
+values based on the provided data, and optional rolling metrics from `api.indicators`.
+When the request names its series, the basic statistics are updated incrementally from
+the previous window of that series instead of being recomputed.
+
+With `points=N`, rolling metrics are still computed on every candle, and their series
+are then sampled at the at most N candles LTTB selects on the close prices.
+
+Instead of candles, the payload may be a history reference from the data service; the
+window is then read from the memory-mapped candle store. Candles may also arrive as a
+binary structured array (`application/x-npy`, see `api.wire`).
+
+Multi-asset comparisons align several histories on their common timestamps and compute
+correlation, performance, beta and rolling covariance with `api.compare`.
 
 Route:
     - /analytics: Accepts a JSON payload with cryptocurrency data and returns the analysis results.
+    - /compare: Accepts the histories of several cryptocurrencies and compares them.
+    - /analytics/stats: Returns counters of the incremental analytics state.
 """
 from flask import Flask, jsonify, request
+from api.candle_store import CandleStore
+from api.compare import compare
+from api.config import CANDLE_STORE_DIR
 from api.data_validation import validate_data
+from api.incremental import IncrementalAnalytics
+from api.indicators import compute_metrics, parse_metrics, DEFAULT_WINDOW
+from api.downsample import check_downsampling, lttb
+from api.wire import request_payload, request_payloads
 
 app = Flask(__name__)
+incremental = IncrementalAnalytics()
+store = CandleStore(CANDLE_STORE_DIR)
 
 @app.route("/analytics", methods=["POST"])
 def analytics():
     """
     Analyze cryptocurrency data.
 
-    This endpoint receives a JSON payload containing cryptocurrency data, validates it, 
-    and computes basic statistical metrics. The metrics include:
+    This endpoint receives a JSON payload containing cryptocurrency data or a history
+    reference, validates it, and computes basic statistical metrics. The metrics include:
         - Average closing price
         - Median closing price
         - Minimum low price
         - Maximum high price
 
+    Query parameters:
+        - metrics (str, optional): Comma-separated rolling metrics to compute, e.g.
+          "sma,ema,volatility,vwap,atr,pct_change,max_drawdown".
+        - window (int, optional): Window length in candles for the rolling metrics.
+        - series (str, optional): The series key, e.g. "BTC:USD:hour". Enables incremental
+          computation of the basic statistics when no rolling metrics are requested.
+        - points (int, optional): Return the rolling metrics at no more than this many
+          candles, selected with LTTB; their times are returned under "time".
+
     Returns:
         Response: A JSON object containing the calculated metrics:
             - "average" (float): Average of the 'close' prices.
             - "median" (float): Median of the 'close' prices.
             - "min" (float): Minimum of the 'low' prices.
             - "max" (float): Maximum of the 'high' prices.
+            - "metrics" (dict): Requested rolling metrics, only if `metrics` is given.
+            - "time" (list[int]): The candle times of the sampled metrics, only if
+              both `metrics` and `points` are given.
         If validation fails, returns an error response with the appropriate status code.
     """
-    df, error_response = validate_data(request.json)
+    try:
+        metrics, fields = parse_metrics(request.args.get('metrics'))
+        window = request.args.get('window', DEFAULT_WINDOW, type=int)
+        if window < 1:
+            raise ValueError("window must be a positive integer")
+        points = request.args.get('points', type=int)
+        if points is not None:
+            check_downsampling(points, 'lttb')
+        data = request_payload(request)
+        if CandleStore.is_ref(data):
+            data = store.resolve(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    series = request.args.get('series')
+    if series and not metrics:
+        try:
+            return jsonify(incremental.update(series, data)), 200
+        except ValueError:
+            pass  # fall through to full validation for a proper error response
+
+    df, error_response = validate_data(data, extra_fields=fields)
     if error_response:
         return error_response
 
-    return jsonify({
+    result = {
         "average": round(df['close'].mean(), 3),
         "median": round(df['close'].median(), 3),
         "min": round(df['low'].min(), 3),
         "max": round(df['high'].max(), 3),
-    }), 200
+    }
+    if metrics:
+        result["metrics"] = compute_metrics(df, metrics, window)
+        if points is not None:
+            result.update(sample_metrics(df, result["metrics"], points))
+    return jsonify(result), 200
+
+def sample_metrics(df, metrics, points):
+    """
+    Samples per-candle metric series at the candles LTTB selects on the close prices.
+
+    Returns:
+        dict: The sampled "metrics" and the "time" of the selected candles.
+    """
+    times = df['time'].to_numpy()
+    keep = lttb(times, df['close'].to_numpy(), points)
+    return {
+        "metrics": {
+            name: [values[i] for i in keep] if isinstance(values, list) else values
+            for name, values in metrics.items()
+        },
+        "time": times[keep].tolist(),
+    }
+
+@app.route("/compare", methods=["POST"])
+def compare_assets():
+    """
+    Compare several cryptocurrencies over their common candles.
+
+    The JSON payload maps each symbol to its candles or to a history reference, e.g.
+    {"BTC": [...], "ETH": [...]}.
+
+    Query parameters:
+        - benchmark (str, optional): The symbol beta and rolling covariance are measured
+          against. Defaults to "BTC" if present, else the first symbol.
+        - window (int, optional): Window length in candles for the rolling covariance.
+
+    Returns:
+        Response: A JSON object with "symbols", "benchmark", the aligned "time" stamps,
+        the "correlation" matrix of log returns, "performance" in percent, "beta" and
+        the per-candle "rolling_covariance" with the benchmark.
+        If the payload is invalid, returns an error message with a 400 status code.
+    """
+    try:
+        window = request.args.get('window', DEFAULT_WINDOW, type=int)
+        if window < 2:
+            raise ValueError("window must be at least 2")
+        payloads = request_payloads(request)
+        if not isinstance(payloads, dict):
+            raise ValueError("Expected an object mapping symbols to candles")
+        payloads = {
+            symbol: store.resolve(data) if CandleStore.is_ref(data) else data
+            for symbol, data in payloads.items()
+        }
+        return jsonify(compare(payloads, request.args.get('benchmark'), window)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route("/analytics/stats", methods=["GET"])
+def analytics_stats():
+    """
+    Return counters of the incremental analytics state.
+
+    Returns:
+        Response: A JSON object with the number of tracked series, full rebuilds,
+        incremental updates and candles applied incrementally.
+    """
+    return jsonify(incremental.stats()), 200
 
 if __name__ == "__main__":
     app.run(debug=False, port=5002)
@@ -8,34 +8,204 @@ This module provides an API gateway to centralize requests to various services s
 
 Routes:
     - /latest/<crypto>/<currency>: Fetch the latest cryptocurrency data.
-    - /history/<crypto>/<time>/<currency>/<int:limit>: Fetch historical cryptocurrency data.
+    - /latest?fsyms=<cryptos>&tsyms=<currencies>: Fetch the latest prices of many
+      cryptocurrencies at once.
+    - /history/<crypto>/<time>/<currency>/<int:limit>: Fetch historical cryptocurrency data,
+      optionally downsampled to `points` candles.
     - /analytics/<crypto>/<time>/<currency>/<int:limit>: Perform analytics on historical data.
     - /plot/<crypto>/<time>/<currency>/<int:limit>: Generate plots for cryptocurrency data.
+    - /report/<crypto>/<time>/<currency>/<int:limit>: Analytics and plot from a single fetch.
+    - /compare/<time>/<currency>/<int:limit>?fsyms=<cryptos>: Compare several cryptocurrencies.
+    - /chart/<time>/<currency>/<int:limit>?fsyms=<cryptos>: One chart of several
+      cryptocurrencies with optional overlay, volume and volatility panels.
+    - /stream?fsyms=<cryptos>: Server-Sent Events stream of the latest prices.
+    - /stats: Per-hop latency, single-flight, pre-warming and price feed counters.
+
+Concurrent GET requests for the same downstream URL share a single call. All downstream
+calls go through the shared pooled session; their p50/p99 latency is reported on /stats.
+
+Reports for the bot's cryptocurrencies are pre-warmed right after each candle boundary
+(`PREWARM_ENABLED`), so the first user of a new hour or day finds them ready.
+
+With `PRICE_FEED_ENABLED`, one poll loop keeps the latest prices of the watched
+cryptocurrencies in memory and pushes changes to /stream clients; /latest is then
+answered from memory while the polled price is fresh.
+
+With `SHARED_CANDLE_STORE`, the analytics and plot services receive a history reference
+into the candle store instead of the candles, and read the window from a memory map.
+Otherwise, with `BINARY_TRANSPORT`, the candles are fetched from the data service and
+passed on as binary structured arrays (`api.wire`); external clients still get JSON.
 """
+import json
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify, request
 import requests
+from utils.single_flight import SingleFlight
+from utils import http_session
+from api.prewarm import Prewarmer
+from api.wire import NPY_TYPE, bundle, content_headers, is_binary
+from api.price_feed import PriceFeed, data_service_source, random_walk, put_latest, sse_event
 from api.config import (
     DATA_SERVICE_URL,
     ANALYTICS_SERVICE_URL,
     PLOT_SERVICE_URL,
-    TTL
+    TIMEOUT,
+    GATEWAY_WORKERS,
+    SHARED_CANDLE_STORE,
+    BINARY_TRANSPORT,
+    PREWARM_ENABLED,
+    PREWARM_INTERVALS,
+    PREWARM_CONCURRENCY,
+    PREWARM_JITTER,
+    PREWARM_LIMIT,
+    PREWARM_CURRENCY,
+    curr,
+    PRICE_FEED_ENABLED,
+    PRICE_FEED_FAKE,
+    PRICE_FEED_CURRENCY,
+    PRICE_FEED_INTERVAL,
+    PRICE_STREAM_QUEUE_SIZE,
+    PRICE_STREAM_KEEPALIVE,
+    PRICE_STREAM_MAX_EXTRA
 )
 
 app = Flask(__name__)
+flight = SingleFlight()
+PAYLOAD_ACCEPT = NPY_TYPE if BINARY_TRANSPORT else None
+executor = ThreadPoolExecutor(max_workers=GATEWAY_WORKERS)
+price_feed = PriceFeed(
+    random_walk() if PRICE_FEED_FAKE else data_service_source(DATA_SERVICE_URL, TIMEOUT),
+    curr,
+    currency=PRICE_FEED_CURRENCY,
+    interval=PRICE_FEED_INTERVAL,
+    max_extra=PRICE_STREAM_MAX_EXTRA
+)
 
-def fetch_data(url, timeout=TTL):
-    """
-    Универсальная функция для выполнения HTTP-запросов и обработки ошибок.
-    """
+def _get(url, timeout, accept=None):
     try:
-        response = requests.get(url, timeout=timeout)
+        response = http_session.request('GET', url, hop='data_service', timeout=timeout,
+                                        internal=True,
+                                        headers={'Accept': accept} if accept else None)
         response.raise_for_status()
         return response
     except requests.RequestException as e:
         print(f"Error fetching data from {url}: {e}")
         return None
 
+def fetch_data(url, timeout=TIMEOUT, accept=None):
+    """
+    Универсальная функция для выполнения HTTP-запросов и обработки ошибок.
+    Одновременные запросы к одному и тому же URL выполняются одним вызовом.
+    `accept` задает заголовок Accept, например NPY_TYPE для бинарного формата.
+    """
+    return flight.do((url, accept), _get, url, timeout, accept)
+
+def history_url(crypto, time, currency, limit):
+    """
+    Returns the data service URL of the history payload for the analytics and plot services:
+    a candle store reference when they share the store, the candles otherwise.
+    """
+    route = 'history_ref' if SHARED_CANDLE_STORE else 'history'
+    return f"{DATA_SERVICE_URL}/{route}/{crypto}/{time}/{currency}/{limit}"
+
+def fetch_payload(crypto, time, currency, limit):
+    """
+    Fetch the history payload for the analytics and plot services from `history_url`,
+    as a binary structured array when `BINARY_TRANSPORT` is enabled.
+    """
+    return fetch_data(history_url(crypto, time, currency, limit), accept=PAYLOAD_ACCEPT)
+
+def post_analytics(body, params=None):
+    """
+    Send a serialized history payload to the analytics service.
+
+    Args:
+        body (bytes): The JSON or binary history payload as returned by the data service.
+        params (dict, optional): Query parameters, e.g. the rolling `metrics` and `window`.
+    Returns:
+        requests.Response: The analytics service response.
+    """
+    return http_session.request(
+        'POST', f"{ANALYTICS_SERVICE_URL}/analytics", hop='analytics_service',
+        internal=True, params=params, data=body, headers=content_headers(body))
+
+def request_symbols():
+    """
+    Returns the unique symbols of the `fsyms` query parameter, or the bot's cryptocurrencies.
+    """
+    return list(dict.fromkeys(s for s in request.args.get('fsyms', '').split(',') if s)) or curr
+
+def fetch_payloads(symbols, time, currency, limit):
+    """
+    Fetch the history payloads of several cryptocurrencies in parallel.
+
+    Returns:
+        bytes or None: A `api.wire` bundle of the binary payloads, or a JSON object
+        mapping each symbol to its payload as returned by the data service; either way
+        the payloads are embedded without being parsed. None if a fetch failed.
+    """
+    responses = list(executor.map(
+        lambda crypto: fetch_payload(crypto, time, currency, limit), symbols))
+    if not all(response and response.status_code == 200 for response in responses):
+        return None
+    if all(is_binary(response.content) for response in responses):
+        return bundle({symbol: response.content for symbol, response in zip(symbols, responses)})
+    return b'{' + b','.join(
+        json.dumps(symbol).encode() + b':' + response.content
+        for symbol, response in zip(symbols, responses)
+    ) + b'}'
+
+def post_compare(body, params=None):
+    """
+    Send the history payloads of several cryptocurrencies to the analytics service
+    for comparison.
+
+    Args:
+        body (bytes): The payloads as returned by `fetch_payloads`.
+        params (dict, optional): Query parameters, e.g. `benchmark` and `window`.
+    Returns:
+        requests.Response: The analytics service response.
+    """
+    return http_session.request(
+        'POST', f"{ANALYTICS_SERVICE_URL}/compare", hop='analytics_service',
+        internal=True, params=params, data=body, headers=content_headers(body))
+
+def post_chart(time, time_resp, body, params=None):
+    """
+    Send the history payloads of several cryptocurrencies to the plot service.
+
+    Args:
+        time (str): The time period for historical data (e.g., "hour", "day").
+        time_resp (datetime): The request time the chart is stored under.
+        body (bytes): The payloads as returned by `fetch_payloads`.
+        params (dict, optional): Query parameters: `overlay`, `panels`, `window`, `limit`,
+            `currency`.
+    Returns:
+        requests.Response: The plot service response.
+    """
+    return http_session.request(
+        'POST', f"{PLOT_SERVICE_URL}/chart/{time}/{time_resp}", hop='plot_service',
+        internal=True, params=params, data=body, headers=content_headers(body))
+
+def post_plot(crypto, time, time_resp, body, params=None):
+    """
+    Send a serialized history payload to the plot service.
+
+    Args:
+        crypto (str): The cryptocurrency symbol (e.g., "BTC").
+        time (str): The time period for historical data (e.g., "hour", "day").
+        time_resp (datetime): The request time the plot is stored under.
+        body (bytes): The JSON or binary history payload as returned by the data service.
+        params (dict, optional): Query parameters, e.g. the number of `points` to draw.
+    Returns:
+        requests.Response: The plot service response.
+    """
+    return http_session.request(
+        'POST', f"{PLOT_SERVICE_URL}/plot/{crypto}/{time}/{time_resp}",
+        hop='plot_service', internal=True, params=params, data=body, headers=content_headers(body))
+
 @app.route("/latest/<crypto>/<currency>", methods=["GET"])
 def latest(crypto, currency):
     """
@@ -48,12 +218,65 @@ def latest(crypto, currency):
         Response: A JSON object containing 
         the latest cryptocurrency data and the corresponding status code.
     """
+    price = price_feed.price(crypto, currency)
+    if price is not None:
+        return jsonify({crypto: f"{price} {currency}"}), 200
     url = f"{DATA_SERVICE_URL}/latest/{crypto}/{currency}"
     response = fetch_data(url)
     if response:
         return jsonify(response.json()), response.status_code
     return jsonify({"error": "Failed to fetch data"}), 500
 
+@app.route("/latest", methods=["GET"])
+def latest_many():
+    """
+    Fetch the latest prices of several cryptocurrencies with one data service call.
+
+    Query parameters:
+        - fsyms (str): Comma-separated cryptocurrency symbols, e.g. "BTC,ETH,TON".
+        - tsyms (str, optional): Comma-separated currency symbols. Defaults to "USD".
+    Returns:
+        Response: A JSON object such as {"BTC": {"USD": 34000.5}} and the status code.
+    """
+    url = f"{DATA_SERVICE_URL}/latest?{request.query_string.decode()}"
+    response = fetch_data(url)
+    if response:
+        return jsonify(response.json()), response.status_code
+    return jsonify({"error": "Failed to fetch data"}), 500
+
+@app.route("/stream", methods=["GET"])
+def stream():
+    """
+    Stream the latest prices as Server-Sent Events.
+
+    Query parameters:
+        - fsyms (str, optional): Comma-separated cryptocurrency symbols. Defaults to
+          the bot's cryptocurrencies.
+    Returns:
+        Response: A `text/event-stream` of "price" events, each with a JSON object
+        {"symbol", "currency", "price", "time"}. The last known prices are sent first,
+        then every change. Malformed symbols, or more new symbols than
+        `PRICE_STREAM_MAX_EXTRA` allows, give status 400.
+    """
+    symbols = [s for s in request.args.get('fsyms', '').split(',') if s] or curr
+    updates = queue.Queue(maxsize=PRICE_STREAM_QUEUE_SIZE)
+    try:
+        subscription = price_feed.subscribe(lambda update: put_latest(updates, update), symbols)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def events():
+        try:
+            while True:
+                try:
+                    yield sse_event(updates.get(timeout=PRICE_STREAM_KEEPALIVE))
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+        finally:
+            price_feed.unsubscribe(subscription)
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
 @app.route("/history/<crypto>/<time>/<currency>/<int:limit>", methods=["GET"])
 def history(crypto, time, currency, limit):
     """
@@ -63,11 +286,15 @@ def history(crypto, time, currency, limit):
         time (str): The time period for historical data (e.g., "1h", "1d").
         currency (str): The fiat currency symbol (e.g., "USD").
         limit (int): The maximum number of records to fetch.
+    Query parameters `points` and `method` are passed on to the data service, which then
+    returns at most `points` candles.
     Returns:
         Response: A JSON object containing 
         the historical cryptocurrency data and the corresponding status code.
     """
     url = f"{DATA_SERVICE_URL}/history/{crypto}/{time}/{currency}/{limit}"
+    if request.query_string:
+        url = f"{url}?{request.query_string.decode()}"
     response = fetch_data(url)
     if response:
         return jsonify(response.json()), response.status_code
@@ -82,15 +309,15 @@ def analytics(crypto, time, currency, limit):
         time (str): The time period for historical data (e.g., "1h", "1d").
         currency (str): The fiat currency symbol (e.g., "USD").
         limit (int): The maximum number of records to analyze.
+    Query parameters `metrics` and `window` are passed on to the analytics service together
+    with the series key, which lets it update statistics incrementally.
     Returns:
         Response: A JSON object containing the analytics results and the corresponding status code.
     """
-    url = f"{DATA_SERVICE_URL}/history/{crypto}/{time}/{currency}/{limit}"
-    response = fetch_data(url)
+    response = fetch_payload(crypto, time, currency, limit)
     if response and response.status_code == 200:
-        data = response.json()
-        analytics_response = requests.post(
-            f"{ANALYTICS_SERVICE_URL}/analytics", json=data, timeout=TTL)
+        params = {**request.args, 'series': f"{crypto}:{currency}:{time}"}
+        analytics_response = post_analytics(response.content, params)
         return jsonify(analytics_response.json()), analytics_response.status_code
     return jsonify({"error": "Failed to fetch data or perform analytics"}), 500
 
@@ -103,18 +330,183 @@ def plot(crypto, time, currency, limit):
         time (str): The time period for historical data (e.g., "1h", "1d").
         currency (str): The fiat currency symbol (e.g., "USD").
         limit (int): The maximum number of records to use for plotting.
+    The query parameter `points` is passed on to the plot service.
     Returns:
-        Response: A JSON object containing the plot image data and the corresponding status code.
+        Response: A JSON object with the presigned URL of the plot under "url" and the
+        plot time, with the status code of the plot service.
     """
-    url = f"{DATA_SERVICE_URL}/history/{crypto}/{time}/{currency}/{limit}"
-    response = fetch_data(url)
+    if not request.args:  # pre-warmed reports render the plot without options
+        prewarmer.observe((crypto, time, currency, limit))
+    response = fetch_payload(crypto, time, currency, limit)
     if response and response.status_code == 200:
-        data = response.json()
         time_resp = datetime.now()
-        plot_response = requests.post(
-            f"{PLOT_SERVICE_URL}/plot/{crypto}/{time}/{time_resp}", json=data, timeout=TTL)
-        return jsonify({'status':'success','time_resp':time_resp}), plot_response.status_code
+        plot_response = post_plot(crypto, time, time_resp, response.content, dict(request.args))
+        if plot_response.status_code != 200:
+            return jsonify(plot_response.json()), plot_response.status_code
+        return jsonify({
+            'status': 'success',
+            'time_resp': time_resp,
+            'url': plot_response.json().get('url')
+        }), 200
     return jsonify({"error": "Failed to fetch data or generate plot"}), 500
 
+@app.route("/compare/<time>/<currency>/<int:limit>", methods=["GET"])
+def compare(time, currency, limit):
+    """
+    Compare several cryptocurrencies over the same candles.
+
+    The histories are fetched in parallel and compared by the analytics service in
+    one request.
+
+    Args:
+        time (str): The time period for historical data (e.g., "hour", "day").
+        currency (str): The fiat currency symbol (e.g., "USD").
+        limit (int): The number of data points to retrieve per cryptocurrency.
+    Query parameters:
+        - fsyms (str, optional): Comma-separated cryptocurrency symbols. Defaults to
+          the bot's cryptocurrencies.
+        - benchmark (str, optional): The symbol beta is measured against.
+        - window (int, optional): Window length for the rolling covariance.
+    Returns:
+        Response: A JSON object with the correlation matrix, performance, beta and
+        rolling covariance, and the corresponding status code.
+    """
+    symbols = request_symbols()
+    body = fetch_payloads(symbols, time, currency, limit)
+    if body is None:
+        return jsonify({"error": "Failed to fetch data"}), 500
+
+    params = {key: request.args[key] for key in ('benchmark', 'window') if key in request.args}
+    try:
+        response = post_compare(body, params)
+    except requests.RequestException as e:
+        print(f"Error comparing {','.join(symbols)}: {e}")
+        return jsonify({"error": "Failed to perform analytics"}), 500
+    return jsonify(response.json()), response.status_code
+
+@app.route("/chart/<time>/<currency>/<int:limit>", methods=["GET"])
+def chart(time, currency, limit):
+    """
+    Render several cryptocurrencies in one chart.
+
+    Args:
+        time (str): The time period for historical data (e.g., "hour", "day").
+        currency (str): The fiat currency symbol (e.g., "USD").
+        limit (int): The number of data points to retrieve per cryptocurrency.
+    Query parameters:
+        - fsyms (str, optional): Comma-separated cryptocurrency symbols. Defaults to
+          the bot's cryptocurrencies.
+        - overlay (str, optional): "sma" or "ema" drawn over the prices.
+        - panels (str, optional): Comma-separated extra panels: "volume", "volatility".
+        - window (int, optional): Window length of the overlay and the volatility.
+    Returns:
+        Response: A JSON object with a presigned URL of the chart and the status code.
+    """
+    symbols = request_symbols()
+    body = fetch_payloads(symbols, time, currency, limit)
+    if body is None:
+        return jsonify({"error": "Failed to fetch data"}), 500
+
+    params = {key: request.args[key] for key in ('overlay', 'panels', 'window')
+              if key in request.args}
+    try:
+        response = post_chart(time, datetime.now(), body,
+                              {**params, 'limit': limit, 'currency': currency})
+    except requests.RequestException as e:
+        print(f"Error charting {','.join(symbols)}: {e}")
+        return jsonify({"error": "Failed to generate chart"}), 500
+    return jsonify(response.json()), response.status_code
+
+@app.route("/report/<crypto>/<time>/<currency>/<int:limit>", methods=["GET"])
+def report(crypto, time, currency, limit):
+    """
+    Perform analytics and generate a plot from a single history fetch.
+
+    The history is fetched once and the same serialized payload is sent to the analytics
+    and plot services concurrently.
+    Args:
+        crypto (str): The cryptocurrency symbol (e.g., "BTC").
+        time (str): The time period for historical data (e.g., "hour", "day").
+        currency (str): The fiat currency symbol (e.g., "USD").
+        limit (int): The maximum number of records to use.
+    Returns:
+        Response: A JSON object with the analytics results under "stats", the plot service
+        response with the presigned plot URL under "plot" and the plot time under "time_resp".
+    """
+    prewarmer.observe((crypto, time, currency, limit))
+    body, status = build_report(crypto, time, currency, limit)
+    return jsonify(body), status
+
+def build_report(crypto, time, currency, limit):
+    """
+    Build the /report response body.
+
+    Returns:
+        tuple: The response body as a dictionary and the status code.
+    """
+    response = fetch_payload(crypto, time, currency, limit)
+    if not response or response.status_code != 200:
+        return {"error": "Failed to fetch data"}, 500
+
+    time_resp = datetime.now()
+    analytics_future = executor.submit(
+        post_analytics, response.content, {'series': f"{crypto}:{currency}:{time}"})
+    plot_future = executor.submit(post_plot, crypto, time, time_resp, response.content)
+    try:
+        analytics_response = analytics_future.result()
+        plot_response = plot_future.result()
+    except requests.RequestException as e:
+        print(f"Error building report for {crypto}/{time}: {e}")
+        return {"error": "Failed to perform analytics or generate plot"}, 500
+
+    if analytics_response.status_code != 200:
+        return analytics_response.json(), analytics_response.status_code
+    if plot_response.status_code != 200:
+        return plot_response.json(), plot_response.status_code
+    return {
+        'stats': analytics_response.json(),
+        'plot': plot_response.json(),
+        'time_resp': time_resp
+    }, 200
+
+def warm_report(crypto, time, currency, limit):
+    """
+    Build the report the bot requests for a cryptocurrency, filling every cache on the way.
+
+    Raises:
+        RuntimeError: If the report cannot be built.
+    """
+    body, status = build_report(crypto, time, currency, limit)
+    if status != 200:
+        raise RuntimeError(body.get('error', status))
+
+prewarmer = Prewarmer(
+    [(crypto, time, PREWARM_CURRENCY, PREWARM_LIMIT)
+     for crypto in curr for time in PREWARM_INTERVALS],
+    warm_report,
+    concurrency=PREWARM_CONCURRENCY,
+    jitter=PREWARM_JITTER
+)
+
+@app.route("/stats", methods=["GET"])
+def stats():
+    """
+    Report gateway metrics.
+
+    Returns:
+        Response: A JSON object with p50/p99 latency per downstream hop,
+        the single-flight counters, the pre-warming and the price feed counters.
+    """
+    return jsonify({
+        "latency": http_session.latency_stats(),
+        "single_flight": flight.stats(),
+        "prewarm": prewarmer.stats(),
+        "price_feed": price_feed.stats()
+    }), 200
+
 if __name__ == "__main__":
+    if PREWARM_ENABLED:
+        prewarmer.start()
+    if PRICE_FEED_ENABLED:
+        price_feed.start()
     app.run(debug=False, port=5000)
@@ -0,0 +1,487 @@
+"""
+Asynchronous API Gateway
+
+This module provides an asyncio-based mode of the API gateway in `api.app`. It exposes
+the same routes on the same port, but runs on `aiohttp` with a pooled async HTTP client,
+so a slow downstream service only holds a coroutine instead of a worker thread, and
+independent downstream calls run concurrently.
+
+Routes:
+    - /latest/<crypto>/<currency>: Fetch the latest cryptocurrency data.
+    - /latest?fsyms=<cryptos>&tsyms=<currencies>: Fetch the latest prices of many
+      cryptocurrencies at once.
+    - /history/<crypto>/<time>/<currency>/<int:limit>: Fetch historical cryptocurrency data,
+      optionally downsampled to `points` candles.
+    - /analytics/<crypto>/<time>/<currency>/<int:limit>: Perform analytics on historical data.
+    - /plot/<crypto>/<time>/<currency>/<int:limit>: Generate plots for cryptocurrency data.
+    - /report/<crypto>/<time>/<currency>/<int:limit>: Analytics and plot from a single fetch.
+    - /compare/<time>/<currency>/<int:limit>?fsyms=<cryptos>: Compare several cryptocurrencies.
+    - /chart/<time>/<currency>/<int:limit>?fsyms=<cryptos>: One chart of several
+      cryptocurrencies with optional overlay, volume and volatility panels.
+    - /stream?fsyms=<cryptos>: Server-Sent Events stream of the latest prices.
+    - /stats: Per-hop latency, single-flight and price feed counters.
+
+With `SHARED_CANDLE_STORE`, the analytics and plot services receive a history reference
+into the candle store instead of the candles. Otherwise, with `BINARY_TRANSPORT`, the
+candles travel as binary structured arrays (`api.wire`); external clients still get JSON.
+
+With `PRICE_FEED_ENABLED`, the price feed of `api.price_feed` polls on its own thread and
+its updates are handed to the stream coroutines through the event loop.
+
+Usage:
+    $ python api/async_app.py
+"""
+import asyncio
+import json
+import time as _time
+from collections import namedtuple
+from datetime import datetime
+
+import aiohttp
+from aiohttp import web
+from werkzeug.http import http_date
+
+from utils.single_flight import AsyncSingleFlight
+from utils.http_session import record_latency, latency_stats
+from api.price_feed import PriceFeed, data_service_source, random_walk, put_latest, sse_event
+from api.wire import NPY_TYPE, bundle, content_headers, is_binary
+from api.config import (
+    DATA_SERVICE_URL,
+    ANALYTICS_SERVICE_URL,
+    PLOT_SERVICE_URL,
+    CONNECT_TIMEOUT,
+    READ_TIMEOUT,
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_RETRIES,
+    HTTP_BACKOFF,
+    SHARED_CANDLE_STORE,
+    BINARY_TRANSPORT,
+    PRICE_FEED_ENABLED,
+    PRICE_FEED_FAKE,
+    PRICE_FEED_CURRENCY,
+    PRICE_FEED_INTERVAL,
+    PRICE_STREAM_QUEUE_SIZE,
+    PRICE_STREAM_KEEPALIVE,
+    PRICE_STREAM_MAX_EXTRA,
+    curr
+)
+
+routes = web.RouteTableDef()
+PAYLOAD_ACCEPT = NPY_TYPE if BINARY_TRANSPORT else None
+CLIENT = web.AppKey('client', aiohttp.ClientSession)
+FLIGHT = web.AppKey('flight', AsyncSingleFlight)
+URLS = web.AppKey('urls', dict)
+FEED = web.AppKey('feed', PriceFeed)
+
+# A fully read downstream response that can be shared between waiting requests.
+DownstreamResponse = namedtuple('DownstreamResponse', ['status', 'body'])
+
+
+def forward(response):
+    """
+    Returns a downstream JSON response as a gateway response with the same status.
+    """
+    return web.Response(status=response.status, body=response.body,
+                        content_type='application/json')
+
+
+def error(message, status=500):
+    """
+    Returns a JSON error response in the format used by the gateway.
+    """
+    return web.json_response({"error": message}, status=status)
+
+
+async def call(app, method, url, hop, **kwargs):
+    """
+    Send a request through the shared client session and read the whole body.
+
+    Connection errors are retried `HTTP_RETRIES` times with exponential backoff.
+    Args:
+        app (web.Application): The gateway application holding the client session.
+        method (str): The HTTP method (e.g., "GET", "POST").
+        url (str): The request URL.
+        hop (str): The name the latency is recorded under.
+        **kwargs: Extra arguments passed to `aiohttp.ClientSession.request`.
+    Returns:
+        DownstreamResponse: The status code and body.
+    Raises:
+        aiohttp.ClientError, asyncio.TimeoutError: If the request fails after all retries.
+    """
+    async def attempt():
+        start = _time.perf_counter()
+        try:
+            async with app[CLIENT].request(method, url, **kwargs) as response:
+                return DownstreamResponse(response.status, await response.read())
+        finally:
+            record_latency(hop, _time.perf_counter() - start)
+
+    for retry in range(HTTP_RETRIES):
+        try:
+            return await attempt()
+        except aiohttp.ClientConnectionError:
+            await asyncio.sleep(HTTP_BACKOFF * 2 ** retry)
+    return await attempt()
+
+
+async def fetch_data(app, url, accept=None):
+    """
+    Fetch a URL from the data service. Concurrent fetches of the same URL share one call.
+    `accept` sets the Accept header, e.g. `NPY_TYPE` for binary candles.
+    Returns:
+        DownstreamResponse or None: The response, or None if the request failed.
+    """
+    try:
+        return await app[FLIGHT].do((url, accept), call, app, 'GET', url, 'data_service',
+                                    headers={'Accept': accept} if accept else None)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        print(f"Error fetching data from {url}: {e}")
+        return None
+
+
+async def fetch_history(request, route='history', forward_query=False, accept=None):
+    """
+    Fetch the history addressed by the route parameters of `request` from a data
+    service route, e.g. "history" or "history_ref", passing on the query string of
+    `request` if `forward_query` is set and asking for the `accept` content type.
+    """
+    info = request.match_info
+    url = (f"{request.app[URLS]['data']}/{route}/"
+           f"{info['crypto']}/{info['time']}/{info['currency']}/{info['limit']}")
+    if forward_query and request.query_string:
+        url = f"{url}?{request.query_string}"
+    return await fetch_data(request.app, url, accept)
+
+
+def fetch_payload(request):
+    """
+    Fetch the history payload for the analytics and plot services: a candle store
+    reference when they share the store, the candles otherwise, binary with
+    `BINARY_TRANSPORT`.
+    """
+    return fetch_history(request, 'history_ref' if SHARED_CANDLE_STORE else 'history',
+                         accept=PAYLOAD_ACCEPT)
+
+
+def series_key(request):
+    """
+    Returns the analytics series key, e.g. "BTC:USD:hour", for the route parameters.
+    """
+    info = request.match_info
+    return f"{info['crypto']}:{info['currency']}:{info['time']}"
+
+
+def post_analytics(app, body, params=None):
+    """
+    Send a serialized history payload to the analytics service.
+    """
+    return call(app, 'POST', f"{app[URLS]['analytics']}/analytics", 'analytics_service',
+                params=params, data=body, headers=content_headers(body))
+
+
+async def fetch_payloads(request):
+    """
+    Fetch the history payloads of the `fsyms` cryptocurrencies concurrently.
+
+    Returns:
+        tuple: The symbols and an `api.wire` bundle of the binary payloads or a JSON
+        object mapping each symbol to its payload, embedded without being parsed;
+        the body is None if a fetch failed.
+    """
+    info = request.match_info
+    route = 'history_ref' if SHARED_CANDLE_STORE else 'history'
+    symbols = list(dict.fromkeys(
+        s for s in request.query.get('fsyms', '').split(',') if s)) or curr
+    responses = await asyncio.gather(*(
+        fetch_data(request.app, f"{request.app[URLS]['data']}/{route}/"
+                                f"{crypto}/{info['time']}/{info['currency']}/{info['limit']}",
+                   PAYLOAD_ACCEPT)
+        for crypto in symbols
+    ))
+    if not all(response and response.status == 200 for response in responses):
+        return symbols, None
+    if all(is_binary(response.body) for response in responses):
+        return symbols, bundle(dict(zip(symbols, (response.body for response in responses))))
+    return symbols, b'{' + b','.join(
+        json.dumps(symbol).encode() + b':' + response.body
+        for symbol, response in zip(symbols, responses)
+    ) + b'}'
+
+
+def post_compare(app, body, params=None):
+    """
+    Send the history payloads of several cryptocurrencies to the analytics service.
+    """
+    return call(app, 'POST', f"{app[URLS]['analytics']}/compare", 'analytics_service',
+                params=params, data=body, headers=content_headers(body))
+
+
+def post_chart(app, time, time_resp, body, params=None):
+    """
+    Send the history payloads of several cryptocurrencies to the plot service.
+    """
+    return call(app, 'POST', f"{app[URLS]['plot']}/chart/{time}/{time_resp}", 'plot_service',
+                params=params, data=body, headers=content_headers(body))
+
+
+def post_plot(request, time_resp, body, params=None):
+    """
+    Send a serialized history payload to the plot service, for the cryptocurrency and
+    time period addressed by the route parameters of `request`.
+    """
+    info = request.match_info
+    return call(request.app, 'POST',
+                f"{request.app[URLS]['plot']}/plot/{info['crypto']}/{info['time']}/{time_resp}",
+                'plot_service', params=params, data=body, headers=content_headers(body))
+
+
+@routes.get('/latest/{crypto}/{currency}')
+async def latest(request):
+    """
+    Fetch the latest cryptocurrency data.
+    """
+    info = request.match_info
+    price = request.app[FEED].price(info['crypto'], info['currency'])
+    if price is not None:
+        return web.json_response({info['crypto']: f"{price} {info['currency']}"})
+    url = f"{request.app[URLS]['data']}/latest/{info['crypto']}/{info['currency']}"
+    response = await fetch_data(request.app, url)
+    if response and response.status < 400:
+        return forward(response)
+    return error("Failed to fetch data")
+
+
+@routes.get('/latest')
+async def latest_many(request):
+    """
+    Fetch the latest prices of several cryptocurrencies with one data service call.
+    """
+    url = f"{request.app[URLS]['data']}/latest?{request.query_string}"
+    response = await fetch_data(request.app, url)
+    if response and response.status < 400:
+        return forward(response)
+    return error("Failed to fetch data")
+
+
+@routes.get('/stream')
+async def stream(request):
+    """
+    Stream the latest prices as Server-Sent Events.
+
+    Malformed symbols, or more new symbols than `PRICE_STREAM_MAX_EXTRA` allows, give
+    status 400.
+    """
+    symbols = [s for s in request.query.get('fsyms', '').split(',') if s] or curr
+    loop = asyncio.get_running_loop()
+    updates = asyncio.Queue(maxsize=PRICE_STREAM_QUEUE_SIZE)
+    try:
+        subscription = request.app[FEED].subscribe(
+            lambda update: loop.call_soon_threadsafe(put_latest, updates, update), symbols)
+    except ValueError as e:
+        return error(str(e), status=400)
+
+    response = web.StreamResponse(
+        headers={'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache'})
+    try:
+        await response.prepare(request)
+        while True:
+            try:
+                update = await asyncio.wait_for(updates.get(), PRICE_STREAM_KEEPALIVE)
+                await response.write(sse_event(update).encode())
+            except asyncio.TimeoutError:
+                await response.write(b": keep-alive\n\n")
+    except ConnectionResetError:
+        pass
+    finally:
+        request.app[FEED].unsubscribe(subscription)
+    return response
+
+
+@routes.get(r'/history/{crypto}/{time}/{currency}/{limit:\d+}')
+async def history(request):
+    """
+    Fetch historical cryptocurrency data.
+
+    Query parameters `points` and `method` are passed on to the data service.
+    """
+    response = await fetch_history(request, forward_query=True)
+    if response and response.status < 400:
+        return forward(response)
+    return error("Failed to fetch data")
+
+
+@routes.get(r'/analytics/{crypto}/{time}/{currency}/{limit:\d+}')
+async def analytics(request):
+    """
+    Perform analytics on historical cryptocurrency data.
+
+    Query parameters `metrics` and `window` are passed on to the analytics service together
+    with the series key, which lets it update statistics incrementally.
+    """
+    response = await fetch_payload(request)
+    if response and response.status == 200:
+        params = {**request.rel_url.query, 'series': series_key(request)}
+        try:
+            return forward(await post_analytics(request.app, response.body, params))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error performing analytics for {series_key(request)}: {e}")
+    return error("Failed to fetch data or perform analytics")
+
+
+@routes.get(r'/plot/{crypto}/{time}/{currency}/{limit:\d+}')
+async def plot(request):
+    """
+    Generate a plot for cryptocurrency trends and return its presigned URL.
+
+    The query parameter `points` is passed on to the plot service.
+    """
+    response = await fetch_payload(request)
+    if response and response.status == 200:
+        time_resp = datetime.now()
+        try:
+            plot_response = await post_plot(
+                request, time_resp, response.body, dict(request.rel_url.query))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error plotting {series_key(request)}: {e}")
+            return error("Failed to fetch data or generate plot")
+        if plot_response.status != 200:
+            return forward(plot_response)
+        return web.json_response({
+            'status': 'success',
+            'time_resp': http_date(time_resp),
+            'url': json.loads(plot_response.body).get('url')
+        })
+    return error("Failed to fetch data or generate plot")
+
+
+@routes.get(r'/compare/{time}/{currency}/{limit:\d+}')
+async def compare(request):
+    """
+    Compare several cryptocurrencies; their histories are fetched concurrently.
+    """
+    symbols, body = await fetch_payloads(request)
+    if body is None:
+        return error("Failed to fetch data")
+
+    params = {key: request.query[key] for key in ('benchmark', 'window') if key in request.query}
+    try:
+        return forward(await post_compare(request.app, body, params))
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        print(f"Error comparing {','.join(symbols)}: {e}")
+        return error("Failed to perform analytics")
+
+
+@routes.get(r'/chart/{time}/{currency}/{limit:\d+}')
+async def chart(request):
+    """
+    Render several cryptocurrencies in one chart; their histories are fetched concurrently.
+    """
+    symbols, body = await fetch_payloads(request)
+    if body is None:
+        return error("Failed to fetch data")
+
+    params = {key: request.query[key] for key in ('overlay', 'panels', 'window')
+              if key in request.query}
+    params['limit'] = request.match_info['limit']
+    params['currency'] = request.match_info['currency']
+    try:
+        return forward(await post_chart(
+            request.app, request.match_info['time'], datetime.now(), body, params))
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        print(f"Error charting {','.join(symbols)}: {e}")
+        return error("Failed to generate chart")
+
+
+@routes.get(r'/report/{crypto}/{time}/{currency}/{limit:\d+}')
+async def report(request):
+    """
+    Perform analytics and generate a plot from a single history fetch.
+
+    The analytics and plot services are called concurrently with the same payload.
+    """
+    response = await fetch_payload(request)
+    if not response or response.status != 200:
+        return error("Failed to fetch data")
+
+    info = request.match_info
+    time_resp = datetime.now()
+    try:
+        analytics_response, plot_response = await asyncio.gather(
+            post_analytics(request.app, response.body, {'series': series_key(request)}),
+            post_plot(request, time_resp, response.body)
+        )
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        print(f"Error building report for {info['crypto']}/{info['time']}: {e}")
+        return error("Failed to perform analytics or generate plot")
+
+    for downstream in (analytics_response, plot_response):
+        if downstream.status != 200:
+            return forward(downstream)
+    return web.json_response({
+        'stats': json.loads(analytics_response.body),
+        'plot': json.loads(plot_response.body),
+        'time_resp': http_date(time_resp)
+    })
+
+
+@routes.get('/stats')
+async def stats(request):
+    """
+    Report gateway metrics.
+    """
+    return web.json_response({
+        "latency": latency_stats(),
+        "single_flight": request.app[FLIGHT].stats(),
+        "price_feed": request.app[FEED].stats()
+    })
+
+
+async def client_session(app):
+    """
+    Open the pooled client session for the lifetime of the application.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_POOL_CONNECTIONS * HTTP_POOL_MAXSIZE,
+        limit_per_host=HTTP_POOL_MAXSIZE
+    )
+    timeout = aiohttp.ClientTimeout(sock_connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        app[CLIENT] = session
+        yield
+
+
+def create_app(data_url=DATA_SERVICE_URL,
+               analytics_url=ANALYTICS_SERVICE_URL,
+               plot_url=PLOT_SERVICE_URL):
+    """
+    Build the asynchronous gateway application.
+
+    Args:
+        data_url (str): Base URL of the data service.
+        analytics_url (str): Base URL of the analytics service.
+        plot_url (str): Base URL of the plot service.
+    Returns:
+        web.Application: The gateway application.
+    """
+    app = web.Application()
+    app[URLS] = {'data': data_url, 'analytics': analytics_url, 'plot': plot_url}
+    app[FLIGHT] = AsyncSingleFlight()
+    app[FEED] = PriceFeed(
+        random_walk() if PRICE_FEED_FAKE else
+        data_service_source(data_url, (CONNECT_TIMEOUT, READ_TIMEOUT)),
+        curr,
+        currency=PRICE_FEED_CURRENCY,
+        interval=PRICE_FEED_INTERVAL,
+        max_extra=PRICE_STREAM_MAX_EXTRA
+    )
+    app.cleanup_ctx.append(client_session)
+    app.add_routes(routes)
+    return app
+
+
+if __name__ == "__main__":
+    gateway = create_app()
+    if PRICE_FEED_ENABLED:
+        gateway[FEED].start()
+    web.run_app(gateway, port=5000)
@@ -0,0 +1,244 @@
+"""
+Local OHLCV Candle Store
+
+This module persists fetched candles per `(crypto, currency, time)` series, so a history
+request only has to fetch the candles that are not stored yet. Each series is one NumPy
+structured array saved as a `.npy` file, sorted by time with unique timestamps.
+
+Only closed candles are stored: the candle of the current bucket keeps changing until
+the bucket rolls over, so it is always taken from the upstream response.
+
+Series files are opened read-only with `mmap_mode='r'`, so a window is sliced from the
+OS page cache without parsing: worker processes of the analytics and plot services share
+the same pages instead of each parsing JSON. Resolving a reference still copies the
+window once, together with the open candle, into the array a service works on. Services on the same host pass a
+history *reference* (series, time range and the open candle) instead of the candles.
+A reference to a resampled interval points at the base series and names the interval
+its candles are merged into when it is resolved.
+
+A store may bound the number of candles kept per series; a merge then drops the oldest
+candles, so the cost of a merge does not grow with the age of the series.
+
+Writes go to a temporary file that atomically replaces the series file, so readers in
+other processes always see a complete file and keep their old mapping valid. Concurrent
+writers in one process are serialized per series; across processes the last writer
+wins, and anything lost is fetched again on a later request.
+
+Classes:
+    - CandleStore: Loads, maps, merges and slices candles and resolves references.
+"""
+import os
+import re
+import tempfile
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+from api.downsample import resample
+
+CANDLE_FIELDS = ('time', 'high', 'low', 'open', 'volumefrom', 'volumeto', 'close')
+CANDLE_DTYPE = np.dtype([('time', '<i8')] + [(field, '<f8') for field in CANDLE_FIELDS[1:]])
+_SYMBOL = re.compile(r'^[A-Za-z0-9]+$')
+
+
+def to_array(records):
+    """
+    Converts CryptoCompare candle dicts to a structured candle array.
+
+    Args:
+        records (list[dict]): Candles with the fields in `CANDLE_FIELDS`.
+
+    Returns:
+        np.ndarray: The candles as `CANDLE_DTYPE`, in input order.
+    """
+    array = np.empty(len(records), dtype=CANDLE_DTYPE)
+    for field in CANDLE_FIELDS:
+        array[field] = [record[field] for record in records]
+    return array
+
+
+def to_records(array):
+    """
+    Converts a structured candle array back to CryptoCompare-like candle dicts.
+    """
+    columns = [array[field].tolist() for field in CANDLE_FIELDS]
+    return [dict(zip(CANDLE_FIELDS, values)) for values in zip(*columns)]
+
+
+def missing_ranges(times, start, end, step):
+    """
+    Finds the contiguous ranges of the time grid [start, end] not present in `times`.
+
+    Args:
+        times (np.ndarray): Sorted timestamps that are available.
+        start (int): First timestamp of the grid.
+        end (int): Last timestamp of the grid.
+        step (int): Grid step in seconds.
+
+    Returns:
+        list[tuple[int, int]]: Inclusive (first, last) timestamps of every gap.
+    """
+    grid = np.arange(start, end + 1, step, dtype=np.int64)
+    missing = ~np.isin(grid, times, assume_unique=True)
+    if not missing.any():
+        return []
+    edges = np.diff(np.concatenate(([False], missing, [False])).astype(np.int8))
+    firsts = grid[edges[:-1] == 1]
+    lasts = grid[np.flatnonzero(edges[1:] == -1)]
+    return list(zip(firsts.tolist(), lasts.tolist()))
+
+
+class CandleStore:
+    """
+    A directory of per-series candle files.
+
+    Attributes:
+        root (str): The directory holding the `.npy` files.
+        max_candles (int): The most candles kept per series, or None for no bound.
+
+    Methods:
+        path: Returns the file path of a series.
+        load: Returns all stored candles of a series.
+        open: Returns all stored candles of a series as a read-only memory map.
+        ref: Builds a history reference for a stored window and the open candle.
+        resolve: Returns the candles of a history reference.
+        is_ref: Tells a history reference from a list of candles.
+        merge: Adds candles to a series, replacing stored candles with the same time.
+        window: Returns stored candles within a time range.
+    """
+    def __init__(self, root, max_candles=None):
+        self.root = root
+        self.max_candles = max_candles
+        os.makedirs(root, exist_ok=True)
+        self._locks = defaultdict(threading.Lock)
+
+    def path(self, crypto, currency, time):
+        """
+        Returns the file path of a series.
+
+        Raises:
+            ValueError: If a symbol or interval contains anything but letters and digits.
+        """
+        for part in (crypto, currency, time):
+            if not _SYMBOL.match(part):
+                raise ValueError(f"Invalid series name part: {part!r}")
+        return os.path.join(self.root, f"{crypto.upper()}-{currency.upper()}-{time}.npy")
+
+    def load(self, crypto, currency, time):
+        """
+        Returns all stored candles of a series, or an empty array.
+        """
+        try:
+            return np.load(self.path(crypto, currency, time))
+        except FileNotFoundError:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+
+    def open(self, crypto, currency, time):
+        """
+        Returns all stored candles of a series as a read-only memory map, or an empty array.
+        """
+        try:
+            return np.load(self.path(crypto, currency, time), mmap_mode='r')
+        except FileNotFoundError:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+
+    @staticmethod
+    def ref(series, start, end, current, resample_to=None):
+        """
+        Builds a history reference: the stored candles in [start, end] of a series
+        followed by the still-open candles `current`.
+
+        Args:
+            series (tuple[str, str, str]): The (crypto, currency, time) of the series.
+            start (int): Time of the first stored candle.
+            end (int): Time of the last stored candle.
+            current (np.ndarray): The open candles as `CANDLE_DTYPE`.
+            resample_to (str, optional): A coarser interval the candles are merged into
+                when the reference is resolved, e.g. "4h" for an hourly series.
+
+        Returns:
+            dict: A JSON-serializable reference accepted by `resolve`.
+        """
+        crypto, currency, time = series
+        ref = {
+            "series": {"crypto": crypto, "currency": currency, "time": time},
+            "start": int(start),
+            "end": int(end),
+            "open": to_records(current),
+        }
+        if resample_to:
+            ref["resample"] = resample_to
+        return ref
+
+    def resolve(self, payload):
+        """
+        Returns the candles of a history reference as one structured array.
+
+        The stored window is sliced from the memory map without parsing, then copied
+        together with the open candles into the result, which is therefore not a view
+        of the file.
+
+        Args:
+            payload (dict): A reference built by `ref`.
+
+        Returns:
+            np.ndarray: The candles as `CANDLE_DTYPE`, oldest first, merged into the
+            interval named under "resample" if there is one.
+
+        Raises:
+            ValueError: If the reference is malformed.
+        """
+        try:
+            series = payload['series']
+            stored = self.open(series['crypto'], series['currency'], series['time'])
+            window = self.window(stored, int(payload['start']), int(payload['end']))
+            current = to_array(payload.get('open', []))
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Malformed history reference: {e}") from e
+        candles = np.concatenate((window, current))
+        if payload.get('resample'):
+            return resample(candles, payload['resample'])
+        return candles
+
+    @staticmethod
+    def is_ref(payload):
+        """
+        Returns True if a request payload is a history reference rather than candles.
+        """
+        return isinstance(payload, dict) and 'series' in payload
+
+    def merge(self, crypto, currency, time, candles):
+        """
+        Adds candles to a series. Stored candles with the same time are replaced, and
+        the oldest candles beyond `max_candles` are dropped.
+
+        Args:
+            crypto (str): The cryptocurrency symbol (e.g., "BTC").
+            currency (str): The fiat currency symbol (e.g., "USD").
+            time (str): The candle interval (e.g., "hour").
+            candles (np.ndarray): Candles as `CANDLE_DTYPE`.
+
+        Returns:
+            np.ndarray: All stored candles of the series after the merge.
+        """
+        path = self.path(crypto, currency, time)
+        with self._locks[path]:
+            combined = np.concatenate((candles, self.load(crypto, currency, time)))
+            _, first = np.unique(combined['time'], return_index=True)
+            merged = combined[first]
+            if self.max_candles is not None:
+                merged = merged[-self.max_candles:]
+            fd, tmp = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as file:
+                np.save(file, merged)
+            os.replace(tmp, path)
+            return merged
+
+    @staticmethod
+    def window(candles, start, end):
+        """
+        Returns the candles with `start <= time <= end`.
+        """
+        times = candles['time']
+        return candles[np.searchsorted(times, start):np.searchsorted(times, end, side='right')]
@@ -13,7 +13,49 @@ Environment Variables:
     - DATA_SERVICE_URL: data service url
     - ANALYTICS_SERVICE_URL: analyze url
     - PLOT_SERVICE_URL: plot url
-    - TTL: timeout
+    - CONNECT_TIMEOUT: timeout for establishing a connection in seconds
+    - READ_TIMEOUT: timeout for reading a response in seconds
+    - HTTP_POOL_CONNECTIONS: number of per-host connection pools kept by the shared session
+    - HTTP_POOL_MAXSIZE: maximum number of keep-alive connections per host
+    - HTTP_POOL_BLOCK: wait for a free connection instead of opening extra ones
+    - HTTP_RETRIES: number of retries for failed connections and 429/5xx responses; 500
+      responses of internal services are not retried
+    - HTTP_BACKOFF: backoff factor between retries in seconds
+    - GATEWAY_WORKERS: number of threads the gateway uses for concurrent downstream calls
+    - CACHE_MAXSIZE: maximum number of cached upstream responses
+    - LATEST_TTL: lifetime of cached latest prices in seconds
+    - LATEST_BATCH_WINDOW: seconds single-price requests wait to be merged into one call
+    - CANDLE_STORE_DIR: directory of the local candle store
+    - MAX_HISTORY_LIMIT: most base-interval candles one history request may cover; the
+      candle store keeps twice as many per series
+    - SHARED_CANDLE_STORE: the analytics and plot services can read CANDLE_STORE_DIR,
+      so the gateway passes them history references instead of candles
+    - BINARY_TRANSPORT: the gateway fetches candles from the data service and passes them
+      to the analytics and plot services as binary structured arrays instead of JSON
+    - PLOT_WORKERS: number of plot rendering processes (default: number of CPUs)
+    - PLOT_QUEUE_SIZE: number of renders that may wait for a free plot worker
+    - PLOT_RETRY_AFTER: Retry-After seconds sent when the plot queue is full
+    - PLOT_CACHE_MEMORY_BYTES: byte budget of the in-memory plot cache
+    - PLOT_CACHE_DIR: directory of the on-disk plot cache, shared by the plot service and bot
+    - PLOT_CACHE_DISK_BYTES: byte budget of the on-disk plot cache
+    - S3_POOL_CONNECTIONS: maximum number of pooled connections of the shared S3 client
+    - S3_MAX_ATTEMPTS: maximum attempts per S3 call with adaptive retries
+    - S3_PRESIGN_EXPIRY: lifetime of presigned plot URLs in seconds
+    - CRYPTOCURRENCIES: comma-separated symbols the bot offers, the default of multi-asset
+      routes and streams
+    - PREWARM_ENABLED: pre-warm reports for the bot's cryptocurrencies after each candle boundary
+    - PREWARM_INTERVALS: comma-separated candle intervals to pre-warm
+    - PREWARM_CONCURRENCY: number of reports pre-warmed at the same time
+    - PREWARM_JITTER: maximum random delay in seconds after a candle boundary
+    - PREWARM_LIMIT: number of candles per pre-warmed report, as requested by the bot
+    - PREWARM_CURRENCY: currency of the pre-warmed reports, as requested by the bot
+    - PRICE_FEED_ENABLED: poll the latest prices in the gateway and stream them to clients
+    - PRICE_FEED_FAKE: use a local random-walk price source instead of the data service
+    - PRICE_FEED_CURRENCY: currency of the streamed prices
+    - PRICE_FEED_INTERVAL: seconds between two price polls
+    - PRICE_STREAM_QUEUE_SIZE: updates buffered per stream client before the oldest is dropped
+    - PRICE_STREAM_KEEPALIVE: seconds between keep-alive comments on an idle stream
+    - PRICE_STREAM_MAX_EXTRA: symbols beyond the bot's cryptocurrencies streams may watch
 
 Usage:
     Simply import this module to access the loaded environment variables.
@@ -31,4 +73,44 @@ bucket = os.getenv("bucket")  # S3 Bucket name
 DATA_SERVICE_URL = "http://127.0.0.1:5001"
 ANALYTICS_SERVICE_URL = "http://127.0.0.1:5002"
 PLOT_SERVICE_URL = "http://127.0.0.1:5003"
-TTL=40
+CONNECT_TIMEOUT = float(os.getenv("CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("READ_TIMEOUT", "40"))
+TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+HTTP_POOL_BLOCK = os.getenv("HTTP_POOL_BLOCK", "false").lower() == "true"
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.3"))
+GATEWAY_WORKERS = int(os.getenv("GATEWAY_WORKERS", "16"))
+CACHE_MAXSIZE = int(os.getenv("CACHE_MAXSIZE", "512"))
+LATEST_TTL = int(os.getenv("LATEST_TTL", "5"))
+LATEST_BATCH_WINDOW = float(os.getenv("LATEST_BATCH_WINDOW", "0.02"))
+CANDLE_STORE_DIR = os.getenv(
+    "CANDLE_STORE_DIR", os.path.join(os.path.dirname(__file__), '..', 'data', 'candles'))
+MAX_HISTORY_LIMIT = int(os.getenv("MAX_HISTORY_LIMIT", "10000"))
+SHARED_CANDLE_STORE = os.getenv("SHARED_CANDLE_STORE", "true").lower() == "true"
+BINARY_TRANSPORT = os.getenv("BINARY_TRANSPORT", "true").lower() == "true"
+PLOT_WORKERS = int(os.getenv("PLOT_WORKERS", "0")) or None
+PLOT_QUEUE_SIZE = int(os.getenv("PLOT_QUEUE_SIZE", "16"))
+PLOT_RETRY_AFTER = int(os.getenv("PLOT_RETRY_AFTER", "1"))
+PLOT_CACHE_MEMORY_BYTES = int(os.getenv("PLOT_CACHE_MEMORY_BYTES", str(64 * 2**20)))
+PLOT_CACHE_DIR = os.getenv(
+    "PLOT_CACHE_DIR", os.path.join(os.path.dirname(__file__), '..', 'data', 'plots'))
+PLOT_CACHE_DISK_BYTES = int(os.getenv("PLOT_CACHE_DISK_BYTES", str(512 * 2**20)))
+S3_POOL_CONNECTIONS = int(os.getenv("S3_POOL_CONNECTIONS", "32"))
+S3_MAX_ATTEMPTS = int(os.getenv("S3_MAX_ATTEMPTS", "5"))
+S3_PRESIGN_EXPIRY = int(os.getenv("S3_PRESIGN_EXPIRY", "3600"))
+curr = os.getenv("CRYPTOCURRENCIES", "BTC,ETH,TON").split(",")
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "true").lower() == "true"
+PREWARM_INTERVALS = os.getenv("PREWARM_INTERVALS", "hour,day").split(",")
+PREWARM_CONCURRENCY = int(os.getenv("PREWARM_CONCURRENCY", "4"))
+PREWARM_JITTER = float(os.getenv("PREWARM_JITTER", "5"))
+PREWARM_LIMIT = int(os.getenv("PREWARM_LIMIT", "10"))
+PREWARM_CURRENCY = os.getenv("PREWARM_CURRENCY", "USD")
+PRICE_FEED_ENABLED = os.getenv("PRICE_FEED_ENABLED", "true").lower() == "true"
+PRICE_FEED_FAKE = os.getenv("PRICE_FEED_FAKE", "false").lower() == "true"
+PRICE_FEED_CURRENCY = os.getenv("PRICE_FEED_CURRENCY", "USD")
+PRICE_FEED_INTERVAL = float(os.getenv("PRICE_FEED_INTERVAL", "5"))
+PRICE_STREAM_QUEUE_SIZE = int(os.getenv("PRICE_STREAM_QUEUE_SIZE", "64"))
+PRICE_STREAM_KEEPALIVE = float(os.getenv("PRICE_STREAM_KEEPALIVE", "15"))
+PRICE_STREAM_MAX_EXTRA = int(os.getenv("PRICE_STREAM_MAX_EXTRA", "20"))
@@ -5,20 +5,315 @@ This module provides endpoints to fetch real-time and historical cryptocurrency
 from an external API. It uses a utility function `make_request` for making HTTP requests 
 to the external API and handles error responses gracefully.
 
+Upstream responses are kept in an in-process TTL/LRU cache. Latest prices expire after
+`LATEST_TTL` seconds, history stays valid until the current candle bucket rolls over.
+Concurrent cache misses for the same request share a single upstream call.
+
+Latest prices are fetched with CryptoCompare `pricemulti`: /latest returns many symbols
+from one upstream call, and single-symbol requests arriving within `LATEST_BATCH_WINDOW`
+are merged into one call. Every price of a response fills its own cache entry.
+
+Closed history candles are persisted in a local candle store. A history request only
+fetches the ranges missing from the store (using `toTs`) plus the still-open candle, so
+a window that is already stored costs one small upstream call per candle bucket.
+
+Coarser intervals ("15m", "4h", "1d", "1w") are not fetched upstream: they are merged
+from the stored candles of their base interval (minute, hour or day), so hourly candles
+fetched once serve "hour" and "4h" alike, and daily candles "day", "1d" and "1w".
+The upstream API keeps minute candles for about seven days only, so "minute" and "15m"
+requests beyond that depth are rejected. No request may cover more than
+`MAX_HISTORY_LIMIT` base candles, which bounds the upstream pages of one request and
+the candles the store keeps per series.
+
+/history accepts `points=N` to return at most N candles, merged into OHLC buckets or
+selected with LTTB (`method=ohlc|lttb`), for clients that chart long ranges.
+
+Internal clients that send `Accept: application/x-npy` receive /history as a binary
+structured candle array (see `api.wire`) instead of JSON records.
+
 Routes:
     - /latest/<crypto>/<currency>: Fetches the latest price for the cryptocurrency.
+    - /latest?fsyms=<cryptos>&tsyms=<currencies>: Fetches the latest prices of many
+      cryptocurrencies in many currencies with one upstream call.
     - /history/<crypto>/<time>/<currency>/<int:limit>: Fetches historical price data.
+    - /history_ref/<crypto>/<time>/<currency>/<int:limit>: Fetches a reference to
+      historical price data in the local candle store.
+    - /cache/stats: Returns the upstream cache, single-flight and latency counters.
 
 Dependencies:
     - `make_request`: A utility function for making HTTP requests.
+    - `TTLCache`: The in-process cache for upstream responses.
+    - `SingleFlight`: Deduplication of concurrent identical upstream requests.
+    - `Batcher`: Merging of concurrent single-price requests into `pricemulti` calls.
+    - `CandleStore`: The local store of closed candles.
     - `api_key`: The API key for accessing the external cryptocurrency API.
 """
 
-from flask import Flask, jsonify
+import numpy as np
+from flask import Flask, Response, jsonify, request
 from utils.make_request import make_request
-from api.config import api_key
+from utils.cache import TTLCache
+from utils.single_flight import SingleFlight
+from utils.batcher import Batcher
+from utils.http_session import latency_stats
+from utils.time_formater import (
+    base_interval, bucket_end, bucket_start, interval_seconds, max_limit
+)
+from api.candle_store import CandleStore, missing_ranges, to_array, to_records
+from api.downsample import check_downsampling, downsample_candles, resample
+from api.wire import NPY_TYPE, encode, wants_binary
+from api.config import (
+    api_key,
+    CACHE_MAXSIZE,
+    LATEST_TTL,
+    LATEST_BATCH_WINDOW,
+    CANDLE_STORE_DIR,
+    MAX_HISTORY_LIMIT
+)
+
+# Maximum number of candles CryptoCompare returns per history call.
+MAX_LIMIT = 2000
 
 app = Flask(__name__)
+cache = TTLCache(maxsize=CACHE_MAXSIZE, ttl=LATEST_TTL)
+flight = SingleFlight()
+# Twice the request bound, so a resampled window that starts mid-bucket still fits.
+store = CandleStore(CANDLE_STORE_DIR, max_candles=2 * MAX_HISTORY_LIMIT)
+
+
+def upstream_error(data):
+    """
+    Returns the error message of a failed upstream response, or None.
+    """
+    if isinstance(data, dict):
+        if "error" in data:
+            return data["error"]
+        if data.get("Response") == "Error":
+            return data.get("Message", "Upstream error")
+    return None
+
+
+def cached(key, fetch, ttl=None, expires_at=None):
+    """
+    Returns `fetch()` unless a valid cached result exists for `key`.
+
+    Concurrent misses for the same key wait for one call.
+
+    Args:
+        key: A hashable cache key.
+        fetch (callable): Produces the data on a miss.
+        ttl (float, optional): Lifetime of the cached result in seconds.
+        expires_at (float, optional): Absolute Unix time at which the result expires.
+
+    Returns:
+        The data, or a dictionary with an 'error' key. Errors are never cached.
+    """
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    def load():
+        data = fetch()
+        if upstream_error(data) is None:
+            cache.set(key, data, ttl=ttl, expires_at=expires_at)
+        return data
+    return flight.do(key, load)
+
+
+def cached_request(endpoint, params, ttl=None, expires_at=None):
+    """
+    Sends a request through `make_request` unless a valid cached response exists.
+
+    Concurrent misses for the same endpoint and parameters wait for one upstream call.
+
+    Args:
+        endpoint (str): The API endpoint to send the request to.
+        params (dict): Query parameters; `api_key` is not part of the cache key.
+        ttl (float, optional): Lifetime of the cached response in seconds.
+        expires_at (float, optional): Absolute Unix time at which the response expires.
+
+    Returns:
+        dict: The response data or a dictionary with an 'error' key.
+        Error responses are never cached.
+    """
+    key = (endpoint, tuple(sorted((k, v) for k, v in params.items() if k != 'api_key')))
+    return cached(key, lambda: make_request(endpoint=endpoint, params=params), ttl, expires_at)
+
+
+def price_key(crypto, currency):
+    """
+    Returns the cache key of the latest price of one cryptocurrency in one currency.
+    """
+    return ('price', (('fsym', crypto), ('tsyms', currency)))
+
+
+def fetch_prices(pairs):
+    """
+    Fetches the latest prices of (crypto, currency) pairs with one `pricemulti` call.
+
+    Every returned price is cached under its `price_key`.
+
+    Args:
+        pairs (list[tuple[str, str]]): The (crypto, currency) pairs.
+
+    Returns:
+        dict: For every pair, `{currency: price}` or a dictionary with an 'error' key.
+    """
+    params = {
+        'fsyms': ','.join(sorted({crypto for crypto, _ in pairs})),
+        'tsyms': ','.join(sorted({currency for _, currency in pairs})),
+        'api_key': api_key
+    }
+    data = make_request(endpoint='pricemulti', params=params)
+    error = upstream_error(data)
+    if error is not None:
+        return {pair: {"error": error} for pair in pairs}
+
+    results = {}
+    for crypto, currency in pairs:
+        price = data.get(crypto.upper(), {}).get(currency.upper())
+        if price is None:
+            results[(crypto, currency)] = {"error": f"No price for {crypto}/{currency}"}
+        else:
+            results[(crypto, currency)] = {currency: price}
+            cache.set(price_key(crypto, currency), {currency: price}, ttl=LATEST_TTL)
+    return results
+
+
+batcher = Batcher(fetch_prices, window=LATEST_BATCH_WINDOW)
+
+
+def fetch_range(crypto, currency, time, first, last):
+    """
+    Fetches the candles between `first` and `last` from upstream, paging with `toTs`.
+
+    Returns:
+        np.ndarray or dict: The candles sorted by time, or a dictionary with an 'error' key.
+    """
+    step = interval_seconds(time)
+    chunks = []
+    to_ts = last
+    while to_ts >= first:
+        limit = min((to_ts - first) // step, MAX_LIMIT)
+        params = {'fsym': crypto, 'tsym': currency, 'limit': max(limit, 1),
+                  'toTs': to_ts, 'api_key': api_key}
+        data = make_request(endpoint=f"v2/histo{time}", params=params)
+        error = upstream_error(data)
+        if error is not None:
+            return {"error": error}
+        chunks.append(to_array(data['Data']['Data']))
+        to_ts -= (limit + 1) * step
+    candles = np.sort(np.concatenate(chunks), order='time')
+    return CandleStore.window(candles, first, last)
+
+
+def ranges_to_fetch(times, start, end, step):
+    """
+    Returns the missing closed ranges in [start, end) plus the open candle at `end`.
+
+    The open candle is merged into the last gap when they are adjacent.
+    """
+    ranges = missing_ranges(times, start, end - step, step) if start < end else []
+    if ranges and ranges[-1][1] == end - step:
+        ranges[-1] = (ranges[-1][0], end)
+    else:
+        ranges.append((end, end))
+    return ranges
+
+
+def sync_history(crypto, currency, time, limit, now=None):
+    """
+    Makes sure the store holds the last `limit` closed candles of a series.
+
+    Stored candles are reused; only missing ranges and the open candle are fetched.
+    Only the stored window is read, from the memory map. Newly fetched closed candles
+    are added to the store.
+
+    Returns:
+        tuple or dict: The first and last closed candle time of the window and the
+        fetched open candles, or a dictionary with an 'error' key.
+    """
+    step = interval_seconds(time)
+    end = bucket_start(time, now)
+    start = end - limit * step
+    stored = CandleStore.window(store.open(crypto, currency, time), start, end - step)
+
+    fetched = []
+    for first, last in ranges_to_fetch(np.array(stored['time']), start, end, step):
+        candles = fetch_range(crypto, currency, time, first, last)
+        if isinstance(candles, dict):
+            return candles
+        fetched.append(candles)
+    fetched = np.concatenate(fetched)
+
+    closed = fetched[fetched['time'] < end]
+    if len(closed):
+        store.merge(crypto, currency, time, closed)
+    return start, end - step, fetched[fetched['time'] == end]
+
+
+def base_window(time, limit, now=None):
+    """
+    Returns the base interval of `time` and the number of its closed candles that
+    cover the last `limit` closed candles of `time`.
+    """
+    base = base_interval(time)
+    if base == time:
+        return base, limit
+    start = bucket_start(time, now) - limit * interval_seconds(time)
+    return base, (bucket_start(base, now) - start) // interval_seconds(base)
+
+
+def check_limit(time, limit):
+    """
+    Validates that `limit` candles need at most `MAX_HISTORY_LIMIT` base candles and that
+    the upstream history of the base interval covers them.
+
+    Raises:
+        ValueError: If `limit` is larger than either bound.
+    """
+    servable = MAX_HISTORY_LIMIT * interval_seconds(base_interval(time)) // interval_seconds(time)
+    if max_limit(time) is not None:
+        servable = min(servable, max_limit(time))
+    if limit > servable:
+        raise ValueError(f"limit must be at most {servable} for {time}")
+
+
+def load_history(crypto, currency, time, limit, now=None):
+    """
+    Returns the last `limit` closed candles and the open candle of a series.
+
+    Candles of a resampled interval are merged from the candles of its base interval.
+
+    Returns:
+        list[dict] or dict: The candles oldest first, or a dictionary with an 'error' key.
+    """
+    base, base_limit = base_window(time, limit, now)
+    synced = sync_history(crypto, currency, base, base_limit, now)
+    if isinstance(synced, dict):
+        return synced
+    start, end, current = synced
+    window = CandleStore.window(store.open(crypto, currency, base), start, end)
+    candles = np.concatenate((window, current))
+    return to_records(resample(candles, time) if base != time else candles)
+
+
+def history_ref(crypto, currency, time, limit, now=None):
+    """
+    Returns a reference to the last `limit` closed candles and the open candle of a
+    series, for services that read the candle store directly.
+
+    A resampled interval refers to its base series and is merged when resolved.
+
+    Returns:
+        dict: The reference built by `CandleStore.ref`, or a dictionary with an 'error' key.
+    """
+    base, base_limit = base_window(time, limit, now)
+    synced = sync_history(crypto, currency, base, base_limit, now)
+    if isinstance(synced, dict):
+        return synced
+    return CandleStore.ref((crypto, currency, base), *synced,
+                           resample_to=time if base != time else None)
 
 @app.route("/latest/<crypto>/<currency>", methods=["GET"])
 def get_latest(crypto, currency):
@@ -40,12 +335,52 @@ def get_latest(crypto, currency):
             }
         with a status code of 500.
     """
-    params = {'fsym': crypto, 'tsyms': currency, 'api_key': api_key}
-    data = make_request(endpoint='price', params=params)
+    data = cached(price_key(crypto, currency),
+                  lambda: batcher.get((crypto, currency)), ttl=LATEST_TTL)
     if "error" in data:
         return jsonify({"error": data["error"]}), 500
     return jsonify({crypto: f"{data[currency]} {currency}"}), 200
 
+@app.route("/latest", methods=["GET"])
+def get_latest_many():
+    """
+    Fetch the latest prices of several cryptocurrencies with one upstream call.
+
+    Query parameters:
+        - fsyms (str): Comma-separated cryptocurrency symbols, e.g. "BTC,ETH,TON".
+        - tsyms (str, optional): Comma-separated currency symbols. Defaults to "USD".
+
+    Cached prices are served from the cache; only the rest is fetched with `pricemulti`.
+
+    Returns:
+        Response: A JSON object in the format:
+            {
+                "BTC": {"USD": 34000.5},
+                "ETH": {"USD": 1800.2}
+            }
+        Prices the upstream API does not know are left out. If none can be fetched,
+        returns an error message with a 500 status code; without symbols, 400.
+    """
+    cryptos = [s for s in request.args.get('fsyms', '').split(',') if s]
+    currencies = [s for s in request.args.get('tsyms', 'USD').split(',') if s]
+    if not cryptos or not currencies:
+        return jsonify({"error": "fsyms and tsyms must name at least one symbol"}), 400
+
+    prices = {}
+    for pair in ((crypto, currency) for crypto in cryptos for currency in currencies):
+        prices[pair] = cache.get(price_key(*pair))
+    missing = [pair for pair, data in prices.items() if data is None]
+    if missing:
+        prices.update(fetch_prices(missing))
+
+    result = {}
+    for (crypto, currency), data in prices.items():
+        if "error" not in data:
+            result.setdefault(crypto, {})[currency] = data[currency]
+    if not result:
+        return jsonify({"error": next(iter(prices.values()))["error"]}), 500
+    return jsonify(result), 200
+
 @app.route("/history/<crypto>/<time>/<currency>/<int:limit>", methods=["GET"])
 def get_history(crypto, time, currency, limit):
     """
@@ -53,28 +388,112 @@ def get_history(crypto, time, currency, limit):
 
     Args:
         crypto (str): The cryptocurrency symbol (e.g., "BTC").
-        time (str): The time interval for the historical data (e.g., "minute", "hour", "day").
+        time (str): The time interval for the historical data (e.g., "minute", "hour", "day"),
+            or a resampled interval ("15m", "4h", "1d", "1w").
         currency (str): The fiat currency symbol (e.g., "USD").
         limit (int): The number of historical records to fetch.
 
+    Query parameters:
+        - points (int, optional): Return at most this many candles.
+        - method (str, optional): "ohlc" (default) merges runs of candles, keeping
+          first open, highest high, lowest low, last close and summed volumes;
+          "lttb" keeps the candles that preserve the shape of the close line.
+
+    Closed candles come from the local store when available; only missing ranges
+    and the still-open candle are fetched from the external API.
+
     Returns:
-        Response: A JSON object containing the historical price data. The structure depends on 
-        the external API's response. Example:
+        Response: A JSON object containing the historical price data. Example:
             [
                 {"time": <timestamp>, "open": <price>, "close": <price>, ...},
                 ...
             ]
+        or, if the Accept header prefers "application/x-npy", the candles as `.npy`
+        bytes of a structured array (see `api.wire`).
         In case of an error, returns:
             {
                 "error": "<error_message>"
             }
-        with a status code of 500.
+        with a status code of 500, or 400 for invalid parameters.
     """
-    params = {'fsym': crypto, 'tsym': currency, 'limit': limit, 'api_key': api_key}
-    data = make_request(endpoint=f"v2/histo{time}", params=params)
-    if "error" in data:
-        return jsonify({"error": data["error"]}), 500
-    return jsonify(data['Data']['Data']), 200
+    points = request.args.get('points', type=int)
+    method = request.args.get('method', 'ohlc')
+    try:
+        expires_at = bucket_end(time)
+        store.path(crypto, currency, time)
+        check_limit(time, limit)
+        if points is not None:
+            check_downsampling(points, method)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    key = ('history', crypto, currency, time, limit)
+    data = cached(key, lambda: load_history(crypto, currency, time, limit), expires_at=expires_at)
+    error = upstream_error(data)
+    if error is not None:
+        return jsonify({"error": error}), 500
+    if points is not None:
+        key, full = key + (points, method), data
+        data = cached(
+            key,
+            lambda: to_records(downsample_candles(to_array(full), points, method)),
+            expires_at=expires_at
+        )
+    if wants_binary(request):
+        body = cached(key + (NPY_TYPE,), lambda: encode(to_array(data)), expires_at=expires_at)
+        return Response(body, mimetype=NPY_TYPE), 200
+    return jsonify(data), 200
+
+@app.route("/history_ref/<crypto>/<time>/<currency>/<int:limit>", methods=["GET"])
+def get_history_ref(crypto, time, currency, limit):
+    """
+    Fetch a reference to historical price data in the local candle store.
+
+    Works like /history, but returns where the closed candles are stored instead of the
+    candles themselves. Services sharing `CANDLE_STORE_DIR` resolve it with
+    `CandleStore.resolve` and read the window from a memory map.
+
+    Returns:
+        Response: A JSON object in the format:
+            {
+                "series": {"crypto": "BTC", "currency": "USD", "time": "hour"},
+                "start": 1698246000,
+                "end": 1698278400,
+                "open": [{"time": 1698282000, "high": 100, "low": 95, ...}]
+            }
+        If an error occurs, returns an error message with a 400 or 500 status code.
+    """
+    try:
+        expires_at = bucket_end(time)
+        store.path(crypto, currency, time)
+        check_limit(time, limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    data = cached(
+        ('history_ref', crypto, currency, time, limit),
+        lambda: history_ref(crypto, currency, time, limit),
+        expires_at=expires_at
+    )
+    error = upstream_error(data)
+    if error is not None:
+        return jsonify({"error": error}), 500
+    return jsonify(data), 200
+
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    """
+    Return the upstream cache, single-flight, price batching and latency counters.
+
+    Returns:
+        Response: A JSON object with the cache size, hits, misses, evictions and hit rate,
+        the executed and shared upstream calls under "single_flight", the merged price
+        requests under "price_batches" and the p50/p99 upstream latency under "latency".
+    """
+    return jsonify({
+        **cache.stats(),
+        "single_flight": flight.stats(),
+        "price_batches": batcher.stats(),
+        "latency": latency_stats(),
+    }), 200
 
 if __name__ == "__main__":
     app.run(debug=False, port=5001)
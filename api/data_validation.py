@@ -1,30 +1,87 @@
 """
 Data Validation Utility
 
-This module provides a utility function for validating and transforming cryptocurrency 
-data fetched from an API. The data is converted into a Pandas DataFrame with a specific 
+This module provides a utility function for validating and transforming cryptocurrency
+data fetched from an API. The data is converted into a Pandas DataFrame with a specific
 format based on the provided time interval.
 
+The records are converted column-wise: each required field is pulled into a NumPy array
+without building intermediate rows, and timestamps are formatted with vectorized lookups.
+Structured candle arrays, e.g. windows memory-mapped from the candle store, are used
+column by column without any per-record work.
+
 Functionality:
     - Convert raw JSON data into a structured Pandas DataFrame.
     - Validate the presence of required fields and handle empty data gracefully.
 """
 
-from datetime import datetime
+import time as _time
+from operator import itemgetter
+
+import numpy as np
 import pandas as pd
 from flask import jsonify
 
-def validate_data(data, time=None):
+REQUIRED_FIELDS = ('time', 'high', 'low', 'close')
+OPTIONAL_FIELDS = ('open', 'volumefrom', 'volumeto')
+
+# '%H:%M' labels for every minute of the day, indexed by minute-of-day.
+CLOCK_LABELS = np.array([f"{h:02d}:{m:02d}" for h in range(24) for m in range(60)], dtype=object)
+
+
+def _local_offsets(timestamps):
+    """
+    Returns the local UTC offset in seconds for each timestamp.
+
+    The offset is computed once when it does not change over the window, and per
+    timestamp only when the window crosses a daylight saving time transition.
+    """
+    first = _time.localtime(int(timestamps[0])).tm_gmtoff
+    last = _time.localtime(int(timestamps[-1])).tm_gmtoff
+    if first == last:
+        return first
+    return np.array([_time.localtime(int(t)).tm_gmtoff for t in timestamps], dtype=np.int64)
+
+
+def format_timestamps(timestamps, time=None):
+    """
+    Formats Unix timestamps in local time for the given interval.
+
+    Labels are looked up rather than formatted per record: '%H:%M' comes from a table
+    of the 1440 minutes of a day, '%Y-%m-%d' is formatted once per distinct day.
+
+    Args:
+        timestamps (np.ndarray): Unix timestamps as int64.
+        time (str, optional): 'hour' for '%H:%M', 'day' for '%Y-%m-%d',
+                              anything else keeps the Unix timestamps as they are.
+
+    Returns:
+        np.ndarray: The formatted timestamps as an object array of strings,
+        or the int64 timestamps themselves.
+    """
+    if time not in ('hour', 'day'):
+        return timestamps
+
+    local = timestamps + _local_offsets(timestamps)
+    if time == 'hour':
+        return CLOCK_LABELS[(local // 60) % 1440]
+    days = local // 86400
+    first = days.min()
+    labels = np.arange(first, days.max() + 1).astype('datetime64[D]')
+    return np.datetime_as_string(labels).astype(object)[days - first]
+
+
+def validate_data(data, time=None, extra_fields=()):
     """
     Validate and transform cryptocurrency data.
 
-    This function checks the integrity of the provided cryptocurrency data and 
-    converts it into a structured Pandas DataFrame. It also formats the timestamp 
+    This function checks the integrity of the provided cryptocurrency data and
+    converts it into a structured Pandas DataFrame. It also formats the timestamp
     into human-readable formats based on the specified time interval.
 
     Args:
-        data (list[dict]): The raw cryptocurrency data to validate. Each dictionary 
-                           represents a record with the fields:
+        data (list[dict] | np.ndarray): The raw cryptocurrency data to validate, either
+                           dictionaries or a structured array with the fields:
                            - 'time' (int): Unix timestamp of the record.
                            - 'high' (float): The highest price during the interval.
                            - 'low' (float): The lowest price during the interval.
@@ -33,10 +90,13 @@ def validate_data(data, time=None):
                               - 'hour': Formats time as '%H:%M'.
                               - 'day': Formats time as '%Y-%m-%d'.
                               - None: Keeps the Unix timestamp as is.
+        extra_fields (tuple[str], optional): Fields from `OPTIONAL_FIELDS` to include
+                              as additional columns, e.g. ('volumefrom', 'volumeto').
 
     Returns:
         tuple:
-            - pd.DataFrame: A structured DataFrame with columns ['time', 'high', 'low', 'close'].
+            - pd.DataFrame: A structured DataFrame with columns ['time', 'high', 'low', 'close']
+              followed by the requested extra fields.
             - Response: A Flask JSON response with an error message if the data is invalid.
 
     Example:
@@ -57,18 +117,58 @@ def validate_data(data, time=None):
 
     Notes:
         - If the input data is empty, the function returns a Flask JSON error response.
+        - If a record is missing a required field or holds a non-numeric value,
+          the function returns a Flask JSON error response with status 400.
+    """
+    if isinstance(data, np.ndarray):
+        return _validate_array(data, time, extra_fields)
+    if not data:
+        return None, jsonify({"error": "No data provided"})
+    if not isinstance(data, list):
+        return None, (jsonify({"error": "Data must be a list of records"}), 400)
+
+    try:
+        columns = _record_columns(data, REQUIRED_FIELDS + tuple(extra_fields))
+    except ValueError as e:
+        return None, (jsonify({"error": str(e)}), 400)
+    if not all(np.isfinite(column).all() for column in columns.values()):
+        return None, (jsonify({"error": "Data contains empty or non-finite values"}), 400)
+
+    columns['time'] = format_timestamps(columns['time'].astype(np.int64), time)
+    return pd.DataFrame(columns), None
+
+
+def _record_columns(data, fields):
+    """
+    Pulls `fields` out of a list of records as float64 columns.
+
+    Raises:
+        ValueError: If a field is missing, malformed or non-numeric.
     """
-    df = pd.DataFrame([
-        {
-            "time": datetime.fromtimestamp(info['time']).strftime(
-                '%H:%M' if time == 'hour' else '%Y-%m-%d' if time == 'day' else str(info['time'])),
-            "high": info['high'],
-            "low": info['low'],
-            "close": info['close']
+    try:
+        return {
+            field: np.fromiter(map(itemgetter(field), data), dtype=np.float64, count=len(data))
+            for field in fields
         }
-        for info in data
-    ])
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Missing or malformed field: {e}") from e
+    except ValueError as e:
+        raise ValueError(f"Non-numeric value: {e}") from e
 
-    if df.empty:
+
+def _validate_array(data, time, extra_fields):
+    """
+    `validate_data` for a structured candle array.
+    """
+    if len(data) == 0:
         return None, jsonify({"error": "No data provided"})
-    return df, None
+    fields = REQUIRED_FIELDS + tuple(extra_fields)
+    missing = [field for field in fields if field not in (data.dtype.names or ())]
+    if missing:
+        return None, (jsonify({"error": f"Missing or malformed field: {missing[0]!r}"}), 400)
+
+    columns = {field: data[field] for field in fields[1:]}
+    if not all(np.isfinite(column).all() for column in columns.values()):
+        return None, (jsonify({"error": "Data contains empty or non-finite values"}), 400)
+    return pd.DataFrame(
+        {'time': format_timestamps(data['time'].astype(np.int64), time), **columns}), None
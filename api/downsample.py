@@ -0,0 +1,215 @@
+"""
+Series Downsampling
+
+This module picks the points of a long series that are worth drawing, so a window of
+thousands of candles is drawn with a few hundred points and renders as fast as a short
+one while keeping its visual shape.
+
+`lttb` and `minmax` return sorted indices into the input, so every column of a candle
+window can be sliced with the same selection. `ohlc_buckets` instead merges runs of
+candles into coarser candles, which keeps the extremes, the first open, the last close
+and the total volume of the window exactly. `resample` merges candles the same way, but
+by calendar bucket, to build coarser intervals such as "4h" from hourly candles.
+
+Functions:
+    - lttb: Largest-Triangle-Three-Buckets selection for lines.
+    - minmax: Minimum and maximum of every bucket, for bars and spiky series.
+    - aggregate: Merges runs of candles into one candle each.
+    - ohlc_buckets: Merges a candle window into a given number of equal runs.
+    - resample: Merges candles into the buckets of a coarser interval.
+    - check_downsampling: Validates the `points` and `method` request parameters.
+    - downsample_candles: Reduces a candle window with LTTB or OHLC buckets.
+"""
+import numpy as np
+
+from utils.time_formater import interval_offset, interval_seconds
+
+METHODS = ('ohlc', 'lttb')
+
+
+def _next_means(values, edges):
+    # The mean of the bucket after each bucket; the last point after the last bucket.
+    total = np.concatenate(([0.0], np.cumsum(values)))
+    means = (total[edges[1:]] - total[edges[:-1]]) / np.diff(edges)
+    return np.append(means[1:], values[-1])
+
+
+def lttb(x, y, points):
+    """
+    Selects `points` indices with the Largest-Triangle-Three-Buckets algorithm.
+
+    The first and last points are kept. The points in between are split into
+    `points - 2` buckets, and from each bucket the point forming the largest triangle
+    with the point selected before it and the mean of the next bucket is kept. Bucket
+    means come from cumulative sums and every bucket is one vectorized NumPy step, so
+    Python only loops over the output points.
+
+    Args:
+        x (np.ndarray): The x values, e.g. timestamps, in ascending order.
+        y (np.ndarray): The finite y values.
+        points (int): The number of points to keep.
+
+    Returns:
+        np.ndarray: The selected indices, ascending; all indices if the series is not
+        longer than `points`.
+    """
+    length = len(y)
+    if points >= length or points < 3:
+        return np.arange(length)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    edges = np.linspace(1, length - 1, points - 1).astype(np.int64)
+    next_x, next_y = _next_means(x, edges), _next_means(y, edges)
+
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, length - 1
+    previous = 0
+    for bucket in range(points - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        area = np.abs(
+            (x[previous] - next_x[bucket]) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (next_y[bucket] - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def minmax(y, points):
+    """
+    Selects the minimum and the maximum of `points // 2` equal buckets.
+
+    Every spike survives, which makes this the selection for volume bars. All buckets
+    are reduced at once over a padded `(buckets, bucket size)` index matrix.
+
+    Args:
+        y (np.ndarray): The finite values.
+        points (int): The maximum number of points to keep.
+
+    Returns:
+        np.ndarray: The selected indices, ascending and unique; all indices if the
+        series is not longer than `points`.
+    """
+    length = len(y)
+    if points >= length or points < 2:
+        return np.arange(length)
+    y = np.asarray(y, dtype=float)
+
+    edges = np.linspace(0, length, points // 2 + 1).astype(np.int64)
+    index = edges[:-1, None] + np.arange(np.diff(edges).max())[None, :]
+    padded = index >= edges[1:, None]
+    index = np.minimum(index, length - 1)
+    low = np.where(padded, np.inf, y[index]).argmin(axis=1)
+    high = np.where(padded, -np.inf, y[index]).argmax(axis=1)
+    rows = np.arange(len(index))
+    return np.unique(np.concatenate((index[rows, low], index[rows, high])))
+
+
+def aggregate(candles, starts):
+    """
+    Merges runs of candles into one candle per run.
+
+    Each run takes the time and open of its first candle, the highest high, the lowest
+    low, the close of its last candle and the summed volumes. Every field is reduced
+    for all runs at once with `np.ufunc.reduceat`.
+
+    Args:
+        candles (np.ndarray): Candles as a structured array, oldest first.
+        starts (np.ndarray): The ascending index of the first candle of each run;
+            the first run starts at 0.
+
+    Returns:
+        np.ndarray: One candle per run, with the dtype of `candles`.
+    """
+    result = np.empty(len(starts), dtype=candles.dtype)
+    last = np.append(starts[1:], len(candles)) - 1
+    for field in candles.dtype.names:
+        column = candles[field]
+        if field == 'high':
+            result[field] = np.maximum.reduceat(column, starts)
+        elif field == 'low':
+            result[field] = np.minimum.reduceat(column, starts)
+        elif field == 'close':
+            result[field] = column[last]
+        elif field.startswith('volume'):
+            result[field] = np.add.reduceat(column, starts)
+        else:
+            result[field] = column[starts]
+    return result
+
+
+def ohlc_buckets(candles, points):
+    """
+    Merges a candle window into `points` runs of equal length.
+
+    Args:
+        candles (np.ndarray): Candles as a structured array, oldest first.
+        points (int): The number of candles to return.
+
+    Returns:
+        np.ndarray: The merged candles; the window itself if it is not longer than `points`.
+    """
+    if points >= len(candles) or points < 1:
+        return candles
+    return aggregate(candles, np.linspace(0, len(candles), points + 1).astype(np.int64)[:-1])
+
+
+def resample(candles, time):
+    """
+    Merges candles into the buckets of a coarser interval.
+
+    Args:
+        candles (np.ndarray): Candles of a finer interval as a structured array,
+            oldest first.
+        time (str): The target interval (e.g., "4h", "1w").
+
+    Returns:
+        np.ndarray: One candle per non-empty bucket, timed at the bucket start.
+
+    Raises:
+        ValueError: If the interval is not supported.
+    """
+    step, offset = interval_seconds(time), interval_offset(time)
+    if candles.size == 0:
+        return candles
+    buckets = (candles['time'] - offset) // step
+    starts = np.flatnonzero(np.diff(buckets, prepend=buckets[0] - 1))
+    result = aggregate(candles, starts)
+    result['time'] = buckets[starts] * step + offset
+    return result
+
+
+def check_downsampling(points, method='ohlc'):
+    """
+    Validates a requested number of points and downsampling method.
+
+    Raises:
+        ValueError: If `points` is too small for the method or the method is unknown.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}. Available: {', '.join(METHODS)}")
+    if points < (3 if method == 'lttb' else 1):
+        raise ValueError(f"points must be at least {3 if method == 'lttb' else 1} for {method}")
+
+
+def downsample_candles(candles, points, method='ohlc'):
+    """
+    Reduces a candle window to at most `points` candles.
+
+    Args:
+        candles (np.ndarray): Candles as a structured array, oldest first.
+        points (int): The maximum number of candles to return.
+        method (str): "ohlc" merges runs of candles with `ohlc_buckets`; "lttb" keeps
+            the candles `lttb` selects on the close prices.
+
+    Returns:
+        np.ndarray: The reduced window.
+
+    Raises:
+        ValueError: If `points` is too small for the method or the method is unknown.
+    """
+    check_downsampling(points, method)
+    if method == 'lttb':
+        return candles[lttb(candles['time'], candles['close'], points)]
+    return ohlc_buckets(candles, points)
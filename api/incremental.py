@@ -0,0 +1,306 @@
+"""
+Incremental Analytics State
+
+This module keeps running analytics state per `(crypto, currency, time)` series, so a new
+history window that differs from the previous one by a few candles updates the
+statistics in O(log n) per candle instead of recomputing them over the whole payload.
+
+Structures:
+    - SlidingMedian: Two heaps with lazy deletion for the median of a sliding window.
+    - RollingWindow: Sliding window of candles with running sums for mean and variance,
+      monotonic deques for min/max and a `SlidingMedian` for the median.
+    - IncrementalAnalytics: Registry of rolling windows keyed by series and window size.
+
+Notes:
+    The last candle of a CryptoCompare history window is still open and keeps changing
+    until its bucket closes. It is held as a pending candle that can be replaced; only
+    closed candles enter the monotonic deques.
+"""
+import heapq
+import threading
+from collections import deque
+
+import numpy as np
+
+
+class SlidingMedian:
+    """
+    The median of a multiset that supports insertion and removal in O(log n).
+
+    The lower half is a max-heap and the upper half a min-heap. Removed values are
+    recorded and dropped lazily once they reach the top of their heap; when stale
+    entries make the heaps twice as large as the multiset, they are rebuilt.
+    """
+    def __init__(self):
+        self._low = []   # max-heap of the lower half, stored negated
+        self._high = []  # min-heap of the upper half
+        self._delayed = {}  # value -> removals not yet popped from a heap
+        self._low_size = 0
+        self._high_size = 0
+
+    def _prune(self, heap, sign):
+        while heap:
+            value = sign * heap[0]
+            count = self._delayed.get(value, 0)
+            if not count:
+                return
+            if count == 1:
+                del self._delayed[value]
+            else:
+                self._delayed[value] = count - 1
+            heapq.heappop(heap)
+
+    def _compact(self):
+        size = self._low_size + self._high_size
+        if len(self._low) + len(self._high) <= 2 * size + 8:
+            return
+        values = []
+        for value in sorted([-v for v in self._low] + self._high):
+            count = self._delayed.get(value, 0)
+            if count:
+                self._delayed[value] = count - 1
+            else:
+                values.append(value)
+        self._delayed.clear()
+        self._low = [-v for v in values[:self._low_size]]
+        heapq.heapify(self._low)
+        self._high = values[self._low_size:]
+
+    def _balance(self):
+        if self._low_size > self._high_size + 1:
+            heapq.heappush(self._high, -heapq.heappop(self._low))
+            self._low_size -= 1
+            self._high_size += 1
+            self._prune(self._low, -1)
+        elif self._low_size < self._high_size:
+            heapq.heappush(self._low, -heapq.heappop(self._high))
+            self._high_size -= 1
+            self._low_size += 1
+            self._prune(self._high, 1)
+
+    def add(self, value):
+        """
+        Adds a value.
+        """
+        if not self._low or value <= -self._low[0]:
+            heapq.heappush(self._low, -value)
+            self._low_size += 1
+        else:
+            heapq.heappush(self._high, value)
+            self._high_size += 1
+        self._balance()
+
+    def remove(self, value):
+        """
+        Removes one occurrence of a value that was previously added.
+        """
+        self._delayed[value] = self._delayed.get(value, 0) + 1
+        if value <= -self._low[0]:
+            self._low_size -= 1
+            if value == -self._low[0]:
+                self._prune(self._low, -1)
+        else:
+            self._high_size -= 1
+            if value == self._high[0]:
+                self._prune(self._high, 1)
+        self._balance()
+        self._compact()
+
+    def median(self):
+        """
+        Returns the median of the current values.
+        """
+        if self._low_size > self._high_size:
+            return -self._low[0]
+        return (-self._low[0] + self._high[0]) / 2
+
+
+class RollingWindow:
+    """
+    Statistics over the last `size` candles, updated one candle at a time.
+
+    Attributes:
+        size (int): The number of candles in the window.
+        candles (deque): The (time, high, low, close) tuples in the window, oldest first.
+
+    Methods:
+        append: Adds a new candle and evicts the oldest one once the window is full.
+        replace_last: Replaces the still-open last candle.
+        stats: Returns average, median, min and max as computed by `/analytics`.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.candles = deque()
+        self._median = SlidingMedian()
+        self._sums = [0.0, 0.0]    # sum and sum of squares of close prices
+        self._min_low = deque()    # (index, low), increasing lows
+        self._max_high = deque()   # (index, high), decreasing highs
+        self._next_index = 0
+
+    @property
+    def last_time(self):
+        """
+        The timestamp of the newest candle, or None for an empty window.
+        """
+        return self.candles[-1][0] if self.candles else None
+
+    @property
+    def variance(self):
+        """
+        The population variance of close prices in the window.
+        """
+        count = len(self.candles)
+        mean = self._sums[0] / count
+        return max(self._sums[1] / count - mean * mean, 0.0)
+
+    def _add_close(self, close):
+        self._median.add(close)
+        self._sums[0] += close
+        self._sums[1] += close * close
+
+    def _remove_close(self, close):
+        self._median.remove(close)
+        self._sums[0] -= close
+        self._sums[1] -= close * close
+
+    def _commit_last(self):
+        # The previous last candle is closed now, so it can enter the monotonic deques.
+        _, high, low, _ = self.candles[-1]
+        index = self._next_index - 1
+        while self._min_low and self._min_low[-1][1] >= low:
+            self._min_low.pop()
+        self._min_low.append((index, low))
+        while self._max_high and self._max_high[-1][1] <= high:
+            self._max_high.pop()
+        self._max_high.append((index, high))
+
+    def append(self, time, high, low, close):
+        """
+        Adds a new candle; the previous last candle is treated as closed.
+        """
+        if self.candles:
+            self._commit_last()
+        self.candles.append((time, high, low, close))
+        self._next_index += 1
+        self._add_close(close)
+
+        if len(self.candles) > self.size:
+            self._remove_close(self.candles.popleft()[3])
+            first_index = self._next_index - len(self.candles)
+            for monotonic in (self._min_low, self._max_high):
+                while monotonic and monotonic[0][0] < first_index:
+                    monotonic.popleft()
+
+    def replace_last(self, high, low, close):
+        """
+        Replaces the values of the still-open last candle.
+        """
+        time, _, _, old_close = self.candles[-1]
+        self._remove_close(old_close)
+        self.candles[-1] = (time, high, low, close)
+        self._add_close(close)
+
+    def stats(self):
+        """
+        Returns the statistics in the format of the `/analytics` response.
+        """
+        _, last_high, last_low, _ = self.candles[-1]
+        low = min(self._min_low[0][1], last_low) if self._min_low else last_low
+        high = max(self._max_high[0][1], last_high) if self._max_high else last_high
+        return {
+            "average": round(self._sums[0] / len(self.candles), 3),
+            "median": round(self._median.median(), 3),
+            "min": round(low, 3),
+            "max": round(high, 3),
+        }
+
+
+def _candle(info):
+    return info['time'], float(info['high']), float(info['low']), float(info['close'])
+
+
+class IncrementalAnalytics:
+    """
+    Rolling analytics state per series and window size.
+
+    Methods:
+        update: Syncs the state with a history payload and returns its statistics.
+        stats: Returns the number of full rebuilds and incremental updates.
+    """
+    def __init__(self, max_series=256):
+        self.max_series = max_series
+        self._windows = {}
+        self._lock = threading.Lock()
+        self.counters = {"rebuilds": 0, "updates": 0, "candles_applied": 0}
+
+    def _rebuild(self, key, data):
+        window = RollingWindow(len(data))
+        for info in data:
+            window.append(*_candle(info))
+        if key not in self._windows and len(self._windows) >= self.max_series:
+            self._windows.pop(next(iter(self._windows)))
+        self._windows[key] = window
+        self.counters["rebuilds"] += 1
+        return window
+
+    def update(self, series, data):
+        """
+        Brings the state of `series` in line with a history payload.
+
+        Only candles newer than or equal to the last known one are applied. A full
+        rebuild happens on the first call, when the window size changes, or when the
+        payload does not continue the known window.
+
+        Args:
+            series (str): The series key, e.g. "BTC:USD:hour".
+            data (list[dict] | np.ndarray): The history payload, oldest candle first.
+
+        Returns:
+            dict: average, median, min and max of the payload.
+
+        Raises:
+            ValueError: If the payload is empty or a touched record is malformed.
+        """
+        if not isinstance(data, (list, np.ndarray)) or len(data) == 0:
+            raise ValueError("No data provided")
+        try:
+            with self._lock:
+                key = (series, len(data))
+                window = self._windows.get(key)
+                start = self._find_continuation(window, data)
+                if start is None:
+                    window = self._rebuild(key, data)
+                else:
+                    self._apply(window, data[start:])
+                return window.stats()
+        except (KeyError, TypeError, ValueError) as e:
+            self._windows.pop((series, len(data)), None)
+            raise ValueError(f"Missing or malformed field: {e}") from e
+
+    @staticmethod
+    def _find_continuation(window, data):
+        # Index of the first payload candle at or after the last known one, scanning
+        # backwards so only the new tail of the payload is touched.
+        if window is None:
+            return None
+        last_time = window.last_time
+        index = len(data) - 1
+        while index >= 0 and data[index]['time'] > last_time:
+            index -= 1
+        if index < 0 or data[index]['time'] != last_time:
+            return None
+        return index
+
+    def _apply(self, window, tail):
+        window.replace_last(*_candle(tail[0])[1:])
+        for info in tail[1:]:
+            window.append(*_candle(info))
+        self.counters["updates"] += 1
+        self.counters["candles_applied"] += len(tail)
+
+    def stats(self):
+        """
+        Returns the number of tracked series, rebuilds and incremental updates.
+        """
+        with self._lock:
+            return {"series": len(self._windows), **self.counters}
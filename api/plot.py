@@ -3,35 +3,95 @@ Plot Generation Module
 
 This module provides an API endpoint to generate and upload cryptocurrency price trend plots. 
 It uses Matplotlib for generating plots and uploads the resulting images to an S3 bucket.
+Rendered plots are kept in a local memory and disk cache in front of S3, so S3 is only
+asked whether a plot exists when the plot is not cached locally. Only the answer of that
+HEAD request is cached: the service returns presigned URLs and never downloads plots.
+
+With `points=N`, the close line is reduced to at most N points with LTTB before it is
+sent to a worker; such plots are stored under their own S3 key. The renderer never draws
+more than `MAX_POINTS` points, so larger values are rejected.
+
+Plots are rendered in a pool of worker processes. The number of pending renders is
+bounded; when the queue is full, or a crashed worker took the job down with it, the
+service answers 503 with a Retry-After header.
 
 Functionality:
     - Validate and preprocess cryptocurrency data.
     - Generate a time-series plot of close prices.
     - Upload the generated plot image to an S3 bucket.
+    - Return a presigned URL of the plot, so clients download it from S3 directly.
 
 Dependencies:
     - `S3Client`: Utility for interacting with AWS S3.
     - `validate_data`: Function to validate and preprocess input data.
-    - `matplotlib`: Library for creating visualizations.
+    - `PlotWorkerPool`: Worker processes rendering with `PlotRenderer`.
+    - `PlotCache`: Local memory and disk cache of plot images.
 
 Routes:
     - /plot/<crypto>/<time> [POST]: Accepts JSON data to generate a plot and uploads it to S3.
+      The JSON may also be a history reference, read from the memory-mapped candle store,
+      and the candles may be sent as a binary structured array (see `api.wire`).
+    - /chart/<time> [POST]: Accepts the histories of several cryptocurrencies and renders
+      them in one chart with an optional overlay and volume and volatility panels.
+    - /plot/stats [GET]: Returns render queue, render time and plot cache metrics.
 """
 from datetime import datetime
 import io
-import matplotlib.pyplot as plt
-import matplotlib
 from flask import Flask, jsonify, request
 
 from utils.s3_client import S3Client
+from utils.plot_cache import PlotCache, plot_key, chart_key
+from api.candle_store import CandleStore
 from api.data_validation import validate_data
-from api.config import s3_key_id, s3_key_pass, bucket
-
-matplotlib.use('Agg')  # Use non-interactive backend for server-side rendering
+from api.plot_workers import PlotWorkerPool, QueueFull, WorkerCrashed
+from api.renderer import MAX_POINTS, Chart, Series, check_chart
+from api.indicators import DEFAULT_WINDOW
+from api.downsample import check_downsampling, lttb
+from api.wire import request_payload, request_payloads
+from api.config import (
+    s3_key_id,
+    s3_key_pass,
+    bucket,
+    CANDLE_STORE_DIR,
+    PLOT_WORKERS,
+    PLOT_QUEUE_SIZE,
+    PLOT_RETRY_AFTER,
+    PLOT_CACHE_MEMORY_BYTES,
+    PLOT_CACHE_DIR,
+    PLOT_CACHE_DISK_BYTES
+)
 
-s3_client = S3Client(aws_access_key_id=s3_key_id, aws_secret_access_key=s3_key_pass)
+s3_client = S3Client.shared(aws_access_key_id=s3_key_id, aws_secret_access_key=s3_key_pass)
+store = CandleStore(CANDLE_STORE_DIR)
+workers = PlotWorkerPool(processes=PLOT_WORKERS, max_queue=PLOT_QUEUE_SIZE)
+plot_cache = PlotCache(PLOT_CACHE_MEMORY_BYTES, PLOT_CACHE_DIR, PLOT_CACHE_DISK_BYTES)
 app = Flask(__name__)
 
+def plot_exists(s3_path):
+    """
+    Returns True if the plot is cached locally or already stored in S3.
+    """
+    return plot_cache.exists(
+        s3_path, lambda: s3_client.check_exist(bucket=bucket, bucket_file=s3_path))
+
+def parse_time_resp(time_resp):
+    """
+    Parses the request time sent by the gateway, as `str(datetime)` or an HTTP date.
+    """
+    try:
+        return datetime.strptime(time_resp, '%Y-%m-%d %H:%M:%S.%f')
+    except ValueError:
+        return datetime.strptime(time_resp, '%a, %d %b %Y %H:%M:%S %Z')
+
+def resolve(data):
+    """
+    Returns the candles of a payload, reading history references from the candle store.
+
+    Raises:
+        ValueError: If a reference cannot be resolved.
+    """
+    return store.resolve(data) if CandleStore.is_ref(data) else data
+
 @app.route("/plot/<crypto>/<time>/<time_resp>", methods=["POST"])
 def generate_plot(crypto, time, time_resp):
     """
@@ -48,14 +108,21 @@ def generate_plot(crypto, time, time_resp):
         JSON payload containing an array of data records with the fields:
         - 'time' (int): Unix timestamp of the record.
         - 'close' (float): The closing price during the interval.
+        or a history reference as returned by the data service /history_ref route.
+
+    Query parameters:
+        - points (int, optional): Draw at most this many points, selected with LTTB;
+          at most `MAX_POINTS`.
 
     Returns:
         Response: 
-        - On success: JSON object with the URL of the uploaded plot:
+        - On success: JSON object with a presigned GET URL of the uploaded plot,
+          valid for `S3_PRESIGN_EXPIRY` seconds:
             {
-                "url": "<S3_bucket_url>"
+                "url": "<presigned_S3_url>"
             }
         - On failure: JSON error message with appropriate HTTP status code.
+        - When the render queue is full or a worker crashed: 503 with a Retry-After header.
 
     Example:
         Request:
@@ -68,7 +135,7 @@ def generate_plot(crypto, time, time_resp):
 
         Response:
             {
-                "url": "https://s3.amazonaws.com/<bucket>/BTC/plots/plot.png"
+                "url": "https://s3.cloud.ru/<bucket>/BTC/hour/2023-10-26/00/plot.png?X-Amz-..."
             }
 
     Notes:
@@ -78,36 +145,139 @@ def generate_plot(crypto, time, time_resp):
             * Title: "Price Trend".
         - The plot is saved in PNG format and uploaded to the specified S3 bucket.
     """
+    points = request.args.get('points', type=int)
     try:
-        time_resp = datetime.strptime(time_resp, '%Y-%m-%d %H:%M:%S.%f')
-    except ValueError:
-        time_resp = datetime.strptime(time_resp, '%a, %d %b %Y %H:%M:%S %Z')
-    date_part = time_resp.strftime('%Y-%m-%d')
-    if time=='hour':
-        s3_path = f"{crypto}/{time}/{date_part}/{time_resp.strftime('%H')}/plot.png"
-    else:
-        s3_path = f"{crypto}/{time}/{date_part}/plot.png"
-    resp = s3_client.check_exist(bucket=bucket, bucket_file=s3_path)
-    if resp:
-        return jsonify({'url': resp}), 200
-    df, error_response = validate_data(request.json, time)
+        if not (crypto.isalnum() and time.isalnum()):
+            raise ValueError("Symbol and interval must be alphanumeric")
+        if points is not None:
+            check_downsampling(points, 'lttb')
+            if points > MAX_POINTS:
+                raise ValueError(f"points must be at most {MAX_POINTS} for plots")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    s3_path = plot_key(crypto, time, parse_time_resp(time_resp),
+                       f"points{points}" if points else None)
+    if plot_exists(s3_path):
+        return jsonify({'url': s3_client.presigned_url(bucket, s3_path)}), 200
+    try:
+        data = resolve(request_payload(request))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    df, error_response = validate_data(data)
     if error_response:
         return error_response
 
-    plt.figure(figsize=(12, 6))
-    plt.plot(df['time'], df['close'], marker='o')
-    plt.xlabel("Time")
-    plt.ylabel("Close Price")
-    plt.title("Price Trend")
-    plt.grid()
+    timestamps, close = df['time'].to_numpy(), df['close'].to_numpy()
+    if points is not None:
+        keep = lttb(timestamps, close, points)
+        timestamps, close = timestamps[keep], close[keep]
+    try:
+        png = workers.render(timestamps, close, time)
+    except (QueueFull, WorkerCrashed) as e:
+        return jsonify({"error": str(e)}), 503, {'Retry-After': str(PLOT_RETRY_AFTER)}
+    s3_client.upload_image(bucket=bucket, local_file=io.BytesIO(png), bucket_file=s3_path)
+    plot_cache.put(s3_path, png)
+    return jsonify({'url': s3_client.presigned_url(bucket, s3_path)}), 200
 
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png')
-    buffer.seek(0)
-    plt.close()
+def chart_series(payloads, chart):
+    """
+    Validates the payload of every asset of a chart.
 
-    resp = s3_client.upload_image(bucket=bucket, local_file=buffer, bucket_file=s3_path)
-    return jsonify({'url': resp}), 200
+    Returns:
+        tuple: The list of `Series` and None, or None and an error response.
+    """
+    volume = 'volume' in chart.panels
+    series = []
+    for symbol, data in payloads.items():
+        try:
+            data = resolve(data)
+        except ValueError as e:
+            return None, (jsonify({"error": str(e)}), 400)
+        df, error_response = validate_data(data, extra_fields=('volumeto',) if volume else ())
+        if error_response:
+            return None, error_response
+        series.append(Series(symbol, df['time'].to_numpy(), df['close'].to_numpy(),
+                             df['volumeto'].to_numpy() if volume else None))
+    return series, None
+
+@app.route("/chart/<time>/<time_resp>", methods=["POST"])
+def generate_chart(time, time_resp):
+    """
+    Render several cryptocurrencies in one chart and upload it to S3.
+
+    The JSON payload maps each symbol to its candles or to a history reference. The
+    price panel shows close prices for one asset and the change in percent for several;
+    long series are downsampled before drawing.
+
+    Args:
+        time (str): The time interval of the candles (e.g., "hour", "day").
+        time_resp (str): The request time the chart is stored under.
+
+    Query parameters:
+        - overlay (str, optional): A moving average drawn over the prices: "sma" or "ema".
+        - panels (str, optional): Comma-separated extra panels: "volume", "volatility".
+        - window (int, optional): Window length of the overlay and the volatility.
+        - limit (int, optional): The requested number of candles, part of the S3 key.
+        - currency (str, optional): The currency of the prices, part of the S3 key.
+          Defaults to "USD".
+
+    Returns:
+        Response: A JSON object with a presigned URL of the chart, an error message with
+        a 400 status code for invalid requests, or 503 with a Retry-After header when
+        the render queue is full.
+    """
+    try:
+        chart = check_chart(Chart(
+            series=[],
+            time=time,
+            overlay=request.args.get('overlay'),
+            panels=[p for p in request.args.get('panels', '').split(',') if p],
+            window=request.args.get('window', DEFAULT_WINDOW, type=int)
+        ))
+        payloads = request_payloads(request)
+        if chart.window < 2:
+            raise ValueError("window must be at least 2")
+        if not isinstance(payloads, dict) or not payloads:
+            raise ValueError("Expected an object mapping symbols to candles")
+        currency = request.args.get('currency', 'USD')
+        if not all(part.isalnum() for part in [*payloads, currency, time]):
+            raise ValueError("Symbols, currency and interval must be alphanumeric")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    variant = '-'.join([request.args.get('limit', 'all'), chart.overlay or 'close',
+                        *chart.panels, str(chart.window)])
+    s3_path = chart_key(list(payloads), time, currency, parse_time_resp(time_resp), variant)
+    if plot_exists(s3_path):
+        return jsonify({'url': s3_client.presigned_url(bucket, s3_path)}), 200
+
+    series, error_response = chart_series(payloads, chart)
+    if error_response:
+        return error_response
+    try:
+        chart = check_chart(chart._replace(series=series))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        png = workers.render_chart(chart)
+    except (QueueFull, WorkerCrashed) as e:
+        return jsonify({"error": str(e)}), 503, {'Retry-After': str(PLOT_RETRY_AFTER)}
+    s3_client.upload_image(bucket=bucket, local_file=io.BytesIO(png), bucket_file=s3_path)
+    plot_cache.put(s3_path, png)
+    return jsonify({'url': s3_client.presigned_url(bucket, s3_path)}), 200
+
+@app.route("/plot/stats", methods=["GET"])
+def plot_stats():
+    """
+    Report plot rendering metrics.
+
+    Returns:
+        Response: A JSON object with the number of worker processes, the queue bound,
+        pending jobs and queue depth, job counters and p50/p99 render times, and the
+        plot cache sizes, counters and hit rate under "cache".
+    """
+    return jsonify({**workers.stats(), "cache": plot_cache.stats()}), 200
 
 if __name__ == "__main__":
-    app.run(debug=False, port=5003)
+    workers.start()
+    app.run(debug=False, port=5003, threaded=True)
@@ -0,0 +1,260 @@
+"""
+Plot Rendering Worker Pool
+
+This module moves CPU-bound plot rendering out of the plot service request threads into
+a pool of worker processes, so a burst of renders does not hold the GIL of the service.
+
+Each worker imports Matplotlib and renders one warm-up plot when it starts. Plot jobs
+carry only the int64 timestamps and float64 close prices of a window; the worker formats
+the time labels, renders with its own `PlotRenderer` and returns the PNG bytes. Chart
+jobs carry a `Chart` of NumPy columns per asset.
+
+The number of jobs that are rendering or waiting is bounded. When the bound is reached,
+`submit` raises `QueueFull` instead of queueing more work, which the service turns into
+a 503 response with a Retry-After header.
+
+A worker that dies, e.g. killed for running out of memory, breaks the whole process pool.
+The pool is then replaced by a fresh, warming one and the jobs that were lost raise
+`WorkerCrashed`, which the service also answers with 503 and Retry-After.
+
+Render times are kept in the pool, apart from the HTTP hop latencies of
+`utils.http_session`.
+
+Classes:
+    - QueueFull: Raised when the pool cannot accept another job.
+    - WorkerCrashed: Raised for jobs lost because a worker process died.
+    - PlotWorkerPool: A bounded process pool that renders plots to PNG bytes.
+"""
+import os
+import threading
+import time as _time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from api.data_validation import format_timestamps
+from api.renderer import PlotRenderer, Series, check_chart
+
+_worker = {}
+TIMING_SAMPLES = 1000
+
+
+class QueueFull(Exception):
+    """
+    Raised when the worker pool already holds the maximum number of jobs.
+    """
+
+
+class WorkerCrashed(Exception):
+    """
+    Raised when a job is lost because a worker process died; the pool is restarted.
+    """
+
+
+def _summary(samples):
+    # Sample count and p50/p99 in milliseconds, in the format of `latency_stats`.
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "p50_ms": round(samples[round(0.50 * (len(samples) - 1))] * 1000, 2),
+        "p99_ms": round(samples[round(0.99 * (len(samples) - 1))] * 1000, 2),
+    }
+
+
+def _warm_up():
+    # Runs once in every worker process.
+    _worker['renderer'] = PlotRenderer(pool_size=1)
+    _worker['renderer'].render(np.array(["00:00", "01:00"]), np.array([1.0, 2.0]))
+
+
+def _render(timestamps, close, time):
+    # Runs in a worker process; returns the PNG and the render time in seconds.
+    start = _time.perf_counter()
+    png = _worker['renderer'].render(format_timestamps(timestamps, time), close, time)
+    return png, _time.perf_counter() - start
+
+
+def _render_chart(chart):
+    # Runs in a worker process; returns the PNG and the render time in seconds.
+    start = _time.perf_counter()
+    png = _worker['renderer'].render_chart(chart)
+    return png, _time.perf_counter() - start
+
+
+class PlotWorkerPool:
+    """
+    Renders plots in worker processes with a bounded number of pending jobs.
+
+    Attributes:
+        processes (int): The number of worker processes.
+        max_queue (int): The number of jobs that may wait for a free worker.
+        counters (dict): The number of submitted, rejected, completed and failed jobs
+            and of pool restarts.
+
+    Methods:
+        start: Starts and warms up every worker process.
+        submit: Queues a render and returns a future of the PNG bytes.
+        render: Renders a plot and waits for the PNG bytes.
+        render_chart: Renders a multi-asset chart and waits for the PNG bytes.
+        stats: Returns queue depth, job counters and render time percentiles.
+        shutdown: Stops the worker processes.
+    """
+    def __init__(self, processes=None, max_queue=16):
+        self.processes = processes or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.counters = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0,
+                         "restarts": 0}
+        self._slots = threading.BoundedSemaphore(self.processes + max_queue)
+        self._lock = threading.Lock()
+        self._timings = {'render': deque(maxlen=TIMING_SAMPLES),
+                         'render_total': deque(maxlen=TIMING_SAMPLES)}
+        self._executor = ProcessPoolExecutor(self.processes, initializer=_warm_up)
+
+    def start(self):
+        """
+        Starts every worker process and waits until each one has warmed up.
+        """
+        futures = [self._executor.submit(os.getpid) for _ in range(self.processes)]
+        for future in futures:
+            future.result()
+
+    def submit(self, timestamps, close, time=None):
+        """
+        Queues a render of close prices over time.
+
+        Args:
+            timestamps (np.ndarray): Unix timestamps as int64.
+            close (np.ndarray): Close prices as float64.
+            time (str, optional): The time interval used to format the time labels.
+
+        Returns:
+            concurrent.futures.Future: A future of the PNG bytes.
+
+        Raises:
+            QueueFull: If the maximum number of jobs is already rendering or waiting.
+        """
+        return self._submit(
+            _render, np.asarray(timestamps, dtype=np.int64), np.asarray(close, dtype=float), time)
+
+    def _restart(self, broken):
+        # Replaces a broken executor once, however many jobs noticed it, and starts
+        # warming the new workers without waiting for them.
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = ProcessPoolExecutor(self.processes, initializer=_warm_up)
+            self.counters["restarts"] += 1
+            executor = self._executor
+        broken.shutdown(wait=False, cancel_futures=True)
+        for _ in range(self.processes):
+            executor.submit(os.getpid)
+
+    def _submit(self, fn, *args):
+        # The slot is released by the done callback of the job.
+        if not self._slots.acquire(blocking=False):  # pylint: disable=consider-using-with
+            with self._lock:
+                self.counters["rejected"] += 1
+            raise QueueFull("Plot rendering queue is full")
+        with self._lock:
+            self.counters["submitted"] += 1
+            executor = self._executor
+        submitted = _time.perf_counter()
+        try:
+            job = executor.submit(fn, *args)
+        except BrokenProcessPool as e:
+            self._slots.release()
+            with self._lock:
+                self.counters["failed"] += 1
+            self._restart(executor)
+            raise WorkerCrashed("Plot worker crashed; the pool is restarting") from e
+        job.executor = executor  # the executor to restart if this job finds it broken
+
+        def done(future):
+            self._slots.release()
+            failed = future.cancelled() or future.exception() is not None
+            with self._lock:
+                self.counters["failed" if failed else "completed"] += 1
+                if not failed:
+                    self._timings['render'].append(future.result()[1])
+                    self._timings['render_total'].append(_time.perf_counter() - submitted)
+        job.add_done_callback(done)
+        return job
+
+    def result(self, job):
+        """
+        Waits for a job and returns its PNG bytes.
+
+        Raises:
+            WorkerCrashed: If a worker process died; the pool has been restarted.
+        """
+        try:
+            return job.result()[0]
+        except BrokenProcessPool as e:
+            self._restart(job.executor)
+            raise WorkerCrashed("Plot worker crashed; the pool is restarting") from e
+
+    def render(self, timestamps, close, time=None):
+        """
+        Renders close prices over time and waits for the result.
+
+        Returns:
+            bytes: The plot as PNG.
+
+        Raises:
+            QueueFull: If the maximum number of jobs is already rendering or waiting.
+            WorkerCrashed: If a worker process died during the render.
+        """
+        return self.result(self.submit(timestamps, close, time))
+
+    def render_chart(self, chart):
+        """
+        Renders a multi-asset, multi-panel chart and waits for the result.
+
+        Args:
+            chart (Chart): The assets and the requested overlay and panels.
+
+        Returns:
+            bytes: The chart as PNG.
+
+        Raises:
+            QueueFull: If the maximum number of jobs is already rendering or waiting.
+            WorkerCrashed: If a worker process died during the render.
+            ValueError: If the overlay or a panel is unknown.
+        """
+        chart = check_chart(chart)._replace(series=[
+            Series(s.symbol, np.asarray(s.time, dtype=np.int64), np.asarray(s.close, dtype=float),
+                   None if s.volume is None else np.asarray(s.volume, dtype=float))
+            for s in chart.series
+        ])
+        return self.result(self._submit(_render_chart, chart))
+
+    def stats(self):
+        """
+        Returns the queue depth, job counters and render time percentiles.
+
+        `render` is the time spent rendering in a worker, `render_total` includes the
+        wait for a free worker.
+        """
+        with self._lock:
+            counters = dict(self.counters)
+            timings = {name: list(samples) for name, samples in self._timings.items()}
+        pending = counters["submitted"] - counters["completed"] - counters["failed"]
+        return {
+            "processes": self.processes,
+            "max_queue": self.max_queue,
+            "pending": pending,
+            "queue_depth": max(0, pending - self.processes),
+            **counters,
+            "render": _summary(timings['render']),
+            "render_total": _summary(timings['render_total']),
+        }
+
+    def shutdown(self):
+        """
+        Stops the worker processes after the pending jobs are done.
+        """
+        self._executor.shutdown()
@@ -0,0 +1,164 @@
+"""
+Background Pre-Warming Scheduler
+
+This module precomputes reports for a fixed set of `(crypto, time, currency, limit)`
+targets right after each candle boundary, so the caches, the analytics state, the plot
+cache and S3 are filled before the first user of a new hour or day asks for them.
+
+After a boundary the scheduler waits a random jitter, so several gateway instances do
+not hit the upstream API at the same moment and the new candle is available upstream,
+then warms every target whose interval rolled over with a bounded number of threads.
+
+User requests are reported through `observe`, which counts whether the target was
+already warm for the current bucket, i.e. whether the scheduler got ahead of the user.
+Requests for anything but a target, e.g. another currency or limit, are not counted.
+
+Classes:
+    - Schedule: How many targets are warmed at once and the jitter after a boundary.
+    - Prewarmer: Runs a warm function for every target once per candle bucket.
+"""
+import random
+import threading
+import time as _time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.time_formater import bucket_start, bucket_end
+
+Schedule = namedtuple('Schedule', ['concurrency', 'jitter'])
+
+
+class Prewarmer:
+    """
+    Warms `(crypto, time, currency, limit)` targets once per candle bucket on a
+    background thread.
+
+    Attributes:
+        targets (list[tuple]): The (crypto, time, currency, limit) targets to warm.
+        schedule (Schedule): The number of targets warmed at the same time and the
+            maximum random delay in seconds after a candle boundary.
+        counters (dict): The number of runs, warmed targets and failures, and of user
+            requests that arrived after (`ahead`) or before (`behind`) warming.
+
+    Methods:
+        start: Starts the scheduler thread.
+        stop: Stops the scheduler thread.
+        run_once: Warms every target whose bucket has not been warmed yet.
+        observe: Records whether a user request found its target warm.
+        stats: Returns the counters and the share of requests served ahead of time.
+    """
+    def __init__(self, targets, warm, concurrency=4, jitter=5.0):
+        """
+        Scheduler initialization.
+        :param targets: The (crypto, time, currency, limit) targets to warm.
+        :param warm: Function called as `warm(crypto, time, currency, limit)`; raises on
+            failure.
+        :param concurrency: Number of targets warmed at the same time.
+        :param jitter: Maximum random delay in seconds after a candle boundary.
+        """
+        self.targets = [tuple(target) for target in targets]
+        self._warm = warm
+        self.schedule = Schedule(concurrency, jitter)
+        self._ready = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.counters = {
+            "runs": 0, "warmed": 0, "failures": 0, "ahead": 0, "behind": 0,
+            "last_run_ms": 0.0
+        }
+
+    def start(self):
+        """
+        Starts the scheduler thread. The first run happens immediately.
+        """
+        threading.Thread(target=self._loop, name='prewarm', daemon=True).start()
+
+    def stop(self):
+        """
+        Stops the scheduler thread after the current run.
+        """
+        self._stop.set()
+
+    def _loop(self):
+        self.run_once()
+        while not self._stop.wait(self._delay()):
+            self.run_once()
+
+    def _delay(self, now=None):
+        # Seconds until the next candle boundary of any target, plus jitter.
+        now = _time.time() if now is None else now
+        boundary = min(bucket_end(target[1], now) for target in self.targets)
+        return max(0.0, boundary - now) + random.uniform(0, self.schedule.jitter)
+
+    def run_once(self, now=None):
+        """
+        Warms every target whose current bucket has not been warmed yet.
+
+        Args:
+            now (float, optional): The current Unix time. Defaults to `time.time()`.
+
+        Returns:
+            int: The number of targets warmed successfully.
+        """
+        now = _time.time() if now is None else now
+        with self._lock:
+            due = [
+                target for target in self.targets
+                if self._ready.get(target) != bucket_start(target[1], now)
+            ]
+        if not due:
+            return 0
+
+        start = _time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.schedule.concurrency) as executor:
+            results = list(executor.map(lambda target: self._warm_target(target, now), due))
+        with self._lock:
+            self.counters["runs"] += 1
+            self.counters["last_run_ms"] = round((_time.perf_counter() - start) * 1000, 2)
+        return sum(results)
+
+    def _warm_target(self, target, now):
+        time = target[1]
+        try:
+            self._warm(*target)
+        except Exception as e:  # pylint: disable=broad-except
+            print(f"Error pre-warming {'/'.join(map(str, target))}: {e}")
+            with self._lock:
+                self.counters["failures"] += 1
+            return False
+        with self._lock:
+            self._ready[target] = bucket_start(time, now)
+            self.counters["warmed"] += 1
+        return True
+
+    def observe(self, target, now=None):
+        """
+        Records a user request; requests for anything but a target are ignored.
+
+        Args:
+            target (tuple): The requested (crypto, time, currency, limit), e.g.
+                ("BTC", "hour", "USD", 10).
+            now (float, optional): The request time. Defaults to `time.time()`.
+        """
+        target = tuple(target)
+        if target not in self.targets:
+            return
+        with self._lock:
+            ahead = self._ready.get(target) == bucket_start(target[1], now)
+            self.counters["ahead" if ahead else "behind"] += 1
+
+    def stats(self):
+        """
+        Returns the scheduler counters.
+
+        Returns:
+            dict: The counters and `ahead_rate`, the share of observed user requests
+            that found their target already warm.
+        """
+        with self._lock:
+            observed = self.counters["ahead"] + self.counters["behind"]
+            return {
+                "targets": len(self.targets),
+                **self.counters,
+                "ahead_rate": round(self.counters["ahead"] / observed, 3) if observed else 0.0,
+            }
@@ -0,0 +1,306 @@
+"""
+Streaming Price Feed
+
+This module keeps the latest prices of a set of cryptocurrencies in memory and pushes
+every change to its subscribers, so N interested clients cost one upstream poll instead
+of N. One poll loop fetches all watched symbols with a single call per interval, e.g.
+from the data service `/latest?fsyms=` route, which itself uses one `pricemulti` call.
+
+Subscribers are callbacks. They are called on the poll thread with one update per
+changed price and must not block; the gateways put updates into a bounded per-client
+queue that drops the oldest update when a client falls behind, so a slow client only
+skips prices that were already replaced.
+
+Subscribers may ask for symbols beyond the configured ones. Such extra symbols are
+polled only while a subscription needs them, and their number is capped, so clients
+cannot grow the upstream call without bound.
+
+Functions:
+    - data_service_source: Returns a price source backed by the data service.
+    - random_walk: Returns a fake price source for local runs and tests.
+    - put_latest: Puts an update into a bounded queue, dropping the oldest one if full.
+    - sse_event: Formats an update as a Server-Sent Event.
+
+Classes:
+    - PriceFeed: Polls the latest prices and pushes changes to subscribers.
+"""
+import asyncio
+import itertools
+import json
+import queue
+import random
+import re
+import threading
+import time as _time
+from collections import Counter
+
+from utils import http_session
+
+_SYMBOL = re.compile(r'^[A-Z0-9]{1,10}$')
+
+
+def data_service_source(data_url, timeout=None):
+    """
+    Returns a price source that fetches all symbols with one data service call.
+
+    Args:
+        data_url (str): Base URL of the data service.
+        timeout (float or tuple, optional): Timeout of the call.
+
+    Returns:
+        callable: `fetch(symbols, currency)` returning `{symbol: price}`.
+    """
+    def fetch(symbols, currency):
+        response = http_session.request(
+            'GET', f"{data_url}/latest", hop='data_service', timeout=timeout, internal=True,
+            params={'fsyms': ','.join(symbols), 'tsyms': currency})
+        response.raise_for_status()
+        return {symbol: prices[currency] for symbol, prices in response.json().items()}
+    return fetch
+
+
+def random_walk(start=None, volatility=0.002, seed=None):
+    """
+    Returns a fake price source whose prices follow a random walk.
+
+    Args:
+        start (dict, optional): Initial price per symbol. Other symbols start at 100.
+        volatility (float): Standard deviation of the relative change per poll.
+        seed (int, optional): Seed for reproducible prices.
+
+    Returns:
+        callable: `fetch(symbols, currency)` returning `{symbol: price}`.
+    """
+    prices = dict(start or {})
+    rng = random.Random(seed)
+
+    def fetch(symbols, _currency):
+        for symbol in symbols:
+            price = prices.get(symbol, 100.0)
+            prices[symbol] = round(price * (1 + rng.gauss(0, volatility)), 6)
+        return {symbol: prices[symbol] for symbol in symbols}
+    return fetch
+
+
+def put_latest(updates, update):
+    """
+    Puts an update into a bounded `queue.Queue` or `asyncio.Queue`, dropping the oldest
+    update when the queue is full.
+    """
+    while True:
+        try:
+            updates.put_nowait(update)
+            return
+        except (queue.Full, asyncio.QueueFull):
+            try:
+                updates.get_nowait()
+            except (queue.Empty, asyncio.QueueEmpty):
+                pass
+
+
+def sse_event(update):
+    """
+    Returns a price update as a Server-Sent Event.
+    """
+    return f"event: price\ndata: {json.dumps(update)}\n\n"
+
+
+class PriceFeed:  # pylint: disable=too-many-instance-attributes
+    """
+    Polls the latest prices of the watched symbols and pushes changes to subscribers.
+
+    Attributes:
+        symbols (set[str]): The configured cryptocurrency symbols, always watched.
+        currency (str): The currency of all prices (e.g., "USD").
+        interval (float): Seconds between two polls.
+        max_extra (int): How many symbols beyond `symbols` subscriptions may add.
+        counters (dict): The number of polls, failed polls, changed prices and
+            deliveries to subscribers.
+
+    Methods:
+        start: Starts the poll thread.
+        stop: Stops the poll thread.
+        poll_once: Fetches all watched prices and pushes the changed ones.
+        subscribe: Registers a callback for updates of some symbols.
+        unsubscribe: Removes a callback and stops polling symbols nobody needs.
+        price: Returns a fresh in-memory price.
+        stats: Returns the counters and the number of subscribers.
+    """
+    def __init__(self, fetch, symbols, currency='USD', interval=5.0, max_extra=20):
+        """
+        Feed initialization.
+        :param fetch: Function called as `fetch(symbols, currency)`, returning
+            `{symbol: price}`; raises on failure.
+        :param symbols: The symbols to watch at all times.
+        :param currency: The currency of all prices.
+        :param interval: Seconds between two polls.
+        :param max_extra: How many symbols beyond `symbols` subscriptions may add.
+        """
+        self.symbols = set(symbols)
+        self.currency = currency
+        self.interval = interval
+        self._fetch = fetch
+        self._lock = threading.Lock()
+        self.max_extra = max_extra
+        self._prices = {}
+        self._subscribers = {}
+        self._extra = Counter()
+        self._ids = itertools.count()
+        self._stop = threading.Event()
+        self.counters = {"polls": 0, "failures": 0, "updates": 0, "deliveries": 0}
+
+    def start(self):
+        """
+        Starts the poll thread. The first poll happens immediately.
+        """
+        threading.Thread(target=self._loop, name='price-feed', daemon=True).start()
+
+    def stop(self):
+        """
+        Stops the poll thread after the current poll.
+        """
+        self._stop.set()
+
+    def _loop(self):
+        self.poll_once()
+        while not self._stop.wait(self.interval):
+            self.poll_once()
+
+    def poll_once(self, now=None):
+        """
+        Fetches the prices of all watched symbols with one call and pushes every
+        changed price to the subscribers of its symbol.
+
+        Args:
+            now (float, optional): The current Unix time. Defaults to `time.time()`.
+
+        Returns:
+            int: The number of changed prices.
+        """
+        now = _time.time() if now is None else now
+        with self._lock:
+            symbols = self._watched()
+        try:
+            prices = self._fetch(symbols, self.currency)
+        except Exception as e:  # pylint: disable=broad-except
+            print(f"Error polling prices for {','.join(symbols)}: {e}")
+            with self._lock:
+                self.counters["failures"] += 1
+            return 0
+
+        updates = []
+        with self._lock:
+            self.counters["polls"] += 1
+            watched = set(self._watched())
+            for symbol, price in prices.items():
+                if symbol not in watched:
+                    continue  # unsubscribed while the poll was running
+                previous = self._prices.get(symbol)
+                self._prices[symbol] = (price, now)
+                if previous is None or previous[0] != price:
+                    updates.append(self._update(symbol))
+            self.counters["updates"] += len(updates)
+            subscribers = list(self._subscribers.values())
+        for update in updates:
+            for symbols, callback, _ in subscribers:
+                if update["symbol"] in symbols:
+                    self._deliver(callback, update)
+        return len(updates)
+
+    def _watched(self):
+        return sorted(self.symbols | set(self._extra))
+
+    def _update(self, symbol):
+        price, at = self._prices[symbol]
+        return {"symbol": symbol, "currency": self.currency, "price": price, "time": at}
+
+    def _deliver(self, callback, update):
+        try:
+            callback(update)
+        except Exception as e:  # pylint: disable=broad-except
+            print(f"Error delivering price update {update}: {e}")
+            return
+        with self._lock:
+            self.counters["deliveries"] += 1
+
+    def subscribe(self, callback, symbols=None):
+        """
+        Registers a callback for the updates of some symbols.
+
+        Symbols beyond the configured ones are watched while the subscription lasts,
+        and the callback immediately receives the last known price of each symbol.
+
+        Args:
+            callback (callable): Called as `callback(update)` on the poll thread, where
+                update is `{"symbol", "currency", "price", "time"}`; must not block.
+            symbols (Iterable[str], optional): The symbols of interest. Defaults to
+                all watched symbols.
+
+        Returns:
+            int: The subscription id for `unsubscribe`.
+
+        Raises:
+            ValueError: If a symbol is malformed or the extra symbols would exceed the cap.
+        """
+        with self._lock:
+            symbols = frozenset(symbols or self.symbols)
+            invalid = sorted(s for s in symbols if not _SYMBOL.match(s))
+            if invalid:
+                raise ValueError(f"Invalid symbols: {', '.join(invalid)}")
+            extra = symbols - self.symbols
+            if len(set(self._extra) | extra) > self.max_extra:
+                raise ValueError(
+                    f"At most {self.max_extra} symbols beyond "
+                    f"{', '.join(sorted(self.symbols))} can be streamed")
+            self._extra.update(extra)
+            subscription = next(self._ids)
+            self._subscribers[subscription] = (symbols, callback, extra)
+            snapshot = [self._update(s) for s in sorted(symbols) if s in self._prices]
+        for update in snapshot:
+            self._deliver(callback, update)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """
+        Removes the callback registered under a subscription id. Extra symbols no other
+        subscription needs are no longer polled.
+        """
+        with self._lock:
+            _, _, extra = self._subscribers.pop(subscription, (None, None, ()))
+            self._extra.subtract(extra)
+            for symbol in extra:
+                if self._extra[symbol] <= 0:
+                    del self._extra[symbol]
+                    self._prices.pop(symbol, None)
+
+    def price(self, symbol, currency=None, max_age=None, now=None):
+        """
+        Returns the in-memory price of a symbol if it is fresh.
+
+        Args:
+            symbol (str): The cryptocurrency symbol (e.g., "BTC").
+            currency (str, optional): The requested currency. Defaults to the feed's.
+            max_age (float, optional): Maximum age in seconds. Defaults to two intervals.
+            now (float, optional): The current Unix time. Defaults to `time.time()`.
+
+        Returns:
+            float or None: The price, or None if it is unknown, stale or in another currency.
+        """
+        if currency not in (None, self.currency):
+            return None
+        now = _time.time() if now is None else now
+        max_age = 2 * self.interval if max_age is None else max_age
+        with self._lock:
+            price, at = self._prices.get(symbol, (None, 0.0))
+        return price if now - at <= max_age else None
+
+    def stats(self):
+        """
+        Returns the counters, the watched symbols and the number of subscribers.
+        """
+        with self._lock:
+            return {
+                "symbols": self._watched(),
+                "subscribers": len(self._subscribers),
+                **self.counters,
+            }
@@ -0,0 +1,294 @@
+"""
+Thread-Safe Plot Renderer
+
+This module renders price trend PNGs with the object-oriented Matplotlib API instead of
+the global `pyplot` state machine. Every figure has its own Agg canvas, so renders in
+different threads never share figure state.
+
+Built figures are kept as templates in a pool per `time` interval. A render takes a
+template out of the pool, updates the data of its line in place, rescales the axes and
+puts the template back, so axes, labels and the line artist are created only once.
+
+Charts draw several assets in one figure: a price panel with an optional moving-average
+overlay, and optional volume and rolling-volatility panels below it. Chart templates are
+pooled per layout. Indicators are computed on the full series; only then are long series
+downsampled to `MAX_POINTS` (LTTB for lines, min/max for volume bars), so the cost of
+drawing does not grow with the window.
+
+Classes:
+    - Series: The candle columns of one asset in a chart.
+    - Chart: A chart request: the assets, the interval, the overlay and the panels.
+    - PlotRenderer: A pool of figure templates that renders plots and charts to PNG bytes.
+
+Functions:
+    - check_chart: Validates the overlay, panels and close prices of a chart request.
+"""
+import io
+import queue
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from api.data_validation import format_timestamps
+from api.downsample import lttb, minmax
+from api.indicators import sma, ema, volatility, DEFAULT_WINDOW
+
+FIGSIZE = (12, 6)
+MAX_TICKS = 12
+MAX_POINTS = 200
+OVERLAYS = {'sma': sma, 'ema': ema}
+PANELS = ('volume', 'volatility')
+
+# `time` holds int64 timestamps; `volume` is None when no volume panel is drawn.
+Series = namedtuple('Series', ['symbol', 'time', 'close', 'volume'])
+Chart = namedtuple('Chart', ['series', 'time', 'overlay', 'panels', 'window'],
+                   defaults=(None, None, (), DEFAULT_WINDOW))
+
+
+def _build_template():
+    """
+    Builds a figure with the layout of the price trend plot and an empty line.
+
+    Returns:
+        tuple: The (figure, axes, line) of the template.
+    """
+    figure = Figure(figsize=FIGSIZE)
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    line, = axes.plot([], [], marker='o')
+    axes.set_xlabel("Time")
+    axes.set_ylabel("Close Price")
+    axes.set_title("Price Trend")
+    axes.grid()
+    return figure, axes, line
+
+
+def check_chart(chart):
+    """
+    Validates the overlay, panels and close prices of a chart request.
+
+    Close prices must be positive: several assets are drawn as the change since their
+    first close, and volatility takes the log of every close.
+
+    Returns:
+        Chart: The chart with its panels as a tuple in drawing order.
+
+    Raises:
+        ValueError: If the overlay or a panel is unknown, or a close is not positive.
+    """
+    if chart.overlay and chart.overlay not in OVERLAYS:
+        raise ValueError(f"Unknown overlay: {chart.overlay}. Available: {', '.join(OVERLAYS)}")
+    unknown = [panel for panel in chart.panels if panel not in PANELS]
+    if unknown:
+        raise ValueError(f"Unknown panels: {', '.join(unknown)}. Available: {', '.join(PANELS)}")
+    for series in chart.series:
+        if not (np.asarray(series.close, dtype=float) > 0).all():
+            raise ValueError(f"Close prices of {series.symbol} must be positive")
+    return chart._replace(panels=tuple(panel for panel in PANELS if panel in chart.panels))
+
+
+def _build_chart_template(layout):
+    """
+    Builds a chart figure for a layout of (number of assets, overlay, panels).
+
+    Returns:
+        dict: The figure, the axes per panel and the lines per panel.
+    """
+    assets, overlay, panels = layout
+    figure = Figure(figsize=(FIGSIZE[0], FIGSIZE[1] + 2 * len(panels)))
+    FigureCanvasAgg(figure)
+    grid = figure.subplots(len(panels) + 1, 1, sharex=True, squeeze=False,
+                           gridspec_kw={'height_ratios': [3] + [1] * len(panels)})[:, 0]
+    axes = dict(zip(('price',) + panels, grid))
+    lines = {'price': [axes['price'].plot([], [])[0] for _ in range(assets)]}
+    if overlay:
+        lines['overlay'] = [axes['price'].plot([], [], linestyle='--', linewidth=1)[0]
+                            for _ in range(assets)]
+    if 'volatility' in panels:
+        lines['volatility'] = [axes['volatility'].plot([], [])[0] for _ in range(assets)]
+        axes['volatility'].set_ylabel("Volatility")
+    if 'volume' in panels:
+        axes['volume'].set_ylabel("Volume")
+    axes['price'].set_title("Price Trend")
+    grid[-1].set_xlabel("Time")
+    for panel in grid:
+        panel.grid()
+    return {"figure": figure, "axes": axes, "lines": lines, "bars": []}
+
+
+class PlotRenderer:
+    """
+    Renders price trend plots from a pool of reusable figure templates.
+
+    Attributes:
+        pool_size (int): The number of idle templates kept per time interval.
+
+    Methods:
+        render: Renders close prices with their time labels to PNG bytes.
+        render_chart: Renders a multi-asset, multi-panel chart to PNG bytes.
+        stats: Returns the number of idle templates per time interval or chart layout.
+    """
+    def __init__(self, pool_size=4):
+        self.pool_size = pool_size
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def _pool(self, key):
+        with self._lock:
+            if key not in self._pools:
+                self._pools[key] = queue.LifoQueue(maxsize=self.pool_size)
+            return self._pools[key]
+
+    def _with_template(self, key, build, draw):
+        pool = self._pool(key)
+        try:
+            template = pool.get_nowait()
+        except queue.Empty:
+            template = build()
+        try:
+            return draw(template)
+        finally:
+            try:
+                pool.put_nowait(template)
+            except queue.Full:
+                pass
+
+    def render(self, labels, close, time=None):
+        """
+        Renders a price trend plot.
+
+        Points are placed at positions 0..n-1 and labelled with `labels`; at most
+        `MAX_TICKS` evenly spaced labels are shown. Series longer than `MAX_POINTS`
+        are downsampled with LTTB.
+
+        Args:
+            labels (Sequence): The formatted time of each point.
+            close (Sequence[float]): The close price of each point.
+            time (str, optional): The time interval, which selects the template pool.
+
+        Returns:
+            bytes: The plot as PNG.
+        """
+        labels, close = np.asarray(labels), np.asarray(close, dtype=float)
+        if len(close) > MAX_POINTS:
+            keep = lttb(np.arange(len(close)), close, MAX_POINTS)
+            labels, close = labels[keep], close[keep]
+        return self._with_template(
+            time, _build_template, lambda template: self._draw(template, labels, close))
+
+    def render_chart(self, chart):
+        """
+        Renders several assets in one figure.
+
+        With one asset the price panel shows close prices; with several it shows each
+        asset's change since its first candle in percent, so the assets share a scale.
+
+        Args:
+            chart (Chart): The assets and the requested overlay and panels.
+
+        Returns:
+            bytes: The chart as PNG.
+
+        Raises:
+            ValueError: If the overlay or a panel is unknown.
+        """
+        chart = check_chart(chart)
+        layout = (len(chart.series), bool(chart.overlay), chart.panels)
+        return self._with_template(
+            ('chart', chart.time, *layout[:2], *chart.panels),
+            lambda: _build_chart_template(layout),
+            lambda template: _draw_chart(template, chart))
+
+    @staticmethod
+    def _draw(template, labels, close):
+        figure, axes, line = template
+        positions = np.arange(len(close))
+        line.set_data(positions, close)
+        ticks = positions[::max(1, -(-len(positions) // MAX_TICKS))]
+        axes.set_xticks(ticks, [str(label) for label in labels[ticks]])
+        axes.relim()
+        axes.autoscale_view()
+
+        buffer = io.BytesIO()
+        figure.savefig(buffer, format='png')
+        return buffer.getvalue()
+
+    def stats(self):
+        """
+        Returns the number of idle templates per time interval or chart layout.
+        """
+        with self._lock:
+            return {
+                key if isinstance(key, str) or key is None else ':'.join(map(str, key)):
+                pool.qsize() for key, pool in self._pools.items()
+            }
+
+
+def _chart_lines(series, chart, relative):
+    """
+    Computes the downsampled lines of one asset.
+
+    Returns:
+        dict: Panel name -> (x, y) for 'price', 'overlay' and 'volatility', and the
+        (x, heights) of the volume bars under 'volume'.
+    """
+    frame = pd.DataFrame({'close': np.asarray(series.close, dtype=float)})
+    base = frame['close'].iloc[0] if relative else 1.0
+    scale = (lambda y: (y / base - 1) * 100) if relative else (lambda y: y)
+    x = np.asarray(series.time, dtype=np.int64)
+    keep = lttb(x, frame['close'].to_numpy(), MAX_POINTS)
+
+    lines = {'price': (x[keep], scale(frame['close'].to_numpy()[keep]))}
+    if chart.overlay:
+        lines['overlay'] = (x[keep], scale(OVERLAYS[chart.overlay](frame, chart.window)[keep]))
+    if 'volatility' in chart.panels:
+        lines['volatility'] = (x[keep], volatility(frame, chart.window)[keep])
+    if 'volume' in chart.panels:
+        volume = np.asarray(series.volume, dtype=float)
+        bars = minmax(volume, MAX_POINTS)
+        lines['volume'] = (x[bars], volume[bars])
+    return lines
+
+
+def _draw_bars(axes, x, heights, color):
+    # Bars are the only artists created per render; they are removed on the next one.
+    width = (x[-1] - x[0]) / max(len(x), 1) * 0.8 or 1
+    return axes.bar(x, heights, width=width, alpha=0.5, color=color)
+
+
+def _draw_chart(template, chart):
+    axes, lines = template["axes"], template["lines"]
+    relative = len(chart.series) > 1
+    for bars in template["bars"]:
+        bars.remove()
+    template["bars"] = []
+
+    x_min, x_max = np.inf, -np.inf
+    for i, series in enumerate(chart.series):
+        drawn = _chart_lines(series, chart, relative)
+        for panel in ('price', 'overlay', 'volatility'):
+            if panel in drawn:
+                lines[panel][i].set_data(*drawn[panel])
+        lines['price'][i].set_label(series.symbol)
+        if 'overlay' in drawn:
+            lines['overlay'][i].set_label(f"{series.symbol} {chart.overlay}")
+        if 'volume' in drawn:
+            template["bars"].append(_draw_bars(
+                axes['volume'], *drawn['volume'], lines['price'][i].get_color()))
+        x_min, x_max = min(x_min, series.time[0]), max(x_max, series.time[-1])
+
+    axes['price'].set_ylabel("Change, %" if relative else "Close Price")
+    axes['price'].legend(loc='upper left')
+    ticks = np.linspace(x_min, x_max, MAX_TICKS).astype(np.int64)
+    axes['price'].set_xticks(ticks, [str(label) for label in format_timestamps(ticks, chart.time)])
+    for panel in axes.values():
+        panel.relim()
+        panel.autoscale_view()
+
+    buffer = io.BytesIO()
+    template["figure"].savefig(buffer, format='png')
+    return buffer.getvalue()
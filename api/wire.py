@@ -0,0 +1,184 @@
+"""
+Binary Candle Transport
+
+Internal services pass candle windows to each other as NumPy `.npy` bytes instead of
+JSON records: the structured candle array of the candle store behind the small `.npy`
+header (magic, dtype and shape). Decoding reads the header and wraps the rest of the
+buffer with `np.frombuffer`, so nothing is parsed per candle and every field is a
+column view that `validate_data` uses as it is.
+
+The format is negotiated. The data service sends `.npy` only to clients whose Accept
+header prefers `NPY_TYPE`, and receivers tell it from JSON by the Content-Type. JSON
+stays the default, so external clients see no difference.
+
+Several windows, e.g. for /compare and /chart, travel as one bundle: an `.npy` array
+of the symbols followed by one `.npy` frame per symbol.
+
+Functions:
+    - encode: Encodes a structured candle array as `.npy` bytes.
+    - decode: Wraps `.npy` bytes as a read-only structured array without copying.
+    - bundle: Joins the `.npy` frames of several symbols into one payload.
+    - unbundle: Splits a bundle into symbol -> structured array.
+    - is_binary: Returns True if a serialized payload is `.npy` rather than JSON.
+    - content_headers: Returns the Content-Type header of a JSON or `.npy` payload.
+    - wants_binary: Returns True if a Flask request accepts `.npy` over JSON.
+    - request_payload: Returns the candles or reference a Flask request carries.
+    - request_payloads: Returns the symbol -> payload mapping a Flask request carries.
+"""
+import io
+from functools import lru_cache
+
+import numpy as np
+
+NPY_TYPE = 'application/x-npy'
+JSON_TYPE = 'application/json'
+MAGIC = b'\x93NUMPY'
+_HEADER_READERS = {
+    1: np.lib.format.read_array_header_1_0,
+    2: np.lib.format.read_array_header_2_0,
+}
+
+
+@lru_cache(maxsize=256)
+def _parse_header(major, header):
+    # Parsing the header literal costs more than wrapping a short window, and a
+    # service sees the same few window lengths over and over.
+    return _HEADER_READERS[major](io.BytesIO(header))
+
+
+def encode(candles):
+    """
+    Encodes a structured candle array as `.npy` bytes.
+
+    Args:
+        candles (np.ndarray): A structured array, e.g. `CANDLE_DTYPE` candles.
+
+    Returns:
+        bytes: The `.npy` header followed by the raw array data.
+    """
+    buffer = io.BytesIO()
+    np.save(buffer, np.ascontiguousarray(candles), allow_pickle=False)
+    return buffer.getvalue()
+
+
+def _read_frame(buffer, offset):
+    """
+    Wraps the `.npy` frame starting at `offset` of `buffer`.
+
+    Returns:
+        tuple: The array and the offset right after the frame.
+
+    Raises:
+        ValueError: If the frame is malformed, truncated or holds Python objects.
+    """
+    if buffer[offset:offset + len(MAGIC)] != MAGIC or len(buffer) < offset + len(MAGIC) + 2:
+        raise ValueError("Payload is not an .npy frame")
+    major = buffer[offset + len(MAGIC)]
+    if major not in _HEADER_READERS:
+        raise ValueError(f"Unsupported .npy version: {major}")
+    # The header length follows the magic and the two version bytes.
+    size_start = offset + len(MAGIC) + 2
+    size_end = size_start + (2 if major == 1 else 4)
+    data_start = size_end + int.from_bytes(buffer[size_start:size_end], 'little')
+    shape, fortran_order, dtype = _parse_header(major, bytes(buffer[size_start:data_start]))
+    if fortran_order or dtype.hasobject or len(shape) != 1:
+        raise ValueError("Payload must be a one-dimensional array of plain values")
+    array = np.frombuffer(buffer, dtype=dtype, count=shape[0], offset=data_start)
+    return array, data_start + array.nbytes
+
+
+def decode(buffer):
+    """
+    Wraps `.npy` bytes as a read-only structured array without copying.
+
+    Args:
+        buffer (bytes): Bytes produced by `encode`.
+
+    Returns:
+        np.ndarray: The array, a view of `buffer`.
+
+    Raises:
+        ValueError: If the bytes are not exactly one valid `.npy` frame.
+    """
+    array, end = _read_frame(buffer, 0)
+    if end != len(buffer):
+        raise ValueError("Unexpected bytes after the .npy frame")
+    return array
+
+
+def bundle(frames):
+    """
+    Joins the `.npy` frames of several symbols into one payload.
+
+    Args:
+        frames (dict): Symbol -> bytes produced by `encode`; the frames are not decoded.
+
+    Returns:
+        bytes: The bundle accepted by `unbundle`.
+    """
+    return encode(np.array(list(frames), dtype=str)) + b''.join(frames.values())
+
+
+def unbundle(buffer):
+    """
+    Splits a bundle into symbol -> structured array, without copying the candles.
+
+    Raises:
+        ValueError: If the bundle is malformed.
+    """
+    symbols, offset = _read_frame(buffer, 0)
+    payloads = {}
+    for symbol in symbols.tolist():
+        payloads[symbol], offset = _read_frame(buffer, offset)
+    if offset != len(buffer):
+        raise ValueError("Unexpected bytes after the last .npy frame")
+    return payloads
+
+
+def is_binary(body):
+    """
+    Returns True if a serialized payload or bundle is `.npy` rather than JSON.
+    """
+    return body[:len(MAGIC)] == MAGIC
+
+
+def content_headers(body):
+    """
+    Returns the Content-Type header of a serialized payload, `.npy` or JSON.
+    """
+    return {'Content-Type': NPY_TYPE if is_binary(body) else JSON_TYPE}
+
+
+def wants_binary(request):
+    """
+    Returns True if a Flask request's Accept header prefers `.npy` to JSON.
+    """
+    return request.accept_mimetypes.best_match([JSON_TYPE, NPY_TYPE]) == NPY_TYPE
+
+
+def request_payload(request):
+    """
+    Returns the candles or history reference a Flask request carries.
+
+    Returns:
+        np.ndarray, list or dict: A structured array for `.npy` bodies, else the
+        parsed JSON.
+
+    Raises:
+        ValueError: If an `.npy` body is malformed.
+    """
+    if request.mimetype == NPY_TYPE:
+        return decode(request.get_data())
+    return request.json
+
+
+def request_payloads(request):
+    """
+    Returns the symbol -> payload mapping a Flask request carries as a bundle or JSON.
+
+    Raises:
+        ValueError: If a bundle is malformed.
+    """
+    if request.mimetype == NPY_TYPE:
+        return unbundle(request.get_data())
+    return request.json
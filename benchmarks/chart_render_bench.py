@@ -0,0 +1,51 @@
+"""
+Benchmark for multi-asset chart rendering.
+
+Renders a three-asset chart with an SMA overlay and volume and volatility panels from
+100-candle and 2000-candle windows, with downsampling and with every candle drawn, and
+reports charts per second on one core.
+
+Usage:
+    $ PYTHONPATH=$(pwd) python benchmarks/chart_render_bench.py
+"""
+from functools import partial
+
+from api import renderer
+from api.data_validation import validate_data
+from api.renderer import Chart, PlotRenderer, Series
+from benchmarks.plot_render_bench import rate
+from benchmarks.validate_data_bench import make_payload
+
+SYMBOLS = ('BTC', 'ETH', 'TON')
+CHARTS = 5
+
+
+def make_chart(candles):
+    """
+    Returns a chart of `SYMBOLS` over `candles` hourly candles.
+    """
+    series = []
+    for symbol in SYMBOLS:
+        df, _ = validate_data(make_payload(candles), extra_fields=('volumeto',))
+        series.append(Series(symbol, df['time'].to_numpy(), df['close'].to_numpy(),
+                             df['volumeto'].to_numpy()))
+    return Chart(series, 'hour', overlay='sma', panels=('volume', 'volatility'), window=10)
+
+
+def main():
+    """
+    Prints charts per second per window length, with and without downsampling.
+    """
+    chart_renderer = PlotRenderer()
+    for candles in (100, 2000):
+        render = partial(chart_renderer.render_chart, make_chart(candles))
+        downsampled = rate(render, CHARTS)
+        renderer.MAX_POINTS = candles
+        full = rate(render, CHARTS)
+        renderer.MAX_POINTS = 200
+        print(f"candles={candles} every candle {full:.1f} charts/s  "
+              f"downsampled {downsampled:.1f} charts/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Benchmark for incremental versus full analytics recomputation.
+
+Slides a window of 2,000 hourly candles forward one candle at a time, as happens when
+a new `hour` bucket opens, and times the statistics update for both approaches.
+
+Usage:
+    $ PYTHONPATH=$(pwd) python benchmarks/incremental_bench.py
+"""
+import time
+
+from api.data_validation import validate_data
+from api.incremental import IncrementalAnalytics
+from benchmarks.validate_data_bench import make_payload
+
+LIMIT = 2000
+STEPS = 200
+
+
+def full_recompute(data):
+    """
+    The `/analytics` path: build the DataFrame and compute every statistic.
+    """
+    df, _ = validate_data(data)
+    return {
+        "average": round(df['close'].mean(), 3),
+        "median": round(df['close'].median(), 3),
+        "min": round(df['low'].min(), 3),
+        "max": round(df['high'].max(), 3),
+    }
+
+
+def main():
+    """
+    Times both approaches over the same sequence of windows and checks they agree.
+    """
+    candles = make_payload(LIMIT + STEPS)
+    windows = [candles[step:step + LIMIT] for step in range(STEPS)]
+    state = IncrementalAnalytics()
+    state.update('BTC:USD:hour', windows[0])
+
+    start = time.perf_counter()
+    expected = [full_recompute(window) for window in windows[1:]]
+    full = (time.perf_counter() - start) / (STEPS - 1)
+
+    start = time.perf_counter()
+    actual = [state.update('BTC:USD:hour', window) for window in windows[1:]]
+    incremental = (time.perf_counter() - start) / (STEPS - 1)
+
+    assert actual == expected
+    print(f"window={LIMIT} full {full * 1000:.3f} ms  incremental {incremental * 1000:.3f} ms  "
+          f"speedup x{full / incremental:.0f}")
+
+
+if __name__ == "__main__":
+    main()
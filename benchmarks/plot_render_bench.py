@@ -0,0 +1,77 @@
+"""
+Benchmark for plot rendering.
+
+Compares the previous `pyplot` implementation of `/plot` against `PlotRenderer` on a
+100-candle hourly window and reports plots per second on one core. The renderer is also
+run from several threads, which the `pyplot` version could not do safely.
+
+Usage:
+    $ PYTHONPATH=$(pwd) python benchmarks/plot_render_bench.py
+"""
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import matplotlib
+import matplotlib.pyplot as plt
+
+from api.data_validation import validate_data
+from api.renderer import PlotRenderer
+from benchmarks.validate_data_bench import make_payload
+
+matplotlib.use('Agg')
+
+CANDLES = 100
+PLOTS = 40
+THREADS = 4
+
+
+def render_pyplot(df):
+    """
+    The previous implementation: a new pyplot figure per request.
+    """
+    plt.figure(figsize=(12, 6))
+    plt.plot(df['time'], df['close'], marker='o')
+    plt.xlabel("Time")
+    plt.ylabel("Close Price")
+    plt.title("Price Trend")
+    plt.grid()
+    buffer = io.BytesIO()
+    plt.savefig(buffer, format='png')
+    plt.close()
+    return buffer.getvalue()
+
+
+def rate(fn, count=PLOTS):
+    """
+    Returns the number of calls of `fn` per second.
+    """
+    fn()
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    """
+    Prints plots per second for both implementations.
+    """
+    df, _ = validate_data(make_payload(CANDLES), 'hour')
+    labels, close = df['time'].to_numpy(), df['close'].to_numpy()
+    renderer = PlotRenderer()
+
+    legacy = rate(lambda: render_pyplot(df))
+    pooled = rate(lambda: renderer.render(labels, close, 'hour'))
+    print(f"candles={CANDLES} pyplot {legacy:.1f} plots/s  renderer {pooled:.1f} plots/s  "
+          f"speedup x{pooled / legacy:.2f}")
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        start = time.perf_counter()
+        list(executor.map(lambda _: renderer.render(labels, close, 'hour'), range(PLOTS)))
+        threaded = PLOTS / (time.perf_counter() - start)
+    print(f"renderer with {THREADS} threads {threaded:.1f} plots/s")
+
+
+if __name__ == "__main__":
+    main()
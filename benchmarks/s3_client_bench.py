@@ -0,0 +1,48 @@
+"""
+Benchmark for S3 client creation versus reuse.
+
+Before `S3Client.shared`, the bot built a new `S3Client`, and therefore a new boto3
+session and client, for every stats request. This measures that cost against fetching
+the shared client. No request is sent to S3.
+
+Usage:
+    $ PYTHONPATH=$(pwd) python benchmarks/s3_client_bench.py
+"""
+import timeit
+
+from utils.s3_client import S3Client
+
+REPEAT = 20
+
+
+def create():
+    """
+    The previous path: a new client per request.
+    """
+    client = S3Client(aws_access_key_id='id', aws_secret_access_key='secret')
+    client._ensure_session()  # pylint: disable=protected-access
+    return client
+
+
+def reuse():
+    """
+    The shared client.
+    """
+    client = S3Client.shared(aws_access_key_id='id', aws_secret_access_key='secret')
+    client._ensure_session()  # pylint: disable=protected-access
+    return client
+
+
+def main():
+    """
+    Prints the time per call of both paths.
+    """
+    reuse()
+    created = timeit.timeit(create, number=REPEAT) / REPEAT
+    reused = timeit.timeit(reuse, number=REPEAT * 1000) / (REPEAT * 1000)
+    print(f"create {created * 1000:.2f} ms  reuse {reused * 1e6:.2f} us  "
+          f"speedup x{created / reused:.0f}")
+
+
+if __name__ == "__main__":
+    main()
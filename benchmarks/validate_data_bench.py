@@ -0,0 +1,78 @@
+"""
+Benchmark for `api.data_validation.validate_data`.
+
+Compares the columnar implementation against the previous per-record loop on a payload
+of 2,000 candles, which is the maximum `limit` accepted by CryptoCompare.
+
+Results (Python 3.11, NumPy 1.23, Pandas 1.5; best of three runs):
+
+    time   per-record  columnar  speedup
+    hour     11.0 ms    0.9 ms   x12-15
+    day      10.5 ms    0.9 ms   x12
+    None     11.4 ms    0.8 ms   x11-15
+
+The speedup depends on the machine. Another run measured about x12 for hour but only
+x9.9 for day and x8.7 for None, below the 10x target. Most of the remaining time, about
+0.4-0.55 ms, goes to pulling each field out of 2,000 dicts. This is the floor for JSON
+records. Windows sent as `.npy` (see `api.wire`) skip that step entirely.
+
+Usage:
+    $ PYTHONPATH=$(pwd) python benchmarks/validate_data_bench.py
+"""
+import timeit
+from datetime import datetime
+
+import pandas as pd
+
+from api.data_validation import validate_data
+
+CANDLES = 2000
+REPEAT = 50
+
+
+def make_payload(size=CANDLES):
+    """
+    Builds a CryptoCompare-like history payload with `size` hourly candles.
+    """
+    return [
+        {
+            "time": 1698278400 + 3600 * i, "high": 101.0 + i, "low": 99.0 + i,
+            "open": 100.0 + i, "close": 100.5 + i, "volumefrom": 12.5, "volumeto": 1250.0,
+            "conversionType": "direct", "conversionSymbol": ""
+        }
+        for i in range(size)
+    ]
+
+
+def validate_data_per_record(data, time=None):
+    """
+    The previous implementation: one dict and one `strftime` call per record.
+    """
+    return pd.DataFrame([
+        {
+            "time": datetime.fromtimestamp(info['time']).strftime(
+                '%H:%M' if time == 'hour' else '%Y-%m-%d' if time == 'day' else str(info['time'])),
+            "high": info['high'],
+            "low": info['low'],
+            "close": info['close']
+        }
+        for info in data
+    ])
+
+
+def main():
+    """
+    Runs both implementations for every time format and prints the speedup.
+    """
+    data = make_payload()
+    for time in ('hour', 'day', None):
+        before = min(timeit.repeat(
+            lambda t=time: validate_data_per_record(data, t), number=REPEAT, repeat=3)) / REPEAT
+        after = min(timeit.repeat(
+            lambda t=time: validate_data(data, t), number=REPEAT, repeat=3)) / REPEAT
+        print(f"time={time!s:5} per-record {before * 1000:7.2f} ms  "
+              f"columnar {after * 1000:6.2f} ms  speedup x{before / after:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Benchmark for the binary candle transport.
+
+Compares JSON records with `.npy` structured arrays for 100-candle and 2000-candle
+windows: bytes on the wire per hop, and the time a receiving service spends turning the
+body into the DataFrame it works on (decode plus `validate_data`). The gateway forwards
+bodies without decoding them, so this is the cost of each analytics and plot hop.
+
+Usage:
+    $ PYTHONPATH=$(pwd) python benchmarks/wire_bench.py
+"""
+import json
+import timeit
+
+from api.candle_store import to_array, to_records
+from api.data_validation import validate_data
+from api.wire import decode, encode
+from benchmarks.validate_data_bench import make_payload
+
+REPEAT = 50
+
+
+def per_call(fn):
+    """
+    Returns the best time of one call of `fn` in milliseconds.
+    """
+    return min(timeit.repeat(fn, number=REPEAT, repeat=3)) / REPEAT * 1000
+
+
+def main():
+    """
+    Prints bytes and receive time per hop for JSON and `.npy`.
+    """
+    for candles in (100, 2000):
+        records = to_records(to_array(make_payload(candles)))
+        as_json, as_npy = json.dumps(records).encode(), encode(to_array(records))
+        json_ms = per_call(lambda body=as_json: validate_data(json.loads(body), 'hour'))
+        npy_ms = per_call(lambda body=as_npy: validate_data(decode(body), 'hour'))
+        print(f"candles={candles:5} json {len(as_json):7} B {json_ms:6.2f} ms  "
+              f"npy {len(as_npy):7} B {npy_ms:6.2f} ms  "
+              f"bytes x{len(as_json) / len(as_npy):.1f} time x{json_ms / npy_ms:.1f}")
+
+
+if __name__ == "__main__":
+    main()
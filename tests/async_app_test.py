@@ -0,0 +1,107 @@
+"""
+Tests for the asynchronous API gateway.
+
+The data, analytics and plot services are replaced by one local aiohttp stand-in server,
+so the gateway routes can be exercised without network access.
+
+Functions being tested:
+- report: Fetches history once and calls analytics and plot concurrently.
+- history: Deduplicates concurrent identical fetches.
+- analytics, plot: Answer with the JSON error shape when their service is down.
+"""
+import asyncio
+import socket
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from api.async_app import create_app
+
+CANDLES = [{"time": 1698278400, "high": 100, "low": 95, "close": 98}]
+
+
+def downstream_app(calls, delay=0.1):
+    """
+    Builds a stand-in for the data, analytics and plot services that counts its calls
+    and answers after `delay` seconds.
+    """
+    async def history(_):
+        calls.append('history')
+        await asyncio.sleep(delay)
+        return web.json_response(CANDLES)
+
+    async def analytics(_):
+        calls.append('analytics')
+        await asyncio.sleep(delay)
+        return web.json_response({"average": 98.0})
+
+    async def plot(_):
+        calls.append('plot')
+        await asyncio.sleep(delay)
+        return web.json_response({"url": True})
+
+    app = web.Application()
+    app.router.add_get('/history/{crypto}/{time}/{currency}/{limit}', history)
+    app.router.add_get('/history_ref/{crypto}/{time}/{currency}/{limit}', history)
+    app.router.add_post('/analytics', analytics)
+    app.router.add_post('/plot/{crypto}/{time}/{time_resp}', plot)
+    return app
+
+
+@pytest.mark.asyncio
+async def test_report_fans_out_concurrently():
+    """
+    /report fetches history once and runs analytics and plot at the same time.
+    """
+    calls = []
+    async with TestServer(downstream_app(calls)) as downstream:
+        base = str(downstream.make_url('')).rstrip('/')
+        gateway = create_app(data_url=base, analytics_url=base, plot_url=base)
+        async with TestClient(TestServer(gateway)) as client:
+            start = asyncio.get_running_loop().time()
+            response = await client.get('/report/BTC/hour/USD/10')
+            elapsed = asyncio.get_running_loop().time() - start
+            body = await response.json()
+
+    assert response.status == 200
+    assert body['stats'] == {"average": 98.0}
+    assert body['plot'] == {"url": True}
+    assert sorted(calls) == ['analytics', 'history', 'plot']
+    assert elapsed < 0.3
+
+
+@pytest.mark.asyncio
+async def test_concurrent_history_is_fetched_once():
+    """
+    Concurrent identical /history requests share one data service call.
+    """
+    calls = []
+    async with TestServer(downstream_app(calls)) as downstream:
+        base = str(downstream.make_url('')).rstrip('/')
+        gateway = create_app(data_url=base, analytics_url=base, plot_url=base)
+        async with TestClient(TestServer(gateway)) as client:
+            responses = await asyncio.gather(
+                *(client.get('/history/BTC/hour/USD/10') for _ in range(10)))
+            bodies = [await response.json() for response in responses]
+
+    assert all(body == CANDLES for body in bodies)
+    assert calls == ['history']
+
+
+@pytest.mark.asyncio
+async def test_down_service_returns_json_error():
+    """
+    /analytics and /plot answer with the gateway's JSON error when their service
+    refuses connections.
+    """
+    with socket.socket() as closed:
+        closed.bind(('127.0.0.1', 0))
+        down = f"http://127.0.0.1:{closed.getsockname()[1]}"
+    async with TestServer(downstream_app([], delay=0)) as downstream:
+        base = str(downstream.make_url('')).rstrip('/')
+        gateway = create_app(data_url=base, analytics_url=down, plot_url=down)
+        async with TestClient(TestServer(gateway)) as client:
+            for path in ('/analytics/BTC/hour/USD/10', '/plot/BTC/hour/USD/10'):
+                response = await client.get(path)
+                assert response.status == 500
+                assert 'error' in await response.json()
@@ -14,9 +14,20 @@ Functions being tested:
             and a cryptocurrency selection keyboard.
 - button_handler: Handles button presses and triggers 
             the corresponding handler for the selected action.
+- handle_cripto_value: Re-sends plots by their cached Telegram file_id and keeps
+            the event loop responsive while the gateway or S3 stall.
+- alert_command and notify: Register price alerts and fire each one once when a
+            streamed price crosses its threshold.
+- listen_prices: Keeps reconnecting after malformed stream events.
 """
-from unittest.mock import AsyncMock, patch
+import asyncio
+import json
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from BOT import alerts, handlers
 from BOT.bot import start, button_handler
 
 
@@ -102,3 +113,162 @@ async def test_button_handler():
         mock_update.callback_query.data = "BTC_callback"
         await button_handler(mock_update, mock_context)
         mock_handle_callback.assert_called_once_with(mock_update.callback_query, "BTC_callback")
+
+@pytest.mark.asyncio
+async def test_plot_file_id_is_reused():
+    """
+    Tests that a plot is uploaded once and then re-sent by its Telegram file_id.
+
+    The gateway report and the plot cache are patched. The first request uploads the
+    image bytes; the second sends the file_id returned by Telegram without loading
+    the image again.
+    """
+    report = {
+        "stats": {"average": 1, "max": 2, "median": 1, "min": 0},
+        "time_resp": "Thu, 26 Oct 2023 07:30:00 GMT"
+    }
+    query = AsyncMock()
+    sent = MagicMock()
+    sent.photo = [MagicMock(file_id="small"), MagicMock(file_id="large")]
+    query.message.reply_photo = AsyncMock(return_value=sent)
+    loader = MagicMock(return_value=b"png")
+
+    handlers.file_ids.clear()
+    with patch("BOT.handlers.async_make_request", AsyncMock(return_value=report)), \
+         patch.object(handlers.plot_cache, "get_or_load", loader):
+        await handlers.handle_cripto_value('hour', query, 'BTC')
+        await handlers.handle_cripto_value('hour', query, 'BTC')
+
+    loader.assert_called_once()
+    first, second = query.message.reply_photo.call_args_list
+    assert first.kwargs['photo'].read() == b"png"
+    assert second.kwargs['photo'] == "large"
+
+@pytest.mark.asyncio
+async def test_event_loop_stays_responsive():
+    """
+    Tests that a stalled gateway and a slow S3 download do not block the event loop.
+
+    A local gateway stand-in answers /report after 0.5 s and the plot download sleeps
+    0.3 s in its thread. A heartbeat task measures how late the event loop wakes it up
+    while the handler runs.
+    """
+    async def stalled_report(_):
+        await asyncio.sleep(0.5)
+        return web.json_response({
+            "stats": {"average": 1, "max": 2, "median": 1, "min": 0},
+            "time_resp": "Thu, 26 Oct 2023 07:30:00 GMT"
+        })
+
+    def slow_download(*_):
+        time.sleep(0.3)
+        return b"png"
+
+    gateway = web.Application()
+    gateway.router.add_get('/{tail:.*}', stalled_report)
+    query = AsyncMock()
+    lags = []
+
+    async def heartbeat(done):
+        while not done.is_set():
+            began = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append(time.perf_counter() - began - 0.01)
+
+    handlers.file_ids.clear()
+    async with TestServer(gateway) as server:
+        with patch("BOT.handlers.BASE_URL", str(server.make_url(''))), \
+             patch.object(handlers.plot_cache, "get_or_load", slow_download):
+            done = asyncio.Event()
+            beat = asyncio.create_task(heartbeat(done))
+            await handlers.handle_cripto_value('hour', query, 'BTC')
+            done.set()
+            await beat
+
+    query.message.reply_photo.assert_called_once()
+    assert len(lags) > 30
+    assert max(lags) < 0.1
+
+
+@pytest.mark.asyncio
+async def test_plot_is_sent_by_presigned_url():
+    """
+    Tests that the presigned URL from the gateway report is passed to Telegram as is,
+    without loading the image bytes.
+    """
+    report = {
+        "stats": {"average": 1, "max": 2, "median": 1, "min": 0},
+        "plot": {"url": "https://s3.example/plots/BTC.png?X-Amz-Signature=abc"},
+        "time_resp": "Thu, 26 Oct 2023 08:30:00 GMT"
+    }
+    query = AsyncMock()
+    loader = MagicMock(return_value=b"png")
+
+    handlers.file_ids.clear()
+    with patch("BOT.handlers.async_make_request", AsyncMock(return_value=report)), \
+         patch.object(handlers.plot_cache, "get_or_load", loader):
+        await handlers.handle_cripto_value('day', query, 'BTC')
+
+    loader.assert_not_called()
+    assert query.message.reply_photo.call_args.kwargs['photo'] == report['plot']['url']
+
+
+@pytest.mark.asyncio
+async def test_price_alert_fires_once():
+    """
+    Tests that an alert set above the current price fires once when a streamed price
+    reaches it, and that parsed stream events reach every alert of the symbol.
+    """
+    alerts.book.prices.clear()
+    alerts.book.clear(42)
+    alerts.book.clear(7)
+    update = AsyncMock()
+    update.effective_chat.id = 42
+    context = MagicMock(args=['btc', '35000'])
+    with patch("BOT.alerts.async_make_request",
+               AsyncMock(return_value={"BTC": "34000.5 USD"})):
+        await alerts.alert_command(update, context)
+    assert "выше 35000.0" in update.message.reply_text.call_args.args[0]
+    alerts.book.add(7, 'BTC', 33000.0, 34000.5)
+
+    async def lines():
+        for price in (34500.0, 35100.0, 35200.0):
+            yield 'event: price'
+            yield 'data: ' + json.dumps({"symbol": "BTC", "currency": "USD", "price": price})
+            yield ''
+
+    bot = AsyncMock()
+    async for event in alerts.parse_events(lines()):
+        await alerts.notify(bot, event)
+
+    bot.send_message.assert_called_once()
+    assert bot.send_message.call_args.kwargs['chat_id'] == 42
+    assert alerts.book.for_chat(42) == []
+    assert [alert.above for alert in alerts.book.for_chat(7)] == [False]
+
+
+@pytest.mark.asyncio
+async def test_alerts_survive_malformed_data():
+    """
+    Tests that a latest price without the requested symbol is reported to the user and
+    that a malformed stream event does not end the price listener.
+    """
+    alerts.book.prices.clear()
+    update = AsyncMock()
+    update.effective_chat.id = 42
+    with patch("BOT.alerts.async_make_request", AsyncMock(return_value={"ETH": "1800 USD"})):
+        await alerts.alert_command(update, MagicMock(args=['btc', '35000']))
+    assert update.message.reply_text.call_args.args[0].startswith("Ошибка")
+
+    async def lines():
+        for line in ('event: price', 'data: {"price": 1.0}', ''):
+            yield line
+
+    response = MagicMock()
+    response.aiter_lines = lines
+    client = MagicMock()
+    client.stream.return_value.__aenter__.return_value = response
+    with patch("BOT.alerts.get_async_client", return_value=client), \
+         patch("BOT.alerts.asyncio.sleep", AsyncMock(side_effect=asyncio.CancelledError)):
+        with pytest.raises(asyncio.CancelledError):
+            await alerts.listen_prices(AsyncMock())
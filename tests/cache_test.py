@@ -0,0 +1,66 @@
+"""
+Tests for the upstream response cache.
+
+This module checks TTL expiry, LRU eviction and counters of `utils.cache.TTLCache`,
+and the candle bucket boundaries used to expire history entries.
+"""
+from utils.cache import TTLCache
+from utils.time_formater import bucket_end, bucket_start
+
+
+def fake_clock(now):
+    """
+    Returns a manually advanced clock for deterministic expiry tests.
+    """
+    state = [now]
+
+    def clock():
+        return state[0]
+    return clock, state
+
+
+def test_ttl_expiry():
+    """
+    Entries are served until their TTL passes and then count as misses.
+    """
+    clock, now = fake_clock(1000.0)
+    cache = TTLCache(maxsize=4, ttl=5, clock=clock)
+    cache.set('price', 1)
+    assert cache.get('price') == 1
+
+    now[0] += 5
+    assert cache.get('price') is None
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+    assert len(cache) == 0
+
+
+def test_expires_at_bucket_end():
+    """
+    History entries stay valid until the candle bucket rolls over.
+    """
+    clock, now = fake_clock(7200 + 1800)
+    cache = TTLCache(maxsize=4, clock=clock)
+    cache.set('history', [1, 2], expires_at=bucket_end('hour', now[0]))
+    assert bucket_start('hour', now[0]) == 7200
+
+    now[0] = 10799
+    assert cache.get('history') == [1, 2]
+    now[0] = 10800
+    assert cache.get('history') is None
+
+
+def test_lru_eviction():
+    """
+    The least recently used entry is evicted when the cache is full.
+    """
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
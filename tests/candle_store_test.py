@@ -0,0 +1,138 @@
+"""
+Tests for the local candle store and the gap-filling history loader.
+
+A fake upstream serves hourly candles the way CryptoCompare does (`limit + 1` candles
+ending at `toTs`) and records every call, so the tests can check that stored candles
+are never fetched again.
+"""
+import numpy as np
+
+from api import analytics, data_service
+from api.candle_store import CandleStore, missing_ranges, to_array, to_records
+
+HOUR = 3600
+NOW = 1698278400 + 100 * HOUR + 1234
+
+
+def fake_upstream(calls):
+    """
+    Returns a `make_request` stand-in that serves candles ending at `toTs`.
+    """
+    def make_request(endpoint, params):
+        calls.append((endpoint, params['toTs'], params['limit']))
+        step = {'v2/histominute': 60, 'v2/histoday': 24 * HOUR}.get(endpoint, HOUR)
+        first = params['toTs'] - params['limit'] * step
+        return {"Response": "Success", "Data": {"Data": [
+            {"time": t, "high": t + 2.0, "low": t - 2.0, "open": float(t),
+             "volumefrom": 1.0, "volumeto": 2.0, "close": t + 1.0}
+            for t in range(first, params['toTs'] + 1, step)
+        ]}}
+    return make_request
+
+
+def test_missing_ranges():
+    """
+    Gaps are reported as inclusive ranges of the time grid.
+    """
+    times = np.array([10, 20, 50, 60], dtype=np.int64)
+    assert missing_ranges(times, 0, 80, 10) == [(0, 0), (30, 40), (70, 80)]
+    assert not missing_ranges(times, 50, 60, 10)
+
+
+def test_merge_replaces_and_sorts(tmp_path):
+    """
+    Merged candles are sorted, unique by time, and new values win.
+    """
+    store = CandleStore(str(tmp_path))
+    fields = {"high": 1.0, "low": 1.0, "open": 1.0, "volumefrom": 1.0, "volumeto": 1.0}
+    store.merge('BTC', 'USD', 'hour', to_array([
+        {"time": 20, "close": 1.0, **fields}, {"time": 10, "close": 1.0, **fields}]))
+    merged = store.merge('BTC', 'USD', 'hour', to_array([{"time": 20, "close": 5.0, **fields}]))
+    assert merged['time'].tolist() == [10, 20]
+    assert store.load('BTC', 'USD', 'hour')['close'].tolist() == [1.0, 5.0]
+
+
+def test_history_fetches_only_missing_candles(tmp_path, monkeypatch):
+    """
+    A repeated history request fetches only the new candles and the open candle.
+    """
+    calls = []
+    monkeypatch.setattr(data_service, 'store', CandleStore(str(tmp_path)))
+    monkeypatch.setattr(data_service, 'make_request', fake_upstream(calls))
+    open_time = NOW - NOW % HOUR
+
+    first = data_service.load_history('BTC', 'USD', 'hour', 10, now=NOW)
+    assert [c['time'] for c in first] == list(range(open_time - 10 * HOUR, open_time + 1, HOUR))
+    assert len(calls) == 1
+    assert data_service.store.load('BTC', 'USD', 'hour')['time'][-1] == open_time - HOUR
+
+    calls.clear()
+    second = data_service.load_history('BTC', 'USD', 'hour', 10, now=NOW + 2 * HOUR)
+    assert [c['time'] for c in second][-1] == open_time + 2 * HOUR
+    assert len(second) == 11
+    assert calls == [('v2/histohour', open_time + 2 * HOUR, 2)]
+    assert second[:8] == first[2:-1]
+
+    calls.clear()
+    data_service.load_history('BTC', 'USD', 'hour', 14, now=NOW + 2 * HOUR)
+    assert calls == [('v2/histohour', open_time - 11 * HOUR, 1),
+                     ('v2/histohour', open_time + 2 * HOUR, 1)]
+
+
+def test_history_pages_long_ranges(tmp_path, monkeypatch):
+    """
+    Ranges longer than one upstream call are fetched in pages using `toTs`.
+    """
+    calls = []
+    monkeypatch.setattr(data_service, 'store', CandleStore(str(tmp_path)))
+    monkeypatch.setattr(data_service, 'make_request', fake_upstream(calls))
+    monkeypatch.setattr(data_service, 'MAX_LIMIT', 4)
+
+    history = data_service.load_history('BTC', 'USD', 'hour', 10, now=NOW)
+    times = [c['time'] for c in history]
+    assert times == sorted(set(times)) and len(times) == 11
+    assert len(calls) == 3
+
+
+def test_history_ref_resolves_to_mapped_window(tmp_path, monkeypatch):
+    """
+    A history reference resolves to the same candles as /history, read from a memory map,
+    and `/analytics` computes the same result for both payloads.
+    """
+    store = CandleStore(str(tmp_path))
+    monkeypatch.setattr(data_service, 'store', store)
+    monkeypatch.setattr(data_service, 'make_request', fake_upstream([]))
+    monkeypatch.setattr(analytics, 'store', store)
+
+    records = data_service.load_history('BTC', 'USD', 'hour', 10, now=NOW)
+    ref = data_service.history_ref('BTC', 'USD', 'hour', 10, now=NOW)
+    assert len(ref['open']) == 1
+    assert isinstance(store.open('BTC', 'USD', 'hour'), np.memmap)
+    assert to_records(store.resolve(ref)) == records
+
+    client = analytics.app.test_client()
+    expected = client.post('/analytics?metrics=sma,vwap', json=records).get_json()
+    assert client.post('/analytics?metrics=sma,vwap', json=ref).get_json() == expected
+    assert client.post('/analytics?series=BTC:USD:hour', json=ref).get_json() == {
+        key: expected[key] for key in ('average', 'median', 'min', 'max')}
+    assert client.post('/analytics', json={"series": {}}).status_code == 400
+
+
+def test_history_limit_is_bounded(tmp_path, monkeypatch):
+    """
+    Hour and day limits beyond `MAX_HISTORY_LIMIT` base candles are rejected before any
+    upstream call, and the store keeps at most `max_candles` per series.
+    """
+    calls = []
+    monkeypatch.setattr(data_service, 'store', CandleStore(str(tmp_path), max_candles=12))
+    monkeypatch.setattr(data_service, 'make_request', fake_upstream(calls))
+    monkeypatch.setattr(data_service, 'MAX_HISTORY_LIMIT', 20)
+    client = data_service.app.test_client()
+
+    for path in ('/history/BTC/hour/USD/21', '/history/BTC/day/USD/100000000',
+                 '/history/BTC/4h/USD/6', '/history_ref/BTC/hour/USD/21'):
+        assert client.get(path).status_code == 400
+    assert not calls
+
+    assert client.get('/history/BTC/hour/USD/20').status_code == 200
+    assert len(data_service.store.load('BTC', 'USD', 'hour')) == 12
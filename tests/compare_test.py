@@ -0,0 +1,94 @@
+"""
+Tests for the multi-asset comparison engine.
+
+This module checks the timestamp alignment of several histories and compares the
+vectorized correlation, beta and rolling covariance with Pandas, and exercises the
+/compare route of the analytics service.
+"""
+import numpy as np
+import pandas as pd
+
+from api import analytics
+from api.candle_store import CANDLE_DTYPE
+from api.compare import align, compare
+
+HOUR = 3600
+
+
+def candles(times, close):
+    """
+    Returns candle records with the given timestamps and close prices.
+    """
+    return [{"time": int(t), "high": c, "low": c, "close": c} for t, c in zip(times, close)]
+
+
+def random_prices(rng, n):
+    """
+    Returns a positive random walk of `n` prices.
+    """
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+
+
+def test_align_keeps_common_timestamps():
+    """
+    Only timestamps present in every history end up in the matrix, in column order.
+    """
+    times, matrix = align({
+        'BTC': (np.array([1, 2, 3, 4]), np.array([10.0, 20.0, 30.0, 40.0])),
+        'ETH': (np.array([2, 3, 4, 5]), np.array([2.0, 3.0, 4.0, 5.0])),
+    })
+    assert times.tolist() == [2, 3, 4]
+    assert matrix.tolist() == [[20.0, 2.0], [30.0, 3.0], [40.0, 4.0]]
+
+
+def test_metrics_match_pandas():
+    """
+    Correlation, beta, performance and rolling covariance equal their Pandas versions.
+    """
+    rng = np.random.default_rng(7)
+    times = np.arange(60) * HOUR
+    close = {symbol: random_prices(rng, 60) for symbol in ('BTC', 'ETH', 'TON')}
+    payloads = {symbol: candles(times, prices) for symbol, prices in close.items()}
+    payloads['ETH'] = payloads['ETH'][5:]  # a shorter history
+
+    result = compare(payloads, window=10)
+
+    frame = pd.DataFrame(close).iloc[5:]
+    returns = np.log(frame).diff()
+    assert result['time'] == times[5:].tolist()
+    assert np.allclose(
+        pd.DataFrame(result['correlation']).loc[list(frame), list(frame)], returns.corr(),
+        atol=1e-3)
+    beta = returns.cov()['BTC'] / returns['BTC'].var()
+    assert np.allclose(pd.Series(result['beta'])[beta.index], beta, atol=1e-3)
+    assert result['performance']['TON'] == round(
+        (frame['TON'].iloc[-1] / frame['TON'].iloc[0] - 1) * 100, 3)
+
+    expected = returns['ETH'].rolling(10).cov(returns['BTC']).to_numpy()
+    actual = np.array(result['rolling_covariance']['ETH'], dtype=float)
+    assert np.array_equal(np.isnan(actual), np.isnan(expected))
+    assert np.allclose(actual[~np.isnan(actual)], expected[~np.isnan(expected)], atol=1e-9)
+
+
+def test_compare_route():
+    """
+    /compare accepts records and structured arrays and rejects invalid requests.
+    """
+    rng = np.random.default_rng(1)
+    times = np.arange(20) * HOUR
+    array = np.zeros(20, dtype=CANDLE_DTYPE)
+    array['time'], array['close'] = times, random_prices(rng, 20)
+    assert compare({'BTC': candles(times, random_prices(rng, 20)), 'ETH': array},
+                   benchmark='ETH')['beta']['ETH'] == 1.0
+
+    client = analytics.app.test_client()
+    payload = {'BTC': candles(times, random_prices(rng, 20)),
+               'TON': candles(times, random_prices(rng, 20))}
+    response = client.post('/compare?window=5', json=payload)
+    assert response.status_code == 200
+    assert response.get_json()['benchmark'] == 'BTC'
+    assert response.get_json()['correlation']['TON']['TON'] == 1.0
+
+    assert client.post('/compare', json={'BTC': payload['BTC']}).status_code == 400
+    assert client.post('/compare?benchmark=ETH', json=payload).status_code == 400
+    assert client.post('/compare?window=1', json=payload).status_code == 400
@@ -0,0 +1,47 @@
+"""
+Tests for the columnar `validate_data` path.
+
+This module checks that vectorized timestamp formatting matches per-record
+`datetime.fromtimestamp(...).strftime(...)` and that malformed payloads are rejected.
+"""
+from datetime import datetime
+from flask import Flask
+
+from api.data_validation import validate_data
+
+DATA = [
+    {"time": 1698278400 + 3600 * i + 61 * i, "high": 101.0 + i, "low": 99.0, "close": 100.0}
+    for i in range(300)
+]
+
+
+def test_timestamps_match_strftime():
+    """
+    Hour and day labels are identical to formatting every record with `strftime`.
+    """
+    for time, fmt in (('hour', '%H:%M'), ('day', '%Y-%m-%d')):
+        df, error = validate_data(DATA, time)
+        assert error is None
+        assert list(df.columns) == ['time', 'high', 'low', 'close']
+        assert df['time'].tolist() == [
+            datetime.fromtimestamp(info['time']).strftime(fmt) for info in DATA]
+    df, _ = validate_data(DATA)
+    assert df['time'].tolist() == [info['time'] for info in DATA]
+    assert df['high'].tolist() == [info['high'] for info in DATA]
+
+
+def test_invalid_payloads():
+    """
+    Empty data, missing fields and non-numeric values produce error responses.
+    """
+    with Flask(__name__).app_context():
+        _, error = validate_data([])
+        assert error.json == {"error": "No data provided"}
+
+        _, (error, status) = validate_data([{"time": 1698278400, "high": 1, "low": 1}])
+        assert status == 400
+        assert 'close' in error.json['error']
+
+        _, (error, status) = validate_data(
+            [{"time": 1698278400, "high": "n/a", "low": 1, "close": 1}])
+        assert status == 400
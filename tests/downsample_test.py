@@ -0,0 +1,123 @@
+"""
+Tests for series downsampling.
+
+This module checks that LTTB keeps the endpoints and the visual extremes of a long
+series, that min/max decimation keeps every spike, and that OHLC buckets keep the
+extremes and totals of a candle window, also through the data service /history route,
+and that the analytics service samples rolling metrics at the LTTB candles.
+"""
+import numpy as np
+
+from api import analytics, data_service
+from api.candle_store import CandleStore, to_array
+from api.downsample import downsample_candles, lttb, minmax
+from tests.candle_store_test import fake_upstream
+
+
+def test_lttb_keeps_shape():
+    """
+    LTTB returns the requested number of ascending indices including both endpoints,
+    and keeps the extremes of a noisy series.
+    """
+    rng = np.random.default_rng(3)
+    x = np.arange(2000) * 3600
+    y = np.cumsum(rng.normal(0, 1, 2000))
+    keep = lttb(x, y, 200)
+
+    assert len(keep) == 200
+    assert keep[0] == 0 and keep[-1] == 1999
+    assert np.all(np.diff(keep) > 0)
+    assert y[keep].max() > y.max() - 0.01 * np.ptp(y)
+    assert y[keep].min() < y.min() + 0.01 * np.ptp(y)
+    # The downsampled line stays close to the original one.
+    error = np.abs(np.interp(x, x[keep], y[keep]) - y).mean()
+    assert error < 0.1 * np.ptp(y)
+
+
+def test_lttb_short_series_is_unchanged():
+    """
+    Series not longer than the requested number of points are kept as they are.
+    """
+    assert lttb(np.arange(5), np.ones(5), 10).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_minmax_keeps_spikes():
+    """
+    Min/max decimation keeps every spike of a volume-like series.
+    """
+    y = np.ones(1000)
+    spikes = [17, 503, 998]
+    y[spikes] = 50.0
+    y[250] = 0.0
+    keep = minmax(y, 100)
+
+    assert len(keep) <= 100
+    assert set(spikes + [250]) <= set(keep.tolist())
+    assert np.all(np.diff(keep) > 0)
+
+
+def test_ohlc_buckets_keep_extremes_and_totals():
+    """
+    Merged candles keep the first open, the last close, the highest high, the lowest
+    low and the total volume of the window, and every bucket its own extremes.
+    """
+    rng = np.random.default_rng(5)
+    close = 100 + np.cumsum(rng.normal(0, 1, 1000))
+    candles = to_array([
+        {"time": 3600 * i, "open": c - 0.5, "high": c + rng.random(), "low": c - rng.random(),
+         "close": c, "volumefrom": rng.random(), "volumeto": rng.random()}
+        for i, c in enumerate(close)
+    ])
+    merged = downsample_candles(candles, 100)
+
+    assert len(merged) == 100
+    assert merged['time'].tolist() == candles['time'][::10].tolist()
+    assert merged['open'][0] == candles['open'][0]
+    assert merged['close'][-1] == candles['close'][-1]
+    assert merged['high'].max() == candles['high'].max()
+    assert merged['low'].min() == candles['low'].min()
+    assert np.isclose(merged['volumeto'].sum(), candles['volumeto'].sum())
+    assert np.array_equal(merged['high'], candles['high'].reshape(100, 10).max(axis=1))
+    assert np.array_equal(merged['close'], candles['close'][9::10])
+
+
+def test_history_route_downsamples(tmp_path, monkeypatch):
+    """
+    /history?points=N returns at most N candles in a smaller payload, and rejects
+    unknown methods.
+    """
+    monkeypatch.setattr(data_service, 'store', CandleStore(str(tmp_path)))
+    monkeypatch.setattr(data_service, 'make_request', fake_upstream([]))
+    client = data_service.app.test_client()
+
+    full = client.get('/history/DSMP/hour/USD/1000')
+    reduced = client.get('/history/DSMP/hour/USD/1000?points=100')
+    selected = client.get('/history/DSMP/hour/USD/1000?points=100&method=lttb')
+
+    assert full.status_code == reduced.status_code == selected.status_code == 200
+    candles, merged = full.get_json(), reduced.get_json()
+    assert len(merged) == len(selected.get_json()) == 100
+    assert len(reduced.data) < len(full.data) / 5
+    assert merged[-1]['close'] == candles[-1]['close']
+    assert max(c['high'] for c in merged) == max(c['high'] for c in candles)
+    assert client.get('/history/DSMP/hour/USD/1000?points=100&method=x').status_code == 400
+    assert client.get('/history/DSMP/hour/USD/1000?points=0').status_code == 400
+
+
+def test_analytics_samples_metrics():
+    """
+    With `points`, rolling metrics computed on every candle are returned at the LTTB
+    candles only, with their times.
+    """
+    candles = [{"time": 3600 * i, "high": 101.0 + i % 7, "low": 99.0, "close": 100.0 + i % 7}
+               for i in range(500)]
+    client = analytics.app.test_client()
+    full = client.post('/analytics?metrics=sma', json=candles).get_json()
+    response = client.post('/analytics?metrics=sma&points=50', json=candles)
+
+    result = response.get_json()
+    assert response.status_code == 200
+    assert len(result['time']) == len(result['metrics']['sma']) == 50
+    assert result['metrics']['sma'][-1] == full['metrics']['sma'][-1]
+    assert result['max'] == full['max']
+    assert client.post('/analytics?points=2', json=candles).status_code == 400
@@ -0,0 +1,102 @@
+"""
+Tests for the incremental analytics state.
+
+A simulated hourly feed slides the history window forward and revises the still-open
+last candle; after every step the incremental statistics must equal the full
+recomputation done by `/analytics`.
+"""
+import math
+import random
+import statistics
+from collections import deque
+
+import pytest
+
+from api.analytics import app
+from api.incremental import IncrementalAnalytics, SlidingMedian
+
+
+def simulated_windows(limit=25, steps=60, seed=7):
+    """
+    Yields history payloads as CryptoCompare would return them hour after hour,
+    including repeated requests within an hour with a revised last candle.
+    """
+    rng = random.Random(seed)
+    candles = []
+    price = 100.0
+    for i in range(limit + steps):
+        price = round(max(1.0, price + rng.uniform(-3, 3)), 2)
+        high = round(price + rng.uniform(0, 2), 2)
+        low = round(price - rng.uniform(0, 2), 2)
+        candles.append({"time": 1698278400 + 3600 * i, "high": high, "low": low, "close": price})
+        if len(candles) < limit:
+            continue
+        yield [dict(c) for c in candles[-limit:]]
+        revised = dict(candles[-1], close=round(price + rng.choice([-1, 0, 1]) * 0.5, 2))
+        revised['high'] = max(revised['high'], revised['close'])
+        revised['low'] = min(revised['low'], revised['close'])
+        candles[-1] = revised
+        yield [dict(c) for c in candles[-limit:]]
+
+
+def test_incremental_matches_full_recompute():
+    """
+    Incremental statistics equal `/analytics` output for every window.
+    """
+    client = app.test_client()
+    state = IncrementalAnalytics()
+    for data in simulated_windows():
+        expected = client.post('/analytics', json=data).get_json()
+        actual = state.update('BTC:USD:hour', data)
+        for key, value in expected.items():
+            assert math.isclose(actual[key], value, abs_tol=1e-3), (key, actual, expected)
+
+    counters = state.stats()
+    assert counters['rebuilds'] == 1
+    assert counters['updates'] > 100
+
+
+def test_route_uses_incremental_state():
+    """
+    `/analytics?series=...` serves the same result and rebuilds on a window size change.
+    """
+    client = app.test_client()
+    windows = list(simulated_windows(limit=10, steps=3))
+    for data in windows:
+        full = client.post('/analytics', json=data).get_json()
+        assert client.post('/analytics?series=ETH:USD:hour', json=data).get_json() == full
+    assert client.post('/analytics?series=ETH:USD:hour', json=windows[-1][1:]).status_code == 200
+    assert client.post('/analytics?series=ETH:USD:hour', json=[{"time": 1}]).status_code == 400
+
+
+def test_sliding_median_memory_is_bounded():
+    """
+    A long-running sliding median stays correct and keeps its heaps and removal
+    records bounded by the window size.
+    """
+    rng = random.Random(3)
+    median, window = SlidingMedian(), deque()
+    for _ in range(50000):
+        value = rng.randint(0, 50)
+        median.add(value)
+        window.append(value)
+        if len(window) > 10:
+            median.remove(window.popleft())
+    assert median.median() == statistics.median(window)
+    heaps = len(median._low) + len(median._high)  # pylint: disable=protected-access
+    assert heaps <= 2 * 10 + 8
+    assert len(median._delayed) <= 10 + 8  # pylint: disable=protected-access
+
+
+def test_malformed_record_drops_state():
+    """
+    A non-numeric value raises ValueError and leaves no half-applied window behind.
+    """
+    state = IncrementalAnalytics()
+    data = next(simulated_windows(limit=5, steps=1))
+    state.update('BTC:USD:hour', data)
+    broken = [dict(c) for c in data]
+    broken[-1]['close'] = 'n/a'
+    with pytest.raises(ValueError):
+        state.update('BTC:USD:hour', broken)
+    assert state.stats()['series'] == 0
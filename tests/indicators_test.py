@@ -0,0 +1,64 @@
+"""
+Tests for the rolling analytics engine and the /analytics query parameters.
+
+Vectorized metrics are compared against straightforward reference computations.
+"""
+import math
+import numpy as np
+
+from api.analytics import app
+from api.data_validation import validate_data
+from api.indicators import compute_metrics
+
+DATA = [
+    {"time": 1698278400 + 3600 * i, "open": 100.0 + i, "high": 102.0 + i + i % 3,
+     "low": 98.0 + i - i % 2, "close": 100.0 + i + (-1) ** i * 1.5,
+     "volumefrom": 10.0 + i, "volumeto": (10.0 + i) * (100.0 + i)}
+    for i in range(30)
+]
+
+
+def test_metrics_match_reference():
+    """
+    SMA, VWAP, percent change, volatility and drawdown match direct formulas.
+    """
+    df, _ = validate_data(DATA, extra_fields=('volumefrom', 'volumeto'))
+    window = 4
+    result = compute_metrics(
+        df, ['sma', 'vwap', 'pct_change', 'volatility', 'max_drawdown'], window)
+    close = [info['close'] for info in DATA]
+
+    assert result['sma'][:window - 1] == [None] * (window - 1)
+    assert math.isclose(result['sma'][-1], round(sum(close[-window:]) / window, 3))
+
+    last = DATA[-window:]
+    expected_vwap = sum(c['volumeto'] for c in last) / sum(c['volumefrom'] for c in last)
+    assert math.isclose(result['vwap'][-1], round(expected_vwap, 3))
+
+    assert math.isclose(result['pct_change'][-1],
+                        round((close[-1] / close[-1 - window] - 1) * 100, 3))
+
+    log_returns = np.diff(np.log(close))[-window:]
+    assert math.isclose(result['volatility'][-1], np.std(log_returns, ddof=1), rel_tol=1e-6)
+
+    peak, worst = close[0], 0.0
+    for price in close:
+        peak = max(peak, price)
+        worst = min(worst, price / peak - 1)
+    assert math.isclose(result['max_drawdown'], round(worst * 100, 3))
+
+
+def test_analytics_route_metrics():
+    """
+    /analytics keeps the basic statistics and adds requested metrics.
+    """
+    client = app.test_client()
+    response = client.post('/analytics?metrics=ema,atr&window=3', json=DATA)
+    body = response.get_json()
+    assert response.status_code == 200
+    assert {'average', 'median', 'min', 'max'} <= set(body)
+    assert len(body['metrics']['ema']) == len(DATA)
+    assert len(body['metrics']['atr']) == len(DATA)
+
+    assert 'metrics' not in client.post('/analytics', json=DATA).get_json()
+    assert client.post('/analytics?metrics=rsi', json=DATA).status_code == 400
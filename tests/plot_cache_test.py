@@ -0,0 +1,97 @@
+"""
+Tests for the tiered plot cache.
+
+This module checks lookups through the memory and disk tiers, eviction by byte budget,
+that a loader such as an S3 download only runs on a miss, and that existence checks
+ask S3 once per key.
+"""
+from datetime import datetime
+
+from utils.plot_cache import PlotCache, chart_key, plot_key
+
+
+def test_plot_key():
+    """
+    Hourly plots are keyed per hour, other plots per day.
+    """
+    time_resp = datetime(2023, 10, 26, 7, 30)
+    assert plot_key('BTC', 'hour', time_resp) == "BTC/hour/2023-10-26/07/plot.png"
+    assert plot_key('BTC', 'day', time_resp) == "BTC/day/2023-10-26/plot.png"
+
+
+def test_chart_key_includes_currency():
+    """
+    Charts of the same assets in other currencies are stored under other keys.
+    """
+    time_resp = datetime(2023, 10, 26, 7, 30)
+    usd = chart_key(['BTC', 'ETH'], 'hour', 'USD', time_resp, '100-close-5')
+    assert usd == "BTC-ETH/hour/2023-10-26/07/chart-USD-100-close-5.png"
+    assert chart_key(['BTC', 'ETH'], 'hour', 'EUR', time_resp, '100-close-5') != usd
+
+
+def test_loader_runs_only_on_miss(tmp_path):
+    """
+    The first lookup loads the image; later lookups come from memory, and a new
+    process finds it on disk.
+    """
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return b'png-bytes'
+
+    cache = PlotCache(memory_bytes=1024, disk_dir=str(tmp_path))
+    key = "BTC/hour/2023-10-26/07/plot.png"
+    for _ in range(3):
+        assert cache.get_or_load(key, loader) == b'png-bytes'
+    assert len(loads) == 1
+    assert cache.stats()['memory_hits'] == 2
+
+    restarted = PlotCache(memory_bytes=1024, disk_dir=str(tmp_path))
+    assert restarted.get_or_load(key, loader) == b'png-bytes'
+    assert len(loads) == 1
+    stats = restarted.stats()
+    assert stats['disk_hits'] == 1 and stats['disk_entries'] == 1
+    assert stats['hit_rate'] == 1.0
+
+
+def test_eviction_by_byte_budget(tmp_path):
+    """
+    Both tiers evict least recently used images to stay within their byte budgets.
+    """
+    cache = PlotCache(memory_bytes=25, disk_dir=str(tmp_path), disk_bytes=35)
+    for name in 'abcd':
+        cache.put(f"BTC/day/{name}/plot.png", name.encode() * 10)
+    cache.get("BTC/day/c/plot.png")
+
+    stats = cache.stats()
+    assert stats['memory_bytes'] <= 25 and stats['disk_bytes'] <= 35
+    assert stats['disk_entries'] == 3 and stats['disk_evictions'] == 1
+    assert cache.get("BTC/day/a/plot.png") is None
+    assert cache.get("BTC/day/b/plot.png") == b'b' * 10
+    assert not (tmp_path / "BTC/day/a/plot.png").exists()
+
+
+def test_exists_asks_s3_once(tmp_path):
+    """
+    `exists` asks S3 only for unknown keys, remembers positive answers and reads no
+    image bytes.
+    """
+    heads = []
+
+    def check(stored):
+        heads.append(stored)
+        return stored
+
+    cache = PlotCache(memory_bytes=1024, disk_dir=str(tmp_path))
+    for _ in range(3):
+        assert cache.exists("BTC/day/s3/plot.png", lambda: check(True))
+    assert not cache.exists("BTC/day/missing/plot.png", lambda: check(False))
+    assert not cache.exists("BTC/day/missing/plot.png", lambda: check(False))
+    assert heads == [True, False, False]
+
+    cache.put("BTC/day/local/plot.png", b'png-bytes')
+    restarted = PlotCache(memory_bytes=1024, disk_dir=str(tmp_path))
+    assert restarted.exists("BTC/day/local/plot.png", lambda: check(True))
+    stats = restarted.stats()
+    assert len(heads) == 3 and stats['disk_hits'] == 1 and stats['memory_entries'] == 0
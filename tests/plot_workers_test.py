@@ -0,0 +1,67 @@
+"""
+Tests for the plot rendering worker pool.
+
+Functions being tested:
+- render: Renders in a worker process to the same PNG as an in-process render.
+- submit: Rejects jobs beyond the queue bound with `QueueFull`.
+- result: Restarts the pool when a worker process dies.
+"""
+import os
+import time
+
+import numpy as np
+import pytest
+
+from api.data_validation import format_timestamps
+from api.plot_workers import PlotWorkerPool, QueueFull, WorkerCrashed
+from api.renderer import PlotRenderer
+
+TIMESTAMPS = 1698278400 + 3600 * np.arange(48, dtype=np.int64)
+CLOSE = 100 + np.sin(np.arange(48.0))
+
+
+@pytest.fixture(name="pool")
+def pool_fixture():
+    """
+    A pool with one worker process and no waiting room.
+    """
+    pool = PlotWorkerPool(processes=1, max_queue=0)
+    pool.start()
+    yield pool
+    pool.shutdown()
+
+
+def test_worker_render_matches_in_process_render(pool):
+    """
+    A worker renders the same PNG as `PlotRenderer` in the calling process.
+    """
+    expected = PlotRenderer().render(format_timestamps(TIMESTAMPS, 'hour'), CLOSE, 'hour')
+    assert pool.render(TIMESTAMPS, CLOSE, 'hour') == expected
+    stats = pool.stats()
+    assert stats['completed'] == 1 and stats['pending'] == 0
+    assert stats['render']['count'] >= 1
+
+
+def test_full_queue_rejects_jobs(pool):
+    """
+    Jobs beyond the bound are rejected until a slot frees up.
+    """
+    job = pool.submit(TIMESTAMPS, CLOSE, 'hour')
+    with pytest.raises(QueueFull):
+        pool.submit(TIMESTAMPS, CLOSE, 'hour')
+    assert pool.stats()['rejected'] == 1
+    job.result()
+    while pool.stats()['pending']:  # the slot is freed by a done callback
+        time.sleep(0.01)
+    assert pool.render(TIMESTAMPS, CLOSE, 'hour').startswith(b'\x89PNG')
+
+
+def test_crashed_worker_restarts_pool(pool):
+    """
+    A job whose worker dies raises `WorkerCrashed`; the pool is replaced and renders again.
+    """
+    with pytest.raises(WorkerCrashed):
+        pool.result(pool._submit(os._exit, 1))  # pylint: disable=protected-access
+    assert pool.render(TIMESTAMPS, CLOSE, 'hour').startswith(b'\x89PNG')
+    stats = pool.stats()
+    assert stats['restarts'] == 1 and stats['failed'] == 1
@@ -0,0 +1,88 @@
+"""
+Tests for the pre-warming scheduler.
+
+A fake warm function records its calls; times are passed explicitly, so no test waits
+for a real candle boundary.
+"""
+import threading
+
+from api.prewarm import Prewarmer
+
+HOUR = 3600
+NOW = 1698278400 + 5
+
+
+def target(crypto, time):
+    """
+    Returns a target as the gateway builds it for the bot's reports.
+    """
+    return (crypto, time, 'USD', 10)
+
+
+def recording_warm(calls, fail=()):
+    """
+    Returns a warm function that records (crypto, time) and fails for `fail` targets.
+    """
+    lock = threading.Lock()
+
+    def warm(crypto, time, currency, limit):
+        assert (currency, limit) == ('USD', 10)
+        with lock:
+            calls.append((crypto, time))
+        if (crypto, time) in fail:
+            raise RuntimeError("upstream error")
+    return warm
+
+
+def test_targets_are_warmed_once_per_bucket():
+    """
+    Each target is warmed once per bucket; an hour boundary re-warms only hourly targets.
+    """
+    calls = []
+    pairs = [(crypto, time) for crypto in ('BTC', 'ETH') for time in ('hour', 'day')]
+    prewarmer = Prewarmer([target(*pair) for pair in pairs], recording_warm(calls),
+                          concurrency=2)
+
+    assert prewarmer.run_once(now=NOW) == 4
+    assert prewarmer.run_once(now=NOW + 60) == 0
+    assert sorted(calls) == sorted(pairs)
+
+    calls.clear()
+    assert prewarmer.run_once(now=NOW + HOUR) == 2
+    assert sorted(calls) == [('BTC', 'hour'), ('ETH', 'hour')]
+
+
+def test_failures_are_retried_and_observed():
+    """
+    A failed target stays due, and user requests count as ahead only once it is warm.
+    Requests for another currency or limit are not counted.
+    """
+    calls = []
+    prewarmer = Prewarmer([target('BTC', 'hour'), target('TON', 'hour')],
+                          recording_warm(calls, fail={('TON', 'hour')}))
+    prewarmer.run_once(now=NOW)
+    prewarmer.observe(target('BTC', 'hour'), now=NOW + 10)
+    prewarmer.observe(target('TON', 'hour'), now=NOW + 10)
+    prewarmer.observe(target('DOGE', 'hour'), now=NOW + 10)
+    prewarmer.observe(('BTC', 'hour', 'EUR', 10), now=NOW + 10)
+    prewarmer.observe(('BTC', 'hour', 'USD', 500), now=NOW + 10)
+    prewarmer.observe(target('BTC', 'hour'), now=NOW + HOUR)
+
+    calls.clear()
+    prewarmer.run_once(now=NOW + 20)
+    assert calls == [('TON', 'hour')]
+
+    stats = prewarmer.stats()
+    assert stats['warmed'] == 1 and stats['failures'] == 2
+    assert stats['ahead'] == 1 and stats['behind'] == 2
+    assert stats['ahead_rate'] == 0.333
+
+
+def test_delay_waits_for_next_boundary_with_jitter():
+    """
+    The scheduler sleeps until the next boundary of any target plus at most the jitter.
+    """
+    prewarmer = Prewarmer([target('BTC', 'hour'), target('BTC', 'day')], recording_warm([]),
+                          jitter=2)
+    delay = prewarmer._delay(now=NOW)  # pylint: disable=protected-access
+    assert HOUR - 5 <= delay <= HOUR - 5 + 2
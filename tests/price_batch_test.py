@@ -0,0 +1,119 @@
+"""
+Tests for the batching of latest price requests.
+
+This module checks that concurrent single-price requests are merged into one
+`pricemulti` call, that the multi-symbol route fills the per-pair cache entries and
+that errors of a batch reach every caller, and that a full batch does not shorten
+the window of the next one.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from api import data_service
+from utils.batcher import Batcher
+from utils.cache import TTLCache
+
+PRICES = {"BTC": {"USD": 34000.5}, "ETH": {"USD": 1800.2}, "TON": {"USD": 2.1}}
+
+
+def fake_pricemulti(calls):
+    """
+    Returns a fake `make_request` that answers `pricemulti` and records its params.
+    """
+    def make_request(endpoint, params):
+        assert endpoint == 'pricemulti'
+        calls.append(params)
+        return {
+            crypto: {c: PRICES[crypto][c] for c in params['tsyms'].split(',')}
+            for crypto in params['fsyms'].split(',') if crypto in PRICES
+        }
+    return make_request
+
+
+@pytest.fixture(name='calls')
+def fake_upstream(monkeypatch):
+    """
+    Replaces the upstream API, the cache and the batcher of the data service.
+    """
+    calls = []
+    monkeypatch.setattr(data_service, 'make_request', fake_pricemulti(calls))
+    monkeypatch.setattr(data_service, 'cache', TTLCache(maxsize=64, ttl=60))
+    monkeypatch.setattr(data_service, 'batcher', Batcher(data_service.fetch_prices, 0.05))
+    return calls
+
+
+def test_concurrent_latest_requests_share_one_call(calls):
+    """
+    Single-price requests within one window are fetched with one upstream call.
+    """
+    client = data_service.app.test_client()
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        responses = list(pool.map(
+            lambda crypto: client.get(f"/latest/{crypto}/USD"),
+            ['BTC', 'ETH', 'TON', 'BTC', 'ETH', 'TON']))
+
+    assert [response.status_code for response in responses] == [200] * 6
+    assert responses[0].get_json() == {"BTC": "34000.5 USD"}
+    assert calls == [{'fsyms': 'BTC,ETH,TON', 'tsyms': 'USD', 'api_key': data_service.api_key}]
+    assert data_service.batcher.stats()['batches'] == 1
+    assert data_service.batcher.stats()['keys'] == 3
+
+
+def test_multi_symbol_route_fills_the_cache(calls):
+    """
+    /latest?fsyms= fetches all symbols at once and later single requests are cached.
+    """
+    client = data_service.app.test_client()
+    response = client.get("/latest?fsyms=BTC,ETH,XXX&tsyms=USD")
+    assert response.status_code == 200
+    assert response.get_json() == {"BTC": {"USD": 34000.5}, "ETH": {"USD": 1800.2}}
+
+    assert client.get("/latest/ETH/USD").get_json() == {"ETH": "1800.2 USD"}
+    assert len(calls) == 1
+    assert client.get("/latest").status_code == 400
+    assert client.get("/latest?fsyms=XXX").status_code == 500
+
+
+def test_batch_errors_reach_every_caller():
+    """
+    An exception of the batched call is raised in every waiting caller.
+    """
+    def fail(keys):
+        raise RuntimeError(f"upstream down for {len(keys)} keys")
+
+    batcher = Batcher(fail, window=0.05)
+    errors = []
+
+    def get(key):
+        try:
+            batcher.get(key)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=get, args=(key,)) for key in 'abc']
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert errors == ["upstream down for 3 keys"] * 3
+    assert batcher.stats()['batches'] == 1
+
+
+def test_full_batch_keeps_next_window():
+    """
+    A batch sent early because it is full does not leave a timer that sends the next
+    batch before its own window has passed.
+    """
+    batches = []
+    batcher = Batcher(lambda keys: batches.append(keys) or {}, window=0.5, max_batch=2)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        list(pool.map(batcher.get, ['BTC', 'ETH']))
+    assert batches == [['BTC', 'ETH']]
+
+    # TON waits until 0.8 s; the first batch's window would have ended at 0.5 s.
+    threading.Timer(0.3, batcher.get, ('TON',)).start()
+    threading.Event().wait(0.65)
+    batcher.get('DOGE')
+    assert batches == [['BTC', 'ETH'], ['TON', 'DOGE']]
@@ -0,0 +1,134 @@
+"""
+Tests for the streaming price feed.
+
+This module checks that one poll serves every subscriber, that only changed prices are
+pushed, that slow clients keep the newest updates and that the asynchronous gateway
+streams the prices as Server-Sent Events.
+"""
+import asyncio
+import json
+import queue
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from api.async_app import FEED, create_app
+from api.price_feed import PriceFeed, random_walk, put_latest
+
+
+def test_one_poll_serves_every_subscriber():
+    """
+    N subscribers cost one upstream call per poll, and unchanged prices are not pushed.
+    """
+    calls = []
+    prices = {"BTC": 34000.5, "ETH": 1800.2}
+
+    def fetch(symbols, currency):
+        calls.append((symbols, currency))
+        return {symbol: prices[symbol] for symbol in symbols}
+
+    feed = PriceFeed(fetch, ['BTC'], interval=5)
+    received = [[] for _ in range(10)]
+    for updates in received:
+        feed.subscribe(updates.append, ['BTC'])
+    eth = feed.subscribe(received[0].append, ['ETH'])
+
+    assert feed.poll_once(now=1000.0) == 2
+    assert calls == [(['BTC', 'ETH'], 'USD')]
+    assert all([u['price'] for u in updates if u['symbol'] == 'BTC'] == [34000.5]
+               for updates in received)
+
+    feed.unsubscribe(eth)
+    prices.update(BTC=34100.0, ETH=1810.0)
+    assert feed.poll_once(now=1005.0) == 1
+    assert feed.poll_once(now=1010.0) == 0
+    assert calls[1:] == [(['BTC'], 'USD')] * 2
+    assert [u['price'] for u in received[0]] == [34000.5, 1800.2, 34100.0]
+    assert feed.stats()['deliveries'] == 10 * 2 + 1
+
+    assert feed.price('BTC', now=1015.0) == 34100.0
+    assert feed.price('BTC', 'EUR', now=1015.0) is None
+    assert feed.price('BTC', now=1030.0) is None
+
+
+def test_extra_symbols_are_counted_and_capped():
+    """
+    Symbols beyond the configured ones are polled while a subscription needs them, and
+    malformed symbols or too many new ones are rejected.
+    """
+    feed = PriceFeed(random_walk({"BTC": 34000.0, "ETH": 1800.0, "TON": 2.0}), ['BTC'],
+                     max_extra=2)
+    first = feed.subscribe(lambda update: None, ['BTC', 'ETH'])
+    second = feed.subscribe(lambda update: None, ['ETH', 'TON'])
+    for symbols in (['DOGE'], ['bad symbol'], ['X' * 11]):
+        with pytest.raises(ValueError):
+            feed.subscribe(lambda update: None, symbols)
+    feed.poll_once()
+    assert feed.stats()['symbols'] == ['BTC', 'ETH', 'TON']
+
+    feed.unsubscribe(first)
+    assert feed.stats()['symbols'] == ['BTC', 'ETH', 'TON']
+    feed.unsubscribe(second)
+    assert feed.stats()['symbols'] == ['BTC']
+    assert feed.price('ETH') is None
+    feed.subscribe(lambda update: None, ['DOGE'])
+    assert feed.stats()['symbols'] == ['BTC', 'DOGE']
+
+
+def test_new_subscriber_gets_last_prices():
+    """
+    A subscriber immediately receives the last known prices of its symbols.
+    """
+    feed = PriceFeed(random_walk({"BTC": 34000.0}, seed=1), ['BTC', 'ETH'])
+    feed.poll_once()
+    received = []
+    feed.subscribe(received.append, ['ETH'])
+    assert [u['symbol'] for u in received] == ['ETH']
+    assert received[0]['price'] > 0
+
+
+def test_full_queue_keeps_newest_updates():
+    """
+    A slow client drops its oldest updates instead of blocking the poll thread.
+    """
+    updates = queue.Queue(maxsize=2)
+    for price in (1, 2, 3):
+        put_latest(updates, {"price": price})
+    assert [updates.get_nowait()["price"] for _ in range(2)] == [2, 3]
+
+
+def test_failed_poll_is_counted():
+    """
+    Upstream errors are counted and do not stop the feed.
+    """
+    def fetch(_symbols, _currency):
+        raise RuntimeError("upstream down")
+
+    feed = PriceFeed(fetch, ['BTC'])
+    assert feed.poll_once() == 0
+    assert feed.stats()['failures'] == 1
+
+
+@pytest.mark.asyncio
+async def test_async_gateway_streams_prices():
+    """
+    /stream sends the last prices, then every change; /latest is served from memory.
+    """
+    app = create_app(data_url='http://127.0.0.1:9')
+    app[FEED] = PriceFeed(random_walk({"BTC": 34000.0}, seed=1), ['BTC'])
+    app[FEED].poll_once()
+
+    async with TestClient(TestServer(app)) as client:
+        response = await client.get('/stream?fsyms=BTC')
+        assert response.headers['Content-Type'].startswith('text/event-stream')
+        first = await response.content.readuntil(b'\n\n')
+        await asyncio.get_running_loop().run_in_executor(None, app[FEED].poll_once)
+        second = await response.content.readuntil(b'\n\n')
+        response.close()
+
+        events = [json.loads(chunk.decode().split('data: ')[1]) for chunk in (first, second)]
+        assert [event['symbol'] for event in events] == ['BTC', 'BTC']
+        assert events[0]['price'] != events[1]['price']
+
+        latest = await (await client.get('/latest/BTC/USD')).json()
+        assert latest == {"BTC": f"{events[1]['price']} USD"}
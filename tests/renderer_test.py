@@ -0,0 +1,82 @@
+"""
+Tests for the thread-safe plot renderer.
+
+Renders from many threads must produce exactly the bytes of a serial render, which
+fails if threads share figure state. Multi-asset charts render all panels to one PNG.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from api.renderer import Chart, PlotRenderer, Series, check_chart
+
+PNG_MAGIC = b'\x89PNG\r\n\x1a\n'
+
+
+def series(size, shift):
+    """
+    Returns labels and close prices of a small synthetic series.
+    """
+    labels = [f"{h % 24:02d}:00" for h in range(size)]
+    close = [100 + shift + (i * 7 % 11) for i in range(size)]
+    return labels, close
+
+
+def test_render_returns_png_and_reuses_templates():
+    """
+    A render produces a PNG, and repeated renders reuse one template.
+    """
+    renderer = PlotRenderer(pool_size=2)
+    first = renderer.render(*series(30, 0), 'hour')
+    assert first.startswith(PNG_MAGIC)
+    renderer.render(*series(5, 50), 'hour')
+    assert renderer.render(*series(30, 0), 'hour') == first
+    assert renderer.stats() == {'hour': 1}
+
+
+def test_concurrent_renders_match_serial_renders():
+    """
+    Concurrent renders of different series equal their serial renders.
+    """
+    inputs = [series(10 + i, i * 10) for i in range(8)]
+    expected = [PlotRenderer().render(*args, 'hour') for args in inputs]
+
+    renderer = PlotRenderer(pool_size=4)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for _ in range(3):
+            actual = list(executor.map(lambda args: renderer.render(*args, 'hour'), inputs))
+            assert actual == expected
+    assert renderer.stats()['hour'] <= 4
+
+
+def chart_series(symbol, size, seed):
+    """
+    Returns a `Series` with hourly timestamps, a random walk and random volumes.
+    """
+    rng = np.random.default_rng(seed)
+    return Series(symbol, 1698278400 + np.arange(size) * 3600,
+                  100 * np.exp(np.cumsum(rng.normal(0, 0.01, size))), rng.uniform(1, 10, size))
+
+
+def test_chart_renders_assets_and_panels():
+    """
+    A chart of several assets with an overlay and both panels renders to one PNG, and
+    repeated charts of one layout reuse one template.
+    """
+    renderer = PlotRenderer(pool_size=2)
+    chart = Chart([chart_series('BTC', 2000, 1), chart_series('ETH', 1500, 2)], 'hour',
+                  overlay='sma', panels=('volatility', 'volume'), window=10)
+    first = renderer.render_chart(chart)
+    assert first.startswith(PNG_MAGIC)
+    assert renderer.render_chart(chart) == first
+    assert renderer.stats() == {'chart:hour:2:True:volume:volatility': 1}
+
+    single = renderer.render_chart(Chart([chart_series('BTC', 100, 1)], 'day'))
+    assert single.startswith(PNG_MAGIC)
+    with pytest.raises(ValueError):
+        renderer.render_chart(chart._replace(panels=('depth',)))
+    zero = chart_series('ETH', 100, 2)
+    with pytest.raises(ValueError, match="ETH"):
+        check_chart(chart._replace(series=[chart_series('BTC', 100, 1),
+                                           zero._replace(close=np.r_[0.0, zero.close[1:]])]))
@@ -0,0 +1,96 @@
+"""
+Tests for OHLCV resampling into coarser intervals.
+
+This module compares `resample` with Pandas, checks that the data service builds "4h"
+candles from stored hourly candles and "1d" candles from daily ones, fetching only the
+base interval upstream, and that limits beyond the upstream minute history are rejected.
+"""
+import numpy as np
+import pandas as pd
+
+from api import data_service
+from api.candle_store import CandleStore, to_array
+from api.downsample import resample
+from utils.time_formater import bucket_start
+from tests.candle_store_test import fake_upstream, HOUR, NOW
+
+
+def test_resample_matches_pandas():
+    """
+    Resampled candles equal a Pandas OHLCV resample, with weeks starting on Monday.
+    """
+    rng = np.random.default_rng(11)
+    close = 100 + np.cumsum(rng.normal(0, 1, 24 * 30))
+    times = 1698278400 + 5 * HOUR + HOUR * np.arange(len(close))
+    candles = to_array([
+        {"time": int(t), "open": c - 0.5, "high": c + 1.0, "low": c - 1.0, "close": c,
+         "volumefrom": rng.random(), "volumeto": rng.random()}
+        for t, c in zip(times, close)
+    ])
+    frame = pd.DataFrame(candles).set_index(pd.to_datetime(candles['time'], unit='s'))
+    aggregation = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last',
+                   'volumefrom': 'sum', 'volumeto': 'sum'}
+
+    for time, rule in (('4h', '4h'), ('1d', '1D'), ('1w', 'W-MON')):
+        expected = frame.resample(rule, label='left', closed='left').agg(aggregation)
+        result = resample(candles, time)
+        assert pd.to_datetime(result['time'], unit='s').tolist() == expected.index.tolist()
+        for field, values in expected.items():
+            assert np.allclose(result[field], values), (time, field)
+
+
+def test_history_resamples_stored_candles(tmp_path, monkeypatch):
+    """
+    "4h" histories are merged from hourly candles and "1d" histories from daily ones;
+    once the base candles are stored, only the open candle is fetched again.
+    """
+    calls = []
+    monkeypatch.setattr(data_service, 'store', CandleStore(str(tmp_path)))
+    monkeypatch.setattr(data_service, 'make_request', fake_upstream(calls))
+
+    history = data_service.load_history('BTC', 'USD', '4h', 12, now=NOW)
+    assert all(endpoint == 'v2/histohour' for endpoint, _, _ in calls)
+    assert len(history) == 13
+    assert history[-1]['time'] == bucket_start('4h', NOW)
+    assert np.all(np.diff([c['time'] for c in history]) == 4 * HOUR)
+    first = history[0]['time']
+    assert history[0]['high'] == first + 3 * HOUR + 2.0
+    assert history[0]['close'] == first + 3 * HOUR + 1.0
+    assert history[0]['volumeto'] == 8.0
+
+    calls.clear()
+    data_service.load_history('BTC', 'USD', '4h', 12, now=NOW)
+    assert calls == [('v2/histohour', bucket_start('hour', NOW), 1)]
+
+    calls.clear()
+    days = data_service.load_history('BTC', 'USD', '1d', 1, now=NOW)
+    assert [endpoint for endpoint, _, _ in calls] == ['v2/histoday']
+    assert [c['time'] for c in days] == [bucket_start('1d', NOW) - 86400, bucket_start('1d', NOW)]
+
+
+def test_limit_beyond_minute_history_is_rejected(tmp_path, monkeypatch):
+    """
+    "15m" candles are built from about seven days of minutes, so at most 672 of them.
+    """
+    monkeypatch.setattr(data_service, 'store', CandleStore(str(tmp_path)))
+    monkeypatch.setattr(data_service, 'make_request', fake_upstream([]))
+    client = data_service.app.test_client()
+
+    assert client.get('/history/BTC/15m/USD/673').status_code == 400
+    assert client.get('/history_ref/BTC/minute/USD/20000').status_code == 400
+    assert client.get('/history/BTC/1d/USD/2000').status_code == 200
+
+
+def test_history_ref_resolves_resampled(tmp_path, monkeypatch):
+    """
+    A reference to a resampled interval points at the base series and resolves to the
+    same candles as the history.
+    """
+    store = CandleStore(str(tmp_path))
+    monkeypatch.setattr(data_service, 'store', store)
+    monkeypatch.setattr(data_service, 'make_request', fake_upstream([]))
+
+    records = data_service.load_history('BTC', 'USD', '4h', 6, now=NOW)
+    ref = data_service.history_ref('BTC', 'USD', '4h', 6, now=NOW)
+    assert ref['series']['time'] == 'hour' and ref['resample'] == '4h'
+    assert np.array_equal(store.resolve(ref), to_array(records))
@@ -0,0 +1,44 @@
+"""
+Tests for the shared S3 client.
+
+No request is sent: only client construction and configuration are checked.
+
+Functions being tested:
+- S3Client.shared: Returns one instance per credentials, safe to use from threads.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.s3_client import S3Client
+from api.config import S3_POOL_CONNECTIONS
+
+
+def test_shared_client_is_built_once():
+    """
+    Concurrent callers get the same instance and the same boto3 client.
+    """
+    def client(_):
+        s3_client = S3Client.shared(aws_access_key_id='id', aws_secret_access_key='secret')
+        s3_client._ensure_session()  # pylint: disable=protected-access
+        return s3_client
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        clients = list(executor.map(client, range(32)))
+    assert all(c is clients[0] for c in clients)
+    assert len({id(c.s3) for c in clients}) == 1
+
+    config = clients[0].s3.meta.config
+    assert config.max_pool_connections == S3_POOL_CONNECTIONS
+    assert config.tcp_keepalive is True
+    assert config.retries['mode'] == 'adaptive'
+    assert S3Client.shared(aws_access_key_id='other', aws_secret_access_key='x') is not clients[0]
+
+
+def test_presigned_url_is_signed_offline():
+    """
+    A presigned GET URL names the object and carries its expiry and signature.
+    """
+    s3_client = S3Client.shared(aws_access_key_id='id', aws_secret_access_key='secret')
+    url = s3_client.presigned_url('plots', 'BTC/hour/2023-10-26/07/plot.png', expires_in=600)
+    assert '/plots/BTC/hour/2023-10-26/07/plot.png?' in url
+    assert 'X-Amz-Expires=600' in url
+    assert 'X-Amz-Signature=' in url
@@ -0,0 +1,51 @@
+"""
+Tests for the single-flight deduplication of upstream calls.
+
+This module checks that concurrent callers for the same key share one call and its
+result or error, and that different keys do not block each other.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+from utils.single_flight import SingleFlight
+
+
+def test_concurrent_calls_are_shared():
+    """
+    N concurrent callers for one key trigger exactly one call.
+    """
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(timeout=5)
+        return {"Data": [1, 2, 3]}
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(flight.do, 'histohour', fetch) for _ in range(8)]
+        while flight.stats()['shared'] < 7:
+            threading.Event().wait(0.01)
+        release.set()
+        results = [future.result(timeout=5) for future in futures]
+
+    assert len(calls) == 1
+    assert all(result == {"Data": [1, 2, 3]} for result in results)
+    assert flight.stats() == {"calls": 1, "shared": 7, "in_flight": 0}
+
+
+def test_errors_are_shared_and_key_is_released():
+    """
+    An error is re-raised for the caller and the next call runs again.
+    """
+    flight = SingleFlight()
+
+    def fail():
+        raise ConnectionError("upstream down")
+
+    with pytest.raises(ConnectionError):
+        flight.do('price', fail)
+    assert flight.do('price', lambda: 42) == 42
+    assert flight.stats()['calls'] == 2
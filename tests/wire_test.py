@@ -0,0 +1,116 @@
+"""
+Tests for the binary candle transport.
+
+This module checks that `.npy` payloads decode without copying and reject malformed
+bytes, that the data service negotiates the format while JSON stays the default, and
+that a /compare request through the asynchronous gateway reaches the analytics service
+as a binary bundle with the same result as JSON.
+"""
+import numpy as np
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from api import analytics, async_app, data_service
+from api.async_app import create_app
+from api.candle_store import CandleStore, to_array
+from api.wire import NPY_TYPE, bundle, decode, encode, unbundle
+from benchmarks.validate_data_bench import make_payload
+from tests.candle_store_test import fake_upstream
+
+
+def test_decode_wraps_buffer():
+    """
+    Decoded candles equal the encoded ones and are a read-only view of the bytes.
+    """
+    candles = to_array(make_payload(50))
+    body = encode(candles)
+    decoded = decode(body)
+
+    assert np.array_equal(decoded, candles)
+    assert not decoded.flags.owndata and not decoded.flags.writeable
+    assert len(body) < len(str(make_payload(50))) / 2
+    for malformed in (body[:-8], body + b'\0', b'[{"time": 1}]', body[:9]):
+        with pytest.raises(ValueError):
+            decode(malformed)
+
+
+def test_bundle_round_trip():
+    """
+    A bundle keeps the symbols in order and every window intact.
+    """
+    windows = {'BTC': to_array(make_payload(5)), 'ETH': to_array(make_payload(3))}
+    payloads = unbundle(bundle({symbol: encode(w) for symbol, w in windows.items()}))
+
+    assert list(payloads) == ['BTC', 'ETH']
+    assert all(np.array_equal(payloads[s], window) for s, window in windows.items())
+    with pytest.raises(ValueError):
+        unbundle(bundle({'BTC': encode(windows['BTC'])})[:-1])
+
+
+def test_history_negotiates_binary(tmp_path, monkeypatch):
+    """
+    /history answers `.npy` only when asked for it; both carry the same candles.
+    """
+    monkeypatch.setattr(data_service, 'store', CandleStore(str(tmp_path)))
+    monkeypatch.setattr(data_service, 'make_request', fake_upstream([]))
+    client = data_service.app.test_client()
+
+    default = client.get('/history/WIRE/hour/USD/20', headers={'Accept': '*/*'})
+    binary = client.get('/history/WIRE/hour/USD/20', headers={'Accept': NPY_TYPE})
+
+    assert default.mimetype == 'application/json'
+    assert binary.mimetype == NPY_TYPE
+    assert np.array_equal(decode(binary.data), to_array(default.get_json()))
+
+
+def services_app(seen):
+    """
+    Serves the real data service and analytics service behind one aiohttp server and
+    records the Content-Type of every payload the analytics service receives.
+    """
+    data_client = data_service.app.test_client()
+    analytics_client = analytics.app.test_client()
+
+    async def history(request):
+        response = data_client.get(request.path_qs,
+                                   headers={'Accept': request.headers.get('Accept', '*/*')})
+        return web.Response(body=response.data, status=response.status_code,
+                            content_type=response.mimetype)
+
+    async def compare(request):
+        seen.append(request.content_type)
+        response = analytics_client.post(request.path_qs, data=await request.read(),
+                                         content_type=request.content_type)
+        return web.Response(body=response.data, status=response.status_code,
+                            content_type=response.mimetype)
+
+    app = web.Application()
+    app.router.add_get('/history/{crypto}/{time}/{currency}/{limit}', history)
+    app.router.add_post('/compare', compare)
+    return app
+
+
+@pytest.mark.asyncio
+async def test_gateway_passes_binary_payloads(tmp_path, monkeypatch):
+    """
+    With the binary transport, /compare sends one bundle to the analytics service and
+    returns the same comparison as with JSON.
+    """
+    monkeypatch.setattr(data_service, 'store', CandleStore(str(tmp_path)))
+    monkeypatch.setattr(data_service, 'make_request', fake_upstream([]))
+    monkeypatch.setattr(async_app, 'SHARED_CANDLE_STORE', False)
+    seen, results = [], []
+    async with TestServer(services_app(seen)) as services:
+        base = str(services.make_url('')).rstrip('/')
+        for accept in (NPY_TYPE, None):
+            monkeypatch.setattr(async_app, 'PAYLOAD_ACCEPT', accept)
+            gateway = create_app(data_url=base, analytics_url=base, plot_url=base)
+            async with TestClient(TestServer(gateway)) as client:
+                response = await client.get('/compare/hour/USD/30?fsyms=BTC,ETH&window=5')
+                assert response.status == 200
+                results.append(await response.json())
+
+    assert seen == [NPY_TYPE, 'application/json']
+    assert results[0] == results[1]
+    assert results[0]['symbols'] == ['BTC', 'ETH']
@@ -0,0 +1,103 @@
+"""
+Module for merging concurrent single-key lookups into batched calls.
+
+Requests that arrive within a short window are collected, and one call fetches all of
+their keys. Every caller then receives the result for its own key. Identical keys in one
+window share a single slot. A batch that fills up is sent at once and its timer is
+cancelled; a timer only ever sends the batch it was started for.
+
+Dependencies:
+- threading: Used to collect keys from concurrent Flask worker threads.
+- concurrent.futures: A `Future` hands each caller its result.
+
+Class:
+- Batcher: Collects keys for a short window and fetches them with one call.
+"""
+import threading
+from concurrent.futures import Future
+
+
+class Batcher:
+    """
+    Merges lookups that arrive within `window` seconds into one batched call.
+
+    Attributes:
+        window (float): How long the first key of a batch waits for more keys.
+        max_batch (int): A batch is sent at once when it holds this many keys.
+        counters (dict): The number of `requests`, `batches` and `keys` fetched.
+
+    Methods:
+        get: Returns the result for one key, fetched together with concurrent keys.
+        stats: Returns the counters and the average batch size.
+    """
+    def __init__(self, fetch_many, window=0.02, max_batch=50):
+        """
+        Batcher initialization.
+        :param fetch_many: Function taking a list of keys and returning a dict of results.
+        :param window: Collection window in seconds.
+        :param max_batch: Maximum number of distinct keys per batch.
+        """
+        self.window = window
+        self.max_batch = max_batch
+        self._fetch_many = fetch_many
+        self._pending = {}
+        self._timer = None
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "batches": 0, "keys": 0}
+
+    def get(self, key):
+        """
+        Returns the result for `key`.
+
+        Args:
+            key: A hashable key understood by `fetch_many`.
+
+        Returns:
+            The value `fetch_many` returned for `key`, or None if it returned none.
+
+        Raises:
+            Exception: Whatever `fetch_many` raised for the batch.
+        """
+        full = None
+        with self._lock:
+            self.counters["requests"] += 1
+            future = self._pending.get(key)
+            if future is None:
+                if not self._pending:
+                    # The batch dict itself tags the timer, see `_flush`.
+                    self._timer = threading.Timer(self.window, self._flush, (self._pending,))
+                    self._timer.start()
+                future = self._pending[key] = Future()
+                if len(self._pending) >= self.max_batch:
+                    self._timer.cancel()
+                    full = self._pending
+        if full is not None:
+            self._flush(full)
+        return future.result()
+
+    def _flush(self, batch):
+        with self._lock:
+            if self._pending is not batch:
+                return  # already sent because it reached `max_batch`
+            self._pending = {}
+            self.counters["batches"] += 1
+            self.counters["keys"] += len(batch)
+        try:
+            results = self._fetch_many(list(batch))
+        except Exception as e:  # pylint: disable=broad-except
+            for future in batch.values():
+                future.set_exception(e)
+            return
+        for key, future in batch.items():
+            future.set_result(results.get(key))
+
+    def stats(self):
+        """
+        Returns the counters and the average number of keys per batch.
+        """
+        with self._lock:
+            batches = self.counters["batches"]
+            return {
+                **self.counters,
+                "avg_batch": round(self.counters["keys"] / batches, 2) if batches else 0.0,
+            }
@@ -0,0 +1,123 @@
+"""
+Module with an in-process cache for upstream responses.
+
+This module provides a thread-safe cache with per-entry expiry and LRU eviction.
+It is used to avoid repeating identical requests to the CryptoCompare API while
+the underlying data has not changed.
+
+Dependencies:
+- threading: Used to guard the cache from concurrent Flask worker threads.
+
+Class:
+- TTLCache: A bounded LRU cache whose entries expire after a TTL or at a fixed time.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    A bounded LRU cache with per-entry expiry.
+
+    Entries are stored together with the Unix time at which they expire. Reading an
+    expired entry removes it and counts as a miss. When the cache is full, the least
+    recently used entry is evicted.
+
+    Attributes:
+        maxsize (int): The maximum number of entries kept in the cache.
+        ttl (float): The default entry lifetime in seconds.
+        counters (dict): The number of `hits`, `misses` and `evictions`, where an
+            eviction is an entry dropped because the cache was full.
+
+    Methods:
+        get: Returns a cached value or a default.
+        set: Stores a value with a TTL or an absolute expiry time.
+        stats: Returns the cache counters.
+        clear: Drops all entries.
+    """
+    def __init__(self, maxsize=256, ttl=60, clock=time.time):
+        """
+        Cache initialization.
+        :param maxsize: Maximum number of entries.
+        :param ttl: Default entry lifetime in seconds.
+        :param clock: Function returning the current Unix time.
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive.")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value for `key`.
+
+        Args:
+            key: A hashable cache key.
+            default: The value returned when there is no valid entry.
+
+        Returns:
+            The cached value, or `default` if the entry is missing or expired.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > self._clock():
+                    self._data.move_to_end(key)
+                    self.counters["hits"] += 1
+                    return value
+                del self._data[key]
+            self.counters["misses"] += 1
+            return default
+
+    def set(self, key, value, ttl=None, expires_at=None):
+        """
+        Stores `value` under `key`.
+
+        Args:
+            key: A hashable cache key.
+            value: The value to store.
+            ttl (float, optional): Entry lifetime in seconds. Defaults to the cache TTL.
+            expires_at (float, optional): Absolute Unix time at which the entry expires.
+                Takes precedence over `ttl`.
+        """
+        if expires_at is None:
+            expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def stats(self):
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: The current size, capacity, hits, misses, evictions and hit rate.
+        """
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                **self.counters,
+                "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else 0.0,
+            }
+
+    def clear(self):
+        """
+        Drops all entries. Counters are kept.
+        """
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,173 @@
+"""
+Module with a shared, pooled HTTP session for inter-service calls.
+
+This module keeps one `requests.Session` per process with keep-alive connection pools,
+retries with exponential backoff and separate connect/read timeouts. Every call made
+through it is timed, so latency can be reported as p50/p99 per hop.
+
+Server errors are retried at one layer only. Calls to upstream APIs retry 500 responses,
+but calls between internal services (`internal=True`) do not: the data service answers
+500 only after its own upstream retries, so retrying it again would multiply the
+upstream calls.
+
+Dependencies:
+- requests: Used for making HTTP requests.
+- urllib3: `Retry` is used to retry failed connections and 429/5xx responses.
+
+Functions:
+- create_session: Builds a session with pooled adapters and retries.
+- get_session: Returns the process-wide shared session.
+- request: Sends a request through the shared session and records its latency.
+- record_latency: Records the latency of a call made by another client.
+- latency_stats: Returns p50/p99 latency per hop.
+"""
+import threading
+import time
+from collections import defaultdict, deque
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from api.config import (
+    TIMEOUT,
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_POOL_BLOCK,
+    HTTP_RETRIES,
+    HTTP_BACKOFF
+)
+
+LATENCY_SAMPLES = 1000
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+INTERNAL_RETRY_STATUSES = (429, 502, 503, 504)
+
+_shared = {}
+_session_lock = threading.Lock()
+_latency = defaultdict(lambda: deque(maxlen=LATENCY_SAMPLES))
+_latency_lock = threading.Lock()
+
+
+def create_session(pool_connections=HTTP_POOL_CONNECTIONS,
+                   pool_maxsize=HTTP_POOL_MAXSIZE,
+                   pool_block=HTTP_POOL_BLOCK,
+                   retries=HTTP_RETRIES,
+                   backoff_factor=HTTP_BACKOFF):
+    """
+    Builds a session with keep-alive connection pools and retries.
+
+    Args:
+        pool_connections (int): Number of per-host connection pools to keep.
+        pool_maxsize (int): Maximum number of connections kept per host.
+        pool_block (bool): Whether to wait for a free connection when a host pool is full.
+        retries (int): Number of retries for connection errors and 429/5xx responses.
+        backoff_factor (float): Backoff factor between retries in seconds.
+
+    Returns:
+        requests.Session: A session with the pooled adapter mounted for http and https.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=pool_block,
+        max_retries=retry
+    )
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session(internal=False):
+    """
+    Returns the process-wide shared session, creating it on first use.
+
+    Args:
+        internal (bool): Return the session for calls between internal services, which
+            does not retry 500 responses.
+
+    Returns:
+        requests.Session: The shared pooled session.
+    """
+    name = 'internal' if internal else 'upstream'
+    with _session_lock:
+        if name not in _shared:
+            session = create_session()
+            if internal:
+                for adapter in session.adapters.values():
+                    adapter.max_retries = adapter.max_retries.new(
+                        status_forcelist=INTERNAL_RETRY_STATUSES)
+            _shared[name] = session
+        return _shared[name]
+
+
+def request(method, url, hop=None, timeout=TIMEOUT, internal=False, **kwargs):
+    """
+    Sends a request through the shared session and records its latency.
+
+    Args:
+        method (str): The HTTP method (e.g., "GET", "POST").
+        url (str): The request URL.
+        hop (str, optional): The name the latency is recorded under.
+            Defaults to the host and port of `url`.
+        timeout (float or tuple): Timeout in seconds, or a (connect, read) tuple.
+        internal (bool): Whether `url` is an internal service, whose 500 responses
+            are not retried.
+        **kwargs: Extra arguments passed to `requests.Session.request`.
+
+    Returns:
+        requests.Response: The response.
+
+    Raises:
+        requests.RequestException: If the request fails after all retries.
+    """
+    start = time.perf_counter()
+    try:
+        return get_session(internal).request(method, url, timeout=timeout, **kwargs)
+    finally:
+        record_latency(hop or urlsplit(url).netloc, time.perf_counter() - start)
+
+
+def record_latency(hop, elapsed):
+    """
+    Records the latency of one call.
+
+    Args:
+        hop (str): The name the latency is recorded under.
+        elapsed (float): The call duration in seconds.
+    """
+    with _latency_lock:
+        _latency[hop].append(elapsed)
+
+
+def _percentile(samples, q):
+    index = min(len(samples) - 1, max(0, round(q * (len(samples) - 1))))
+    return samples[index]
+
+
+def latency_stats():
+    """
+    Returns latency percentiles for every hop seen by this process.
+
+    Returns:
+        dict: A mapping of hop name to the number of recent samples and
+        their p50/p99 latency in milliseconds.
+    """
+    with _latency_lock:
+        snapshot = {hop: sorted(samples) for hop, samples in _latency.items()}
+    return {
+        hop: {
+            "count": len(samples),
+            "p50_ms": round(_percentile(samples, 0.50) * 1000, 2),
+            "p99_ms": round(_percentile(samples, 0.99) * 1000, 2),
+        }
+        for hop, samples in snapshot.items() if samples
+    }
@@ -6,18 +6,42 @@ specifically to the CryptoCompare API, to retrieve cryptocurrency data.
 
 Dependencies:
 - requests: Used for making HTTP requests to the API.
+- http_session: The shared pooled session the requests are sent through.
+- httpx: The async HTTP client used by `async_make_request`.
 - logging: Used for logging errors and important events.
 
 Functions:
 - make_request: Sends a GET request to the specified 
             endpoint and returns the response data in JSON format.
+- async_make_request: The same for asyncio code, through a pooled `httpx.AsyncClient`
+            shared by all requests on an event loop.
+- close_async_client: Closes the shared async client of the running event loop.
 """
+import asyncio
 import logging
+import time
+import weakref
+from urllib.parse import urlsplit
+
+import httpx
 import requests
 
+from utils.http_session import request, record_latency
+from api.config import (
+    TIMEOUT,
+    CONNECT_TIMEOUT,
+    READ_TIMEOUT,
+    HTTP_POOL_MAXSIZE,
+    HTTP_RETRIES
+)
+
 logger = logging.getLogger('api')
 
-def make_request(endpoint='', params=None, url='https://min-api.cryptocompare.com/data/'):
+# One async client per event loop: an httpx.AsyncClient must not be shared across loops.
+_async_clients = weakref.WeakKeyDictionary()
+
+def make_request(endpoint='', params=None, url='https://min-api.cryptocompare.com/data/',
+                 timeout=TIMEOUT):
     """
     Sends a GET request to the specified API endpoint and returns the JSON response.
 
@@ -32,6 +56,7 @@ def make_request(endpoint='', params=None, url='https://min-api.cryptocompare.co
         params (dict, optional): A dictionary of query parameters 
             to include in the request.
         url (str): The base URL of the API.
+        timeout (float or tuple): Timeout in seconds, or a (connect, read) tuple.
 
     Returns:
         dict: A dictionary containing the response data in JSON format 
@@ -41,9 +66,68 @@ def make_request(endpoint='', params=None, url='https://min-api.cryptocompare.co
             key containing the error message.
     """
     try:
-        response = requests.get(url + endpoint, params=params, timeout=100)
+        response = request('GET', url + endpoint, params=params, timeout=timeout)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
         logger.error("Request error: %s", e)
         return {"error": str(e)}
+
+
+def get_async_client():
+    """
+    Returns the shared `httpx.AsyncClient` of the running event loop.
+
+    The client keeps up to `HTTP_POOL_MAXSIZE` keep-alive connections and retries
+    failed connections `HTTP_RETRIES` times.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=HTTP_POOL_MAXSIZE,
+                                max_keepalive_connections=HTTP_POOL_MAXSIZE),
+            transport=httpx.AsyncHTTPTransport(retries=HTTP_RETRIES)
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def async_make_request(endpoint='', params=None,
+                             url='https://min-api.cryptocompare.com/data/', hop=None):
+    """
+    Sends a GET request without blocking the event loop and returns the JSON response.
+
+    Args:
+        endpoint (str): The API endpoint to send the request to.
+        params (dict, optional): A dictionary of query parameters
+            to include in the request.
+        url (str): The base URL of the API.
+        hop (str, optional): The name the latency is recorded under, as for
+            `http_session.request`. Defaults to the host and port of the URL.
+
+    Returns:
+        dict: The JSON data from the response, or a dictionary with an 'error'
+            key containing the error message.
+    """
+    target = url + endpoint
+    start = time.perf_counter()
+    try:
+        response = await get_async_client().get(target, params=params)
+        response.raise_for_status()
+        return response.json()
+    except (httpx.HTTPError, ValueError) as e:
+        logger.error("Request error: %s", e)
+        return {"error": str(e)}
+    finally:
+        record_latency(hop or urlsplit(target).netloc, time.perf_counter() - start)
+
+
+async def close_async_client():
+    """
+    Closes the shared async client of the running event loop.
+    """
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
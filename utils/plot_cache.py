@@ -0,0 +1,305 @@
+"""
+Module with a tiered local cache for plot images.
+
+This module keeps rendered plot PNGs close to the services that serve them, so S3 is
+only touched on a miss. Plots are looked up by their S3 key, e.g.
+`BTC/hour/2023-10-26/00/plot.png`, first in an in-memory LRU bounded by a byte budget
+and then in an on-disk cache under the same relative path, bounded by a second budget.
+
+Plot keys are immutable: a key names one candle bucket and its plot is never rewritten,
+so cached entries never need to be invalidated, only evicted.
+
+Processes on one host may share the disk directory. A file written by another process
+is found by its path and then counted against the budget of the reading process.
+
+Services that only hand out presigned URLs need to know that a plot is in S3, not its
+bytes. `exists` answers from both tiers and from a bounded set of keys known to be in
+S3, and otherwise asks S3 once with a HEAD request.
+
+Dependencies:
+- threading: Used to guard both tiers from concurrent threads.
+
+Functions:
+- plot_key: Returns the S3 key of a plot.
+- chart_key: Returns the S3 key of a multi-asset chart.
+
+Class:
+- PlotCache: A memory and disk cache for plot images with hit-rate counters.
+"""
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Keys known to be stored in S3; a key costs about 100 bytes.
+MAX_STORED_KEYS = 100_000
+
+
+def plot_key(crypto, time, time_resp, variant=None):
+    """
+    Returns the S3 key a plot is stored under.
+
+    Args:
+        crypto (str): The cryptocurrency symbol (e.g., "BTC").
+        time (str): The time interval of the plot (e.g., "hour", "day").
+        time_resp (datetime): The request time; hourly plots are stored per hour,
+            other plots per day.
+        variant (str, optional): Distinguishes plots of the same bucket rendered with
+            other options, e.g. "points100".
+
+    Returns:
+        str: The key, e.g. "BTC/hour/2023-10-26/00/plot.png" or ".../plot-points100.png".
+    """
+    date_part = time_resp.strftime('%Y-%m-%d')
+    name = f"plot-{variant}.png" if variant else "plot.png"
+    if time == 'hour':
+        return f"{crypto}/{time}/{date_part}/{time_resp.strftime('%H')}/{name}"
+    return f"{crypto}/{time}/{date_part}/{name}"
+
+
+def chart_key(symbols, time, currency, time_resp, variant):
+    """
+    Returns the S3 key a multi-asset chart is stored under.
+
+    Args:
+        symbols (list[str]): The cryptocurrency symbols of the chart.
+        time (str): The time interval of the chart.
+        currency (str): The currency of the prices (e.g., "USD").
+        time_resp (datetime): The request time, bucketed like `plot_key`.
+        variant (str): The chart options, e.g. "100-sma-volume-5".
+
+    Returns:
+        str: The key, e.g. "BTC-ETH/hour/2023-10-26/00/chart-USD-100-sma-volume-5.png".
+    """
+    folder = plot_key('-'.join(symbols), time, time_resp).rsplit('/', 1)[0]
+    return f"{folder}/chart-{currency}-{variant}.png"
+
+
+class PlotCache:
+    """
+    A two-tier LRU cache of plot images keyed by S3 key.
+
+    Attributes:
+        memory_bytes (int): The byte budget of the in-memory tier.
+        disk_dir (str): The directory of the on-disk tier, or None to disable it.
+        disk_bytes (int): The byte budget of the on-disk tier.
+        counters (dict): The number of `memory_hits`, `disk_hits`, `stored_hits`,
+            `misses`, `memory_evictions` and `disk_evictions`.
+
+    Methods:
+        get: Returns cached image bytes or None.
+        put: Stores image bytes in both tiers.
+        get_or_load: Returns cached bytes or loads, stores and returns them.
+        exists: Returns True if a plot is cached or stored in S3, without its bytes.
+        stats: Returns sizes, counters and the hit rate.
+    """
+    def __init__(self, memory_bytes=64 * 2**20, disk_dir=None, disk_bytes=512 * 2**20):
+        """
+        Cache initialization.
+        :param memory_bytes: Byte budget of the in-memory tier.
+        :param disk_dir: Directory of the on-disk tier; None disables it.
+        :param disk_bytes: Byte budget of the on-disk tier.
+        """
+        self.memory_bytes = memory_bytes
+        self.disk_dir = disk_dir
+        self.disk_bytes = disk_bytes
+        self._tiers = {"memory": OrderedDict(), "disk": OrderedDict(), "stored": OrderedDict()}
+        self._used = {"memory": 0, "disk": 0}
+        self._lock = threading.Lock()
+        self.counters = {
+            "memory_hits": 0, "disk_hits": 0, "stored_hits": 0, "misses": 0,
+            "memory_evictions": 0, "disk_evictions": 0
+        }
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._scan_disk()
+
+    def _scan_disk(self):
+        # Index the files left by earlier runs, oldest first.
+        files = []
+        for root, _, names in os.walk(self.disk_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                if name.endswith('.tmp'):
+                    continue
+                stat = os.stat(path)
+                key = os.path.relpath(path, self.disk_dir).replace(os.sep, '/')
+                files.append((stat.st_mtime, key, stat.st_size))
+        for _, key, size in sorted(files):
+            self._tiers["disk"][key] = size
+            self._used["disk"] += size
+        self._evict_disk()
+
+    def _path(self, key):
+        parts = key.split('/')
+        if not all(parts) or any(part in ('.', '..') for part in parts):
+            raise ValueError(f"Invalid plot key: {key!r}")
+        return os.path.join(self.disk_dir, *parts)
+
+    def get(self, key):
+        """
+        Returns the image bytes cached under `key`.
+
+        A disk hit is promoted to the memory tier.
+
+        Args:
+            key (str): The S3 key of the plot.
+
+        Returns:
+            bytes or None: The image, or None on a miss.
+        """
+        with self._lock:
+            data = self._tiers["memory"].get(key)
+            if data is not None:
+                self._tiers["memory"].move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return data
+        data = self._read_disk(key)
+        with self._lock:
+            if data is None:
+                self.counters["misses"] += 1
+                return None
+            self.counters["disk_hits"] += 1
+            self._put_memory(key, data)
+            return data
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._path(key), 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            with self._lock:
+                if self._tiers["disk"].pop(key, None) is not None:
+                    self._used["disk"] = sum(self._tiers["disk"].values())
+            return None
+        with self._lock:
+            if key not in self._tiers["disk"]:
+                self._tiers["disk"][key] = len(data)
+                self._used["disk"] += len(data)
+                self._evict_disk()
+            self._tiers["disk"].move_to_end(key)
+        return data
+
+    def put(self, key, data):
+        """
+        Stores image bytes under `key` in both tiers.
+
+        Args:
+            key (str): The S3 key of the plot.
+            data (bytes): The image.
+        """
+        if self.disk_dir:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as file:
+                file.write(data)
+            os.replace(tmp, path)
+        with self._lock:
+            self._put_memory(key, data)
+            self._mark_stored(key)
+            if self.disk_dir:
+                self._used["disk"] += len(data) - self._tiers["disk"].pop(key, 0)
+                self._tiers["disk"][key] = len(data)
+                self._evict_disk()
+
+    def get_or_load(self, key, loader):
+        """
+        Returns the image cached under `key`, or loads and stores it.
+
+        Args:
+            key (str): The S3 key of the plot.
+            loader (callable): Returns the image bytes on a miss, e.g. from S3.
+
+        Returns:
+            bytes or None: The image, or None if it is neither cached nor loadable.
+        """
+        data = self.get(key)
+        if data is None:
+            data = loader()
+            if data:
+                self.put(key, data)
+        return data
+
+    def exists(self, key, check):
+        """
+        Returns True if the plot under `key` is cached or known to be stored in S3.
+
+        Neither tier is read: a disk hit only checks the file. On a miss, `check` runs
+        and a positive answer is remembered, so S3 is asked once per key.
+
+        Args:
+            key (str): The S3 key of the plot.
+            check (callable): Returns True if the plot is stored, e.g. an S3 HEAD request.
+
+        Returns:
+            bool: True if the plot exists.
+        """
+        with self._lock:
+            for tier in ("memory", "stored"):
+                if key in self._tiers[tier]:
+                    self._tiers[tier].move_to_end(key)
+                    self.counters[f"{tier}_hits"] += 1
+                    return True
+        if self.disk_dir and os.path.exists(self._path(key)):
+            with self._lock:
+                self.counters["disk_hits"] += 1
+                self._mark_stored(key)
+            return True
+        with self._lock:
+            self.counters["misses"] += 1
+        if not check():
+            return False
+        with self._lock:
+            self._mark_stored(key)
+        return True
+
+    def _mark_stored(self, key):
+        stored = self._tiers["stored"]
+        stored[key] = True
+        stored.move_to_end(key)
+        while len(stored) > MAX_STORED_KEYS:
+            stored.popitem(last=False)
+
+    def _put_memory(self, key, data):
+        if len(data) > self.memory_bytes:
+            return
+        self._used["memory"] += len(data) - len(self._tiers["memory"].pop(key, b''))
+        self._tiers["memory"][key] = data
+        while self._used["memory"] > self.memory_bytes:
+            _, evicted = self._tiers["memory"].popitem(last=False)
+            self._used["memory"] -= len(evicted)
+            self.counters["memory_evictions"] += 1
+
+    def _evict_disk(self):
+        while self._used["disk"] > self.disk_bytes and self._tiers["disk"]:
+            key, size = self._tiers["disk"].popitem(last=False)
+            self._used["disk"] -= size
+            self.counters["disk_evictions"] += 1
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        """
+        Returns the cache sizes and counters.
+
+        Returns:
+            dict: Entries and bytes per tier, the number of keys known to be in S3,
+            the counters and the hit rate over all lookups.
+        """
+        with self._lock:
+            hits = sum(self.counters[f"{tier}_hits"] for tier in ("memory", "disk", "stored"))
+            lookups = hits + self.counters["misses"]
+            return {
+                "memory_entries": len(self._tiers["memory"]),
+                "memory_bytes": self._used["memory"],
+                "disk_entries": len(self._tiers["disk"]),
+                "disk_bytes": self._used["disk"],
+                "stored_keys": len(self._tiers["stored"]),
+                **self.counters,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            }
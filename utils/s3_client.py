@@ -4,19 +4,30 @@ Module to interact with S3 and manage file storage.
 This module provides a class to connect to an S3-compatible service.
 and perform file operations like uploading and downloading images.
 
+`S3Client.shared` returns one client per process and credentials, so the boto3 client
+and its keep-alive connection pool are built once and reused by every thread.
+
 Dependencies:
 - boto3: AWS SDK for Python, used for interacting with S3-compatible services.
+- botocore: `Config` sets the connection pool size, TCP keep-alive and adaptive retries.
 - logging: Used for logging error and important information messages.
 
 Class:
 - S3Client: A class that connects to S3, manages sessions, and handles file uploads and downloads.
 """
 import logging
+import threading
 import boto3
 import botocore.exceptions
+from botocore.config import Config
+
+from api.config import S3_POOL_CONNECTIONS, S3_MAX_ATTEMPTS, S3_PRESIGN_EXPIRY
 
 logger = logging.getLogger('api')
 
+_shared = {}
+_shared_lock = threading.Lock()
+
 
 class S3Client:
     """
@@ -32,10 +43,12 @@ class S3Client:
         region (str): The region for the S3 service (optional, default is "ru-central-1").
 
     Methods:
+        shared: Returns the process-wide client for a set of credentials.
         _get_session: Creates an S3 session if it doesn't exist.
         _ensure_session: Ensures an active session is available.
         upload_image: Uploads an image file to an S3 bucket.
         download_image: Downloads an image file from an S3 bucket.
+        presigned_url: Returns a presigned GET URL of a file in an S3 bucket.
     """
     def __init__(self,
                 aws_access_key_id=None,
@@ -59,6 +72,26 @@ class S3Client:
                 "AWS keys must be specified either explicitly or through environment variables.")
 
         self.s3 = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, aws_access_key_id=None, aws_secret_access_key=None,
+               endpoint_url=None, region=None):
+        """
+        Returns the process-wide client for the given credentials and endpoint.
+
+        The client is created on the first call and reused afterwards. boto3 clients
+        are thread-safe, so the instance can be used from any thread.
+
+        Returns:
+            S3Client: The shared client.
+        """
+        key = (aws_access_key_id, aws_secret_access_key, endpoint_url, region)
+        with _shared_lock:
+            if key not in _shared:
+                _shared[key] = cls(aws_access_key_id, aws_secret_access_key,
+                                   endpoint_url, region)
+            return _shared[key]
 
     def _get_session(self):
         """
@@ -67,12 +100,17 @@ class S3Client:
         This method is responsible for setting up a session with the S3 service 
         using the provided AWS credentials, region, and endpoint URL.
         """
-        if self.s3 is None:
-            self.s3 = boto3.session.Session(
-                aws_access_key_id=self.aws_access_key_id,
-                aws_secret_access_key=self.aws_secret_access_key,
-                region_name=self.region
-            ).client(service_name='s3', endpoint_url=self.endpoint_url)
+        with self._lock:
+            if self.s3 is None:
+                self.s3 = boto3.session.Session(
+                    aws_access_key_id=self.aws_access_key_id,
+                    aws_secret_access_key=self.aws_secret_access_key,
+                    region_name=self.region
+                ).client(service_name='s3', endpoint_url=self.endpoint_url, config=Config(
+                    max_pool_connections=S3_POOL_CONNECTIONS,
+                    tcp_keepalive=True,
+                    retries={'mode': 'adaptive', 'max_attempts': S3_MAX_ATTEMPTS}
+                ))
 
     def _ensure_session(self):
         """
@@ -134,3 +172,25 @@ class S3Client:
         """
         self._ensure_session()
         return self.s3.get_object(Bucket=bucket, Key=bucket_file)['Body'].read()
+
+    def presigned_url(self, bucket: str, bucket_file: str, expires_in: int = S3_PRESIGN_EXPIRY):
+        """
+        Returns a presigned GET URL of a file in an S3 bucket.
+
+        The URL is signed locally, no request is sent to S3. Anyone holding it can
+        download the file until it expires.
+
+        Args:
+            bucket (str): The name of the S3 bucket.
+            bucket_file (str): The file name in the S3 bucket.
+            expires_in (int): Lifetime of the URL in seconds.
+
+        Returns:
+            str: The presigned URL.
+        """
+        self._ensure_session()
+        return self.s3.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': bucket, 'Key': bucket_file},
+            ExpiresIn=expires_in
+        )
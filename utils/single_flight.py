@@ -0,0 +1,145 @@
+"""
+Module to deduplicate concurrent identical calls.
+
+This module provides a single-flight group: when several threads ask for the same key
+at the same time, only the first one runs the call and the others wait for its result.
+It is used to collapse bursts of identical upstream requests into one.
+
+Dependencies:
+- threading: Used to guard the table of in-flight calls.
+- concurrent.futures: `Future` is used to hand the result over to waiting threads.
+- asyncio: Used by the coroutine flavour of the group.
+
+Classes:
+- SingleFlight: Runs at most one call per key at a time and shares its result.
+- AsyncSingleFlight: The same for coroutines running on one event loop.
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    A group of calls deduplicated by key.
+
+    The first caller for a key becomes the leader and runs the function. Callers that
+    arrive while the leader is still running wait for it and receive the same result,
+    or the same exception. Once the call finishes, the key is forgotten, so a later
+    caller triggers a new call.
+
+    Attributes:
+        counters (dict): The number of `calls` actually executed and of `shared`
+            results handed to waiting callers.
+
+    Methods:
+        do: Runs the function for a key or waits for the in-flight call.
+        stats: Returns the counters and the number of in-flight calls.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.counters = {"calls": 0, "shared": 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Runs `fn(*args, **kwargs)` unless a call for `key` is already in flight.
+
+        Args:
+            key: A hashable key identifying identical calls.
+            fn (callable): The function to run.
+            *args: Positional arguments for `fn`.
+            **kwargs: Keyword arguments for `fn`.
+
+        Returns:
+            The result of `fn`, shared between all concurrent callers for `key`.
+
+        Raises:
+            Exception: Whatever `fn` raised, re-raised in every waiting caller.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.counters["calls"] += 1
+            else:
+                self.counters["shared"] += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self):
+        """
+        Returns the single-flight counters.
+
+        Returns:
+            dict: The executed and shared call counts and the number of in-flight keys.
+        """
+        with self._lock:
+            return {**self.counters, "in_flight": len(self._calls)}
+
+
+class AsyncSingleFlight:
+    """
+    A group of coroutine calls deduplicated by key.
+
+    The first caller for a key schedules the coroutine as a task; callers arriving while
+    it runs await the same task. Waiters are shielded from each other, so cancelling one
+    caller does not cancel the shared call. Must be used from a single event loop.
+
+    Attributes:
+        counters (dict): The number of `calls` actually executed and of `shared`
+            results handed to waiting callers.
+
+    Methods:
+        do: Runs the coroutine function for a key or awaits the in-flight call.
+        stats: Returns the counters and the number of in-flight calls.
+    """
+    def __init__(self):
+        self._calls = {}
+        self.counters = {"calls": 0, "shared": 0}
+
+    async def do(self, key, fn, *args, **kwargs):
+        """
+        Awaits `fn(*args, **kwargs)` unless a call for `key` is already in flight.
+
+        Args:
+            key: A hashable key identifying identical calls.
+            fn (callable): The coroutine function to run.
+            *args: Positional arguments for `fn`.
+            **kwargs: Keyword arguments for `fn`.
+
+        Returns:
+            The result of `fn`, shared between all concurrent callers for `key`.
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+            self.counters["calls"] += 1
+        else:
+            self.counters["shared"] += 1
+        return await asyncio.shield(task)
+
+    def stats(self):
+        """
+        Returns the single-flight counters.
+
+        Returns:
+            dict: The executed and shared call counts and the number of in-flight keys.
+        """
+        return {**self.counters, "in_flight": len(self._calls)}
@@ -0,0 +1,137 @@
+"""
+Module with helpers for candle time buckets.
+
+CryptoCompare aggregates history into candles aligned to UTC minute, hour and day
+boundaries. This module knows the length of each interval and computes where the
+current bucket ends, which is used to decide how long fetched data stays valid.
+
+The base intervals are fetched upstream. The coarser intervals in `RESAMPLED_FROM` are
+built from the candles of a base interval; weeks start on Monday 00:00 UTC.
+
+Functions:
+- interval_seconds: Returns the length of a candle interval in seconds.
+- interval_offset: Returns how far the buckets of an interval are shifted from the epoch.
+- base_interval: Returns the upstream interval a candle interval is built from.
+- max_limit: Returns how many candles of an interval the upstream history covers.
+- bucket_start: Returns the Unix timestamp at which the current bucket started.
+- bucket_end: Returns the Unix timestamp at which the current bucket rolls over.
+"""
+import time as _time
+
+INTERVAL_SECONDS = {
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400,
+    '15m': 900,
+    '4h': 14400,
+    '1d': 86400,
+    '1w': 604800,
+}
+
+# Coarser interval -> the base interval its candles are aggregated from.
+RESAMPLED_FROM = {
+    '15m': 'minute',
+    '4h': 'hour',
+    '1d': 'day',
+    '1w': 'day',
+}
+
+# Base interval -> how far back the upstream API keeps its candles, in seconds.
+HISTORY_DEPTH = {
+    'minute': 7 * 86400,
+}
+
+# The Unix epoch is a Thursday; weekly buckets start four days later, on Monday.
+INTERVAL_OFFSETS = {
+    '1w': 4 * 86400,
+}
+
+
+def interval_seconds(time):
+    """
+    Returns the length of a candle interval in seconds.
+
+    Args:
+        time (str): The candle interval (e.g., "hour", "day").
+
+    Returns:
+        int: The interval length in seconds.
+
+    Raises:
+        ValueError: If the interval is not supported.
+    """
+    try:
+        return INTERVAL_SECONDS[time]
+    except KeyError as e:
+        raise ValueError(f"Unsupported time interval: {time}") from e
+
+
+def interval_offset(time):
+    """
+    Returns how far the buckets of a candle interval are shifted from the Unix epoch.
+
+    Args:
+        time (str): The candle interval (e.g., "hour", "1w").
+
+    Returns:
+        int: The offset in seconds; 0 for all intervals but weeks.
+    """
+    return INTERVAL_OFFSETS.get(time, 0)
+
+
+def base_interval(time):
+    """
+    Returns the upstream interval the candles of an interval are built from.
+
+    Args:
+        time (str): The candle interval (e.g., "hour", "4h").
+
+    Returns:
+        str: The base interval, e.g. "hour" for "4h"; `time` itself for base intervals.
+    """
+    return RESAMPLED_FROM.get(time, time)
+
+
+def max_limit(time):
+    """
+    Returns how many candles of an interval the upstream history of its base covers.
+
+    Args:
+        time (str): The candle interval (e.g., "minute", "15m").
+
+    Returns:
+        int or None: The largest servable limit, e.g. 672 for "15m" built from about
+        seven days of minutes; None if the history is not limited.
+    """
+    depth = HISTORY_DEPTH.get(base_interval(time))
+    return None if depth is None else depth // interval_seconds(time)
+
+
+def bucket_start(time, now=None):
+    """
+    Returns the Unix timestamp at which the current candle bucket started.
+
+    Args:
+        time (str): The candle interval (e.g., "hour", "day").
+        now (float, optional): The current Unix time. Defaults to `time.time()`.
+
+    Returns:
+        int: The start of the bucket containing `now`.
+    """
+    step, offset = interval_seconds(time), interval_offset(time)
+    now = _time.time() if now is None else now
+    return int((now - offset) // step) * step + offset
+
+
+def bucket_end(time, now=None):
+    """
+    Returns the Unix timestamp at which the current candle bucket rolls over.
+
+    Args:
+        time (str): The candle interval (e.g., "hour", "day").
+        now (float, optional): The current Unix time. Defaults to `time.time()`.
+
+    Returns:
+        int: The start of the next bucket.
+    """
+    return bucket_start(time, now) + interval_seconds(time)